@@ -0,0 +1,68 @@
+from preprocess.cache_agent_preprocess import CacheAgentPreprocess
+from data_models.cache_agent_data_models import NodeInfo, CacheAgentState
+from typing import Dict, List, Optional, TYPE_CHECKING
+from urllib.parse import urlparse, unquote
+
+if TYPE_CHECKING:
+    from graph.knowledge_graph import KnowledgeGraph
+
+class KnowledgeGraphPreprocess(CacheAgentPreprocess):
+    """
+    Builds CacheAgentState objects directly from a scanned KnowledgeGraph, or from a graph
+    snapshot written by `KnowledgeGraph.to_snapshot`, with no intermediate JSON file.
+
+    Nodes are ordered by dependency level so every dependency is summarized before its
+    dependents. Mutually recursive functions share a level instead of failing the sort.
+    Within a level, and within each node's dependency list, the most central code (by
+    PageRank over reference counts) comes first.
+    """
+    def __init__(self, graph: Optional['KnowledgeGraph'] = None, snapshot_path: Optional[str] = None, **kwargs):
+        if graph is None and snapshot_path is None:
+            raise ValueError("Either a KnowledgeGraph or a snapshot path is required.")
+        super().__init__(file_path=snapshot_path, **kwargs)
+        self.knowledge_graph = graph
+
+    def _load_graph(self):
+        if self.knowledge_graph is None:
+            from graph.snapshot import load_snapshot
+            self.knowledge_graph = load_snapshot(self.graph_path)
+        kg = self.knowledge_graph
+
+        node_infos: Dict[int, NodeInfo] = {}
+        def node_info(node: int) -> NodeInfo:
+            info = node_infos.get(node)
+            if info is None:
+                decl = kg.nodes[node]
+                code_block = getattr(decl, 'code_block', None)
+                info = node_infos[node] = NodeInfo(
+                    type=type(decl).__name__,
+                    name=getattr(decl, 'name', ''),
+                    path=unquote(urlparse(decl.uri).path) if decl.uri.startswith("file://") else decl.uri,
+                    code_content=str(code_block) if code_block is not None else "",
+                )
+            return info
+
+        # Only declared code components (functions) are summarized
+        declared = kg.core.declared
+        def is_component(node: int) -> bool:
+            return bool(declared[node]) and getattr(kg.nodes[node], 'code_block', None) is not None
+
+        rank = kg.query.pagerank()
+        def importance(node: int) -> float:
+            return -rank.get(kg.nodes[node].key(), 0.0)
+
+        final_graph: List[CacheAgentState] = []
+        for level in kg.query.topological_levels():
+            for node in sorted(map(kg.node_of, level), key=importance):
+                if not is_component(node):
+                    continue
+                current_node = CacheAgentState(
+                    node=node_info(node),
+                    dependencies=[node_info(dep) for dep in sorted(kg.core.successors(node), key=importance) if is_component(dep)],
+                    context=None,
+                )
+                final_graph.append(current_node)
+                self.node_map[current_node.node] = current_node
+
+        self.graph = final_graph
+        print(f"Graph loaded and sorted successfully. Total nodes: {len(self.graph)}")
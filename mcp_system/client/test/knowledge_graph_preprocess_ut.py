@@ -0,0 +1,91 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# The graph package lives next to the client
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from graph.knowledge_graph import KnowledgeGraph, Function, Index, Position
+from graph.snapshot import save_snapshot
+from preprocess.knowledge_graph_preprocess import KnowledgeGraphPreprocess
+
+
+class FakeCodeBlock:
+    """A stand-in for CodeBlock exposing only the attributes the graph reads."""
+    def __init__(self, lines, base_line_number=0):
+        self.lines = lines
+        self.base_line_number = base_line_number
+
+    def __str__(self):
+        return '\n'.join(self.lines)
+
+
+class TestKnowledgeGraphPreprocess(unittest.TestCase):
+
+    def setUp(self):
+        """
+        leaf <- mid <- top, plus a cycle ping <-> pong that both use leaf and that caller
+        enters through ping.
+        """
+        self.graph = KnowledgeGraph(base_uri="file:///repo")
+        self.functions = {}
+        for line, name in enumerate(["leaf", "mid", "top", "ping", "pong", "caller"]):
+            func = Function(
+                uri="file:///repo/a.py",
+                position=Position(line=line * 3, character=4),
+                name=name,
+                code_block=FakeCodeBlock([f"def {name}():", "    pass"], base_line_number=line * 3),
+            )
+            func.index = Index(name=name, location=func, context="")
+            self.graph.add_decl(func)
+            self.functions[name] = func
+        for src, dst in [("mid", "leaf"), ("top", "mid"), ("top", "leaf"), ("ping", "pong"), ("pong", "ping"),
+                         ("ping", "leaf"), ("pong", "leaf"), ("caller", "ping")]:
+            self.graph.add_dependency(self.functions[src], self.functions[dst].index)
+
+    def assert_ordered(self, sut: KnowledgeGraphPreprocess):
+        order = [state.node.name for state in sut.graph]
+        self.assertEqual(sorted(order), sorted(self.functions))
+        position = {name: i for i, name in enumerate(order)}
+        dependencies = {state.node.name: {dep.name for dep in state.dependencies} for state in sut.graph}
+
+        # Every dependency outside a cycle is summarized before its dependents
+        cycle = {"ping", "pong"}
+        for name, deps in dependencies.items():
+            for dep in (deps - cycle if name in cycle else deps):
+                self.assertLess(position[dep], position[name], f"{dep} should come before {name}")
+        self.assertEqual(order[0], "leaf")
+        self.assertLess(position["pong"], position["caller"])
+
+        # The cycle does not fail the sort and keeps both of its edges
+        self.assertEqual(dependencies["ping"], {"pong", "leaf"})
+        self.assertEqual(dependencies["pong"], {"ping", "leaf"})
+        self.assertEqual(dependencies["top"], {"mid", "leaf"})
+
+        state = sut.graph[position["mid"]]
+        self.assertEqual(state.node.path, "/repo/a.py")
+        self.assertEqual(state.node.code_content, "def mid():\n    pass")
+        self.assertIsNone(state.context)
+        self.assertIs(sut.node_map[state.node], state)
+
+    def test_from_graph(self):
+        sut = KnowledgeGraphPreprocess(graph=self.graph)
+        sut.get_graph()
+        self.assert_ordered(sut)
+
+    def test_from_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "graph.snapshot")
+            save_snapshot(self.graph, path)
+            sut = KnowledgeGraphPreprocess(snapshot_path=path)
+            sut.get_graph()
+        self.assert_ordered(sut)
+
+    def test_requires_a_source(self):
+        with self.assertRaises(ValueError):
+            KnowledgeGraphPreprocess()
+
+
+if __name__ == '__main__':
+    unittest.main()
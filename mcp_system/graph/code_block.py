@@ -1,4 +1,4 @@
-from typing import List, Iterator
+from typing import List, Iterator, FrozenSet, Optional
 from graph.knowledge_graph import Symbol, Position, Location
 from servers.lsp.servers.base import LangServer
 
@@ -8,6 +8,8 @@ class CodeBlock:
         self.lines = lines
         self.lsp = lsp
         self.uri = uri
+        self.skip_names: FrozenSet[str] = frozenset() # names predicted external, never sent to the LSP
+        self.skipped = 0
 
     def __str__(self):
         return '\n'.join(self.lines)
@@ -75,8 +77,11 @@ class CodeBlock:
         
         return line
 
-    def _process_word(self, word: str, line_number: int, symbol_idx: int) -> Iterator[Symbol]:
+    def _process_word(self, word: str, line_number: int, symbol_idx: int, root: Optional[str] = None) -> Iterator[Symbol]:
         """Process a word and yield Symbol if it's not a reserved keyword and has a definition."""
+        if (root or word) in self.skip_names:
+            self.skipped += 1
+            return
         if word not in self.lsp.keywords:
             # Try to find definition for this symbol
             res = self.lsp.show_definition(
@@ -106,11 +111,13 @@ class CodeBlock:
         separators = self.lsp.separators
 
         symbol_idx = None  # symbol starting index
+        root = None  # first word of the current attribute chain, e.g. `np` for `np.linalg.norm`
         for char_number, char in enumerate(line):
             if char in separators:
                 if symbol_idx is not None:
                     word = line[symbol_idx:char_number]
-                    yield from self._process_word(word, line_number, symbol_idx)
+                    root = self._chain_root(line, symbol_idx, word, root)
+                    yield from self._process_word(word, line_number, symbol_idx, root)
                     symbol_idx = None  # Reset symbol_idx
             else:
                 if symbol_idx is None:
@@ -119,7 +126,14 @@ class CodeBlock:
         # Handle the case where a symbol is at the end of the line
         if symbol_idx is not None:
             word = line[symbol_idx:]
-            yield from self._process_word(word, line_number, symbol_idx)
+            root = self._chain_root(line, symbol_idx, word, root)
+            yield from self._process_word(word, line_number, symbol_idx, root)
+
+    @staticmethod
+    def _chain_root(line: str, symbol_idx: int, word: str, previous_root: Optional[str]) -> str:
+        if symbol_idx > 0 and line[symbol_idx - 1] == '.' and previous_root is not None:
+            return previous_root
+        return word
 
     def __iter__(self):
         self.line_number = 0
@@ -0,0 +1,250 @@
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+KIND_FUNCTION = 0
+KIND_VARIABLE = 1
+KIND_OTHER = 2
+
+# Adjacency of a node without edges; replaced by an array('I') on its first edge
+NO_EDGES = ()
+
+
+def _node_key(uri_id: int, line: int, character: int) -> int:
+    # One int instead of a (uri id, line, character) tuple: line and character fit in 32 bits
+    return (uri_id << 64) | (line << 32) | character
+
+
+class StringPool:
+    """Interns strings into dense integer IDs."""
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def intern(self, value: str) -> int:
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = self._ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+    def get(self, value: str) -> Optional[int]:
+        return self._ids.get(value)
+
+    def __getitem__(self, string_id: int) -> str:
+        return self.strings[string_id]
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+
+class GraphCore:
+    """
+    Compact storage behind `KnowledgeGraph`.
+
+    URIs and names are interned into a `StringPool`, nodes live in parallel typed arrays
+    indexed by a dense node ID, and edges are kept in per-node `array('I')` adjacency lists
+    (forward and reverse, allocated on a node's first edge) with an integer edge -> weight
+    map for O(1) deduplication. The
+    weight counts how many times the edge was recorded (e.g. references to a callee).
+    `csr()` packs the adjacency into offsets/targets arrays for bulk algorithms.
+    """
+    def __init__(self):
+        self.strings = StringPool()
+        self.node_uri = array('I')
+        self.node_name = array('I')
+        self.node_line = array('I')
+        self.node_character = array('I')
+        self.node_kind = array('B')
+        self.declared = bytearray() # 1 once the node was added as a declaration, 0 for placeholders
+        self._ids: Dict[int, int] = {} # _node_key(uri id, line, character) -> node id
+        self._out: List[Union[array, tuple]] = []
+        self._in: List[Union[array, tuple]] = []
+        self._edges: Dict[int, int] = {} # (src << 32) | dst -> weight
+        self._csr: Dict[bool, Tuple[int, array, array]] = {} # reverse -> (version, offsets, targets)
+        self._csr_weights: Optional[Tuple[int, array]] = None # (version, weights)
+        self.version = 0 # bumped on every mutation
+
+    @classmethod
+    def from_arrays(
+        cls,
+        strings: List[str],
+        node_uri: array,
+        node_name: array,
+        node_line: array,
+        node_character: array,
+        node_kind: array,
+        declared: bytearray,
+        offsets: array,
+        targets: array,
+        weights: Optional[array] = None,
+    ) -> 'GraphCore':
+        """
+        Rebuild a core from its column arrays and forward CSR adjacency (see `csr`), with
+        edge weights aligned to `targets` (all 1 when omitted).
+        """
+        core = cls()
+        core.strings.strings = list(strings)
+        core.strings._ids = {value: i for i, value in enumerate(core.strings.strings)}
+        core.node_uri, core.node_name = node_uri, node_name
+        core.node_line, core.node_character, core.node_kind = node_line, node_character, node_kind
+        core.declared = bytearray(declared)
+        core._ids = {_node_key(*key): node for node, key in enumerate(zip(node_uri, node_line, node_character))}
+
+        n = len(node_kind)
+        core._out = [targets[offsets[node]:offsets[node + 1]] if offsets[node + 1] > offsets[node] else NO_EDGES
+                     for node in range(n)]
+        core._in = [NO_EDGES] * n
+        edges = core._edges
+        position = 0
+        for src, successors in enumerate(core._out):
+            base = src << 32
+            for dst in successors:
+                edges[base | dst] = weights[position] if weights is not None else 1
+                _append(core._in, dst, src)
+                position += 1
+        return core
+
+    def __len__(self) -> int:
+        return len(self.node_kind)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self._edges)
+
+    def node_id(self, uri: str, line: int, character: int) -> Optional[int]:
+        uri_id = self.strings.get(uri)
+        if uri_id is None:
+            return None
+        return self._ids.get(_node_key(uri_id, line, character))
+
+    def add_node(self, uri: str, name: str, line: int, character: int, kind: int = KIND_OTHER) -> int:
+        """Return the ID of the node at (uri, line, character), creating it if needed."""
+        uri_id = self.strings.intern(uri)
+        key = _node_key(uri_id, line, character)
+        node = self._ids.get(key)
+        if node is not None:
+            if not self.declared[node] and name and self.strings[self.node_name[node]] != name:
+                # A re-scanned document declared something else at a vacated position
+                self.node_name[node] = self.strings.intern(name)
+                self.node_kind[node] = kind
+                self.version += 1
+            return node
+
+        node = self._ids[key] = len(self.node_kind)
+        self.node_uri.append(uri_id)
+        self.node_name.append(self.strings.intern(name))
+        self.node_line.append(line)
+        self.node_character.append(character)
+        self.node_kind.append(kind)
+        self.declared.append(0)
+        self._out.append(NO_EDGES)
+        self._in.append(NO_EDGES)
+        self.version += 1
+        return node
+
+    def declare(self, node: int):
+        if not self.declared[node]:
+            self.declared[node] = 1
+            self.version += 1
+
+    def add_edge(self, src: int, dst: int, weight: int = 1) -> bool:
+        """
+        Add the edge src -> dst, or add `weight` to it if it exists.
+        Returns False if it already existed.
+        """
+        edge = (src << 32) | dst
+        if edge in self._edges:
+            self._edges[edge] += weight
+            self.version += 1
+            return False
+        self._edges[edge] = weight
+        _append(self._out, src, dst)
+        _append(self._in, dst, src)
+        self.version += 1
+        return True
+
+    def undeclare(self, node: int):
+        """Turn a declaration back into a placeholder, e.g. once its document was deleted."""
+        if self.declared[node]:
+            self.declared[node] = 0
+            self.version += 1
+
+    def remove_out_edges(self, node: int):
+        """Drop every edge leaving `node`."""
+        successors = self._out[node]
+        if not successors:
+            return
+        base = node << 32
+        for dst in successors:
+            del self._edges[base | dst]
+            predecessors = self._in[dst]
+            predecessors.pop(predecessors.index(node))
+        self._out[node] = NO_EDGES
+        self.version += 1
+
+    def remove_in_edges(self, node: int) -> List[Tuple[int, int]]:
+        """Drop every edge into `node` and return them as (source, weight) pairs."""
+        predecessors, self._in[node] = self._in[node], NO_EDGES
+        removed = []
+        for src in predecessors:
+            removed.append((src, self._edges.pop((src << 32) | node)))
+            successors = self._out[src]
+            successors.pop(successors.index(node))
+        if removed:
+            self.version += 1
+        return removed
+
+    def has_edge(self, src: int, dst: int) -> bool:
+        return ((src << 32) | dst) in self._edges
+
+    def weight(self, src: int, dst: int) -> int:
+        """Weight of the edge src -> dst, 0 if there is none."""
+        return self._edges.get((src << 32) | dst, 0)
+
+    def successors(self, node: int) -> Sequence[int]:
+        return self._out[node]
+
+    def predecessors(self, node: int) -> Sequence[int]:
+        return self._in[node]
+
+    def csr(self, reverse: bool = False) -> Tuple[array, array]:
+        """
+        Return the adjacency in compressed sparse row form.
+
+        Returns:
+            (offsets, targets) where the neighbours of node `n` are
+            `targets[offsets[n]:offsets[n + 1]]`
+        """
+        cached = self._csr.get(reverse)
+        if cached is not None and cached[0] == self.version:
+            return cached[1], cached[2]
+
+        adjacency = self._in if reverse else self._out
+        offsets = array('I', [0])
+        targets = array('I')
+        for neighbours in adjacency:
+            targets.extend(neighbours)
+            offsets.append(len(targets))
+        self._csr[reverse] = (self.version, offsets, targets)
+        return offsets, targets
+
+    def csr_weights(self) -> array:
+        """Edge weights aligned with the `targets` array of the forward `csr()`."""
+        if self._csr_weights is not None and self._csr_weights[0] == self.version:
+            return self._csr_weights[1]
+
+        edges = self._edges
+        weights = array('I')
+        for src, successors in enumerate(self._out):
+            base = src << 32
+            weights.extend([edges[base | dst] for dst in successors])
+        self._csr_weights = (self.version, weights)
+        return weights
+
+
+def _append(adjacency: List[Union[array, tuple]], node: int, neighbour: int):
+    neighbours = adjacency[node]
+    if neighbours:
+        neighbours.append(neighbour)
+    else:
+        adjacency[node] = array('I', (neighbour,))
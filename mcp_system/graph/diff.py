@@ -0,0 +1,102 @@
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Tuple, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from graph.knowledge_graph import KnowledgeGraph, Function, Variable
+
+
+@dataclass
+class GraphDiff:
+    """
+    Change set between two scans of the same repository, old -> new.
+
+    Declarations are identified by key (`<uri>:<line>:<character>`). A declaration that only
+    changed position (same file and name, or same name and code in another file) is
+    reported in `moved` as old key -> new key instead of as a removal plus an addition.
+    """
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    moved: Dict[str, str] = field(default_factory=dict)
+    changed: List[str] = field(default_factory=list) # new keys whose code differs
+    added_edges: List[Tuple[str, str]] = field(default_factory=list)
+    removed_edges: List[Tuple[str, str]] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.moved or self.changed or self.added_edges or self.removed_edges)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    def resummarize(self, new_graph: 'KnowledgeGraph') -> List[str]:
+        """
+        Keys of the new graph whose cached summaries are stale: added or changed declarations,
+        declarations whose dependencies changed, and everything that transitively depends on them.
+        Moved declarations with unchanged code keep their summaries.
+        """
+        seeds = self.added + self.changed + [src for src, _ in self.added_edges + self.removed_edges]
+        # One multi-source reverse BFS over the core keeps this linear in the affected subgraph
+        frontier = list(dict.fromkeys(node for node in map(new_graph.node_of_key, seeds) if node is not None))
+        visited = set(frontier)
+        result = []
+        while frontier:
+            node = frontier.pop()
+            result.append(node)
+            for dependent in new_graph.core.predecessors(node):
+                if dependent not in visited:
+                    visited.add(dependent)
+                    frontier.append(dependent)
+        declared = new_graph.core.declared
+        return [new_graph.nodes[node].key() for node in result if declared[node]]
+
+
+def _code(decl: Union['Function', 'Variable']) -> str:
+    code_block = getattr(decl, 'code_block', None)
+    return str(code_block) if code_block is not None else ""
+
+
+def _unique(keys: List[str], decl_map: Dict, signature) -> Dict:
+    by_signature: Dict = {}
+    for key in keys:
+        sig = signature(decl_map[key])
+        by_signature[sig] = None if sig in by_signature else key # None marks an ambiguous signature
+    return by_signature
+
+
+def _edges(graph: 'KnowledgeGraph') -> List[Tuple[str, str]]:
+    return [(src.key(), dst.key()) for src, dst in graph._declared_edges()]
+
+
+def diff_graphs(old: 'KnowledgeGraph', new: 'KnowledgeGraph') -> GraphDiff:
+    """Compute the change set from `old` to `new` in time linear in their nodes and edges."""
+    old_map, new_map = old.decl_map, new.decl_map
+    removed = [key for key in old_map if key not in new_map]
+    added = [key for key in new_map if key not in old_map]
+
+    # Pair up removals and additions that are the same declaration at a new position
+    moved: Dict[str, str] = {}
+    for signature in (lambda d: (d.uri, getattr(d, 'name', '')), lambda d: (getattr(d, 'name', ''), _code(d))):
+        old_sigs = _unique(removed, old_map, signature)
+        new_sigs = _unique(added, new_map, signature)
+        for sig, old_key in old_sigs.items():
+            new_key = new_sigs.get(sig)
+            if old_key is not None and new_key is not None:
+                moved[old_key] = new_key
+        matched = set(moved.values())
+        removed = [key for key in removed if key not in moved]
+        added = [key for key in added if key not in matched]
+
+    changed = [key for key in new_map if key in old_map and _code(old_map[key]) != _code(new_map[key])]
+    changed += [new_key for old_key, new_key in moved.items() if _code(old_map[old_key]) != _code(new_map[new_key])]
+
+    # Edges are compared in new-key space so moves do not show up as edge churn
+    old_edges = [(moved.get(src, src), moved.get(dst, dst)) for src, dst in _edges(old)]
+    new_edges = _edges(new)
+    old_set, new_set = set(old_edges), set(new_edges)
+    return GraphDiff(
+        added=added,
+        removed=removed,
+        moved=moved,
+        changed=changed,
+        added_edges=[edge for edge in new_edges if edge not in old_set],
+        removed_edges=[edge for edge in old_edges if edge not in new_set],
+    )
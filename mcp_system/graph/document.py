@@ -7,7 +7,7 @@ from lsprotocol.types import SymbolKind
 class Document(dict[str, Union[Variable, Function]]):
     def __init__(self, filepath: str, lsp: LangServer):
         self.uri = filepath
-        self.lsp = lsp
+        self.lsp = lsp.for_uri(filepath) # the server of the sub-project owning this document
         self._extract_symbols()
 
     def _extract_symbols(self):
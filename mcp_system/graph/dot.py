@@ -0,0 +1,140 @@
+import math
+from collections import Counter, deque
+from typing import Dict, Iterable, List, Optional, Set, TextIO, TYPE_CHECKING
+
+from graph.core import KIND_FUNCTION
+from graph.partitions import partition_name
+
+if TYPE_CHECKING:
+    from graph.knowledge_graph import KnowledgeGraph
+
+
+def module_name(uri: str, base_uri: str, depth: Optional[int] = None) -> str:
+    """
+    Module a declaration is grouped under: its file relative to `base_uri`, or with `depth`
+    set, its package directory truncated to `depth` components (see `partition_name`).
+    """
+    if depth is not None:
+        return partition_name(uri, base_uri, depth)
+    return uri[len(base_uri):].lstrip('/') if uri.startswith(base_uri) else uri
+
+
+def select_nodes(graph: 'KnowledgeGraph', focus: Optional[str] = None, max_depth: Optional[int] = None,
+                 min_degree: int = 0) -> List[int]:
+    """
+    Core node IDs of the declarations to draw.
+
+    Args:
+        graph: The graph to export
+        focus: Key of a declaration to center on; only nodes within `max_depth` hops of it,
+            following edges in either direction, are kept
+        max_depth: Hop limit around `focus` (unbounded when None)
+        min_degree: Drop declarations with fewer than this many edges to other declarations.
+            The focus node is always kept.
+
+    Returns:
+        The selected node IDs
+    """
+    core = graph.core
+    declared = core.declared
+    if focus is not None:
+        start = graph.node_of_key(focus)
+        if start is None:
+            raise KeyError(f"Unknown focus declaration: {focus}")
+        depth = {start: 0}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            if max_depth is not None and depth[node] >= max_depth:
+                continue
+            for other in (*core.successors(node), *core.predecessors(node)):
+                if declared[other] and other not in depth:
+                    depth[other] = depth[node] + 1
+                    queue.append(other)
+        candidates: Iterable[int] = depth
+    else:
+        start = None
+        candidates = (node for node in range(len(core)) if declared[node])
+
+    if min_degree <= 0:
+        return list(candidates)
+    selected = []
+    for node in candidates:
+        degree = sum(1 for other in core.successors(node) if declared[other])
+        degree += sum(1 for other in core.predecessors(node) if declared[other])
+        if degree >= min_degree or node == start:
+            selected.append(node)
+    return selected
+
+
+def _quote(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def write_clustered_dot(graph: 'KnowledgeGraph', fp: TextIO, collapse: bool = False, focus: Optional[str] = None,
+                        max_depth: Optional[int] = None, min_degree: int = 0, module_depth: Optional[int] = None):
+    """
+    Stream a module-level DOT view of `graph`, small enough for Graphviz to lay out quickly.
+
+    Declarations are grouped into one `cluster_*` subgraph per module. With `collapse`, each
+    module becomes a single node and the dependencies between two modules become one edge
+    whose weight (and pen width) is the number of underlying dependencies.
+
+    Args:
+        graph: The graph to export
+        fp: A writable text file handle
+        collapse: Draw one node per module instead of one per declaration
+        focus, max_depth, min_degree: Pruning options, see `select_nodes`
+        module_depth: Group by package directory of this depth instead of by file
+    """
+    core = graph.core
+    selected = select_nodes(graph, focus, max_depth, min_degree)
+    keep: Set[int] = set(selected)
+    modules: Dict[int, str] = {node: module_name(graph.nodes[node].uri, graph.base_uri, module_depth) for node in selected}
+    cluster_ids: Dict[str, int] = {}
+    for node in selected:
+        cluster_ids.setdefault(modules[node], len(cluster_ids))
+
+    fp.write("digraph KnowledgeGraph {\n")
+    fp.write("  rankdir=LR;\n")
+    fp.write("  node [shape=box, style=filled, fontname=\"Arial\"];\n")
+    fp.write("  edge [fontname=\"Arial\", fontsize=10];\n")
+    fp.write("\n")
+
+    if collapse:
+        sizes = Counter(modules[node] for node in selected)
+        for module, cluster in cluster_ids.items():
+            fp.write(f'  "m{cluster}" [label="{_quote(module)}\\n{sizes[module]} decls", fillcolor="lightblue"];\n')
+        fp.write("\n")
+
+        weights: Counter = Counter()
+        for node in selected:
+            for dep in core.successors(node):
+                if dep in keep and modules[dep] != modules[node]:
+                    weights[(cluster_ids[modules[node]], cluster_ids[modules[dep]])] += 1
+        for (src, dst), weight in weights.items():
+            penwidth = 1 + math.log2(weight)
+            fp.write(f'  "m{src}" -> "m{dst}" [weight={weight}, penwidth={penwidth:.2f}, label="{weight}"];\n')
+        fp.write("}\n")
+        return
+
+    by_module: Dict[str, List[int]] = {}
+    for node in selected:
+        by_module.setdefault(modules[node], []).append(node)
+    for module, nodes in by_module.items():
+        fp.write(f'  subgraph cluster_{cluster_ids[module]} {{\n')
+        fp.write(f'    label="{_quote(module)}";\n')
+        for node in nodes:
+            decl = graph.nodes[node]
+            color = "lightblue" if core.node_kind[node] == KIND_FUNCTION else "lightgreen"
+            label = f"{_quote(getattr(decl, 'name', ''))}\\n{decl.position.line}"
+            fp.write(f'    "{decl.key()}" [label="{label}", fillcolor="{color}"];\n')
+        fp.write("  }\n")
+    fp.write("\n")
+
+    for node in selected:
+        src = graph.nodes[node].key()
+        for dep in core.successors(node):
+            if dep in keep:
+                fp.write(f'  "{src}" -> "{graph.nodes[dep].key()}";\n')
+    fp.write("}\n")
@@ -0,0 +1,88 @@
+# Content fingerprints of KnowledgeGraph nodes.
+#
+# A node's fingerprint hashes its own content (kind, name, file relative to the graph's
+# base URI, code) together with the fingerprints of its dependencies, Merkle style, so it
+# changes exactly when the node or anything it transitively depends on changes. Nothing
+# depends on scan order or absolute paths, so equal code yields equal fingerprints across
+# machines and runs. Members of a dependency cycle share the digest of their whole
+# component, since none of them can be hashed before the others.
+from hashlib import blake2b
+from typing import List, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from graph.knowledge_graph import KnowledgeGraph
+
+DIGEST_SIZE = 16
+
+
+def relative_uri(uri: str, base_uri: str) -> str:
+    return uri[len(base_uri):].lstrip('/') if base_uri and uri.startswith(base_uri) else uri
+
+
+def canonical_order(graph: 'KnowledgeGraph') -> List[int]:
+    """Core node IDs of the declarations, sorted by (relative uri, line, character)."""
+    core = graph.core
+    strings = core.strings.strings
+    declared = [node for node in range(len(core)) if core.declared[node]]
+    return sorted(declared, key=lambda node: (relative_uri(strings[core.node_uri[node]], graph.base_uri),
+                                              core.node_line[node], core.node_character[node]))
+
+
+def _local_digest(graph: 'KnowledgeGraph', node: int) -> bytes:
+    core = graph.core
+    strings = core.strings.strings
+    code_block = getattr(graph.nodes[node], 'code_block', None)
+    h = blake2b(digest_size=DIGEST_SIZE)
+    for part in (str(core.node_kind[node]), strings[core.node_name[node]],
+                 relative_uri(strings[core.node_uri[node]], graph.base_uri),
+                 str(code_block) if code_block is not None else ""):
+        data = part.encode('utf-8')
+        h.update(len(data).to_bytes(8, 'little'))
+        h.update(data)
+    return h.digest()
+
+
+def _combine(*parts: bytes) -> bytes:
+    h = blake2b(digest_size=DIGEST_SIZE)
+    for part in parts:
+        h.update(part)
+    return h.digest()
+
+
+def node_fingerprints(graph: 'KnowledgeGraph') -> Tuple[bytes, ...]:
+    """Fingerprint of every core node, indexed by node ID, in time linear in the graph."""
+    core = graph.core
+    components = graph.query._cached("scc", graph.query._tarjan)
+    fingerprints: List[bytes] = [b""] * len(core)
+    component_of = [0] * len(core)
+    for component_id, component in enumerate(components):
+        for node in component:
+            component_of[node] = component_id
+
+    # Tarjan emits components after everything they reach, so dependencies are hashed first
+    for component_id, component in enumerate(components):
+        external = sorted({fingerprints[dep] for node in component for dep in core.successors(node)
+                           if component_of[dep] != component_id})
+        local = {node: _local_digest(graph, node) for node in component}
+        cyclic = len(component) > 1 or core.has_edge(component[0], component[0])
+        if not cyclic:
+            fingerprints[component[0]] = _combine(local[component[0]], *external)
+            continue
+        shared = _combine(*sorted(local.values()), b"|", *external)
+        for node in component:
+            fingerprints[node] = _combine(local[node], shared)
+    return tuple(fingerprints)
+
+
+def graph_fingerprint(graph: 'KnowledgeGraph', fingerprints: Tuple[bytes, ...]) -> bytes:
+    """Fingerprint of the whole graph: its declarations' relative keys and fingerprints, in canonical order."""
+    core = graph.core
+    strings = core.strings.strings
+    h = blake2b(digest_size=DIGEST_SIZE)
+    for node in canonical_order(graph):
+        key = f"{relative_uri(strings[core.node_uri[node]], graph.base_uri)}:{core.node_line[node]}:{core.node_character[node]}"
+        data = key.encode('utf-8')
+        h.update(len(data).to_bytes(8, 'little'))
+        h.update(data)
+        h.update(fingerprints[node])
+    return h.digest()
@@ -0,0 +1,105 @@
+import ast
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse, unquote
+
+# Paths matching any of these globs are never treated as part of the scanned project. Only
+# installation locations are excluded by default: directories such as `build/`, `dist/` or
+# `vendor/` can be regular packages of the project, so pass them explicitly where they are not.
+DEFAULT_EXCLUDE = (
+    "*/.venv/*",
+    "*/venv/*",
+    "*/site-packages/*",
+    "*/dist-packages/*",
+)
+
+
+def uri_to_path(uri: str) -> Path:
+    if uri.startswith("file://"):
+        return Path(unquote(urlparse(uri).path))
+    return Path(uri)
+
+
+class ImportPrefilter:
+    """
+    Predicts, from a module's import statements alone, which names refer to stdlib or
+    third-party code, so the scanner can skip them before asking the language server.
+
+    A module is internal when it resolves to a file or package under the project (searched
+    from the importing file's directory up to the root, then the configured search roots)
+    that is not excluded. Relative imports are always internal. Everything else is external.
+    """
+    def __init__(self, root_uri: str, exclude: Iterable[str] = DEFAULT_EXCLUDE, search_roots: Optional[Iterable[str]] = None):
+        self.root = uri_to_path(root_uri).resolve()
+        self.exclude = tuple(exclude)
+        self.search_roots: List[Path] = [self.root, self.root / "src"]
+        for search_root in search_roots or ():
+            self.add_search_root(search_root)
+        self.skipped = 0 # number of definition lookups avoided
+        self._external_names: Dict[str, FrozenSet[str]] = {}
+        self._resolves: Dict[Tuple[Path, str], bool] = {}
+
+    def add_search_root(self, root: str):
+        path = uri_to_path(root).resolve()
+        if path not in self.search_roots:
+            self.search_roots.append(path)
+
+    def is_excluded(self, uri: str) -> bool:
+        path = str(uri_to_path(uri))
+        # A package directory matches `*/name/*` patterns too
+        return any(fnmatch(path, pattern) or fnmatch(path + "/", pattern) for pattern in self.exclude)
+
+    def external_names(self, uri: str) -> FrozenSet[str]:
+        """Return the names bound by imports of external modules in the module at `uri`."""
+        names = self._external_names.get(uri)
+        if names is None:
+            names = self._external_names[uri] = self._collect_external_names(uri_to_path(uri))
+        return names
+
+    def _collect_external_names(self, path: Path) -> FrozenSet[str]:
+        try:
+            tree = ast.parse(path.read_text(encoding="utf-8"))
+        except (OSError, SyntaxError, UnicodeDecodeError, ValueError):
+            return frozenset()
+
+        file_dir = path.resolve().parent
+        names = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    if self._is_external_module(alias.name, file_dir):
+                        names.add(alias.asname or alias.name.split(".")[0])
+            elif isinstance(node, ast.ImportFrom):
+                if node.level or not node.module or not self._is_external_module(node.module, file_dir):
+                    continue
+                for alias in node.names:
+                    if alias.name != "*":
+                        names.add(alias.asname or alias.name)
+        return frozenset(names)
+
+    def _is_external_module(self, module: str, file_dir: Path) -> bool:
+        top = module.split(".")[0]
+        for base in self._candidate_bases(file_dir):
+            if self._resolves_in(base, top):
+                return False
+        return True # stdlib or third-party
+
+    def _candidate_bases(self, file_dir: Path) -> Iterable[Path]:
+        # Script directories are on sys.path, so walk from the importing file up to the root
+        current = file_dir
+        while True:
+            yield current
+            if current == self.root or current.parent == current or self.root not in current.parents:
+                break
+            current = current.parent
+        yield from self.search_roots
+
+    def _resolves_in(self, base: Path, top: str) -> bool:
+        cache_key = (base, top)
+        resolved = self._resolves.get(cache_key)
+        if resolved is None:
+            candidates = (base / top, base / f"{top}.py", base / f"{top}.pyi")
+            resolved = any(c.exists() and not self.is_excluded(str(c)) for c in candidates)
+            self._resolves[cache_key] = resolved
+        return resolved
@@ -1,41 +1,64 @@
-from typing import Dict, Union, List, Optional, TYPE_CHECKING
+from typing import Dict, Union, List, Optional, Iterator, TextIO, Tuple, TYPE_CHECKING
+from collections.abc import Sequence
 from dataclasses import dataclass, field
 import json
 
+from graph.core import GraphCore, KIND_FUNCTION, KIND_VARIABLE, KIND_OTHER
+
 if TYPE_CHECKING:
     from graph.code_block import CodeBlock
     from graph.document import Document
+    from graph.diff import GraphDiff
+    from graph.mapped import MappedGraph
+    from graph.query import GraphQuery
+    from servers.lsp.servers.base import LangServer
 
 # Positional Information
-@dataclass
+# Value types are slotted (no per-instance __dict__) and build their key() once, on first use.
+@dataclass(frozen=True, slots=True)
 class Position:
     line: int
     character: int
+    _key: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
     def key(self):
-        return f"{self.line}:{self.character}"
+        if self._key is None:
+            object.__setattr__(self, '_key', f"{self.line}:{self.character}")
+        return self._key
 
-@dataclass
+@dataclass(slots=True)
 class Location:
     uri: str
     position: Position
+    _key: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+
+    # Not frozen, as Function and Variable are mutable: moving a location drops its cached key
+    def __setattr__(self, name: str, value):
+        object.__setattr__(self, name, value)
+        if name == 'uri' or name == 'position':
+            object.__setattr__(self, '_key', None)
 
     def key(self) -> str:
-        return f"{self.uri}:{self.position.key()}"
+        if self._key is None:
+            self._key = f"{self.uri}:{self.position.line}:{self.position.character}"
+        return self._key
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Range:
     start: Position
     end: Position
 
 # Functional Information
-@dataclass
+@dataclass(slots=True)
 class Index:
     name: str
     location: Location
     context: str
 
-@dataclass
+    def key(self) -> str:
+        return self.location.key()
+
+@dataclass(slots=True)
 class Function(Location):
     name: str
     code_block: 'CodeBlock'
@@ -48,102 +71,394 @@ class Function(Location):
             return
         self.dependencies.append(index)
 
-@dataclass
+@dataclass(slots=True)
 class Variable(Location):
     index: Optional[Index] = None
     name: str = ""
 
 # Graph Information
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Symbol:
     name: str
     pos: Position
     decl: Location
 
+class DependencyView(Sequence):
+    """
+    `Function.dependencies` of a function attached to a `KnowledgeGraph`.
+
+    Reads and writes go straight to the graph's integer adjacency, so membership tests
+    and appends are O(1) instead of comparing dataclasses.
+    """
+    def __init__(self, graph: 'KnowledgeGraph', node: int):
+        self.graph = graph
+        self.node = node
+
+    def __len__(self) -> int:
+        return len(self.graph.core.successors(self.node))
+
+    def __getitem__(self, i):
+        successors = self.graph.core.successors(self.node)
+        if isinstance(i, slice):
+            return [self.graph.indexes[dep] for dep in successors[i]]
+        return self.graph.indexes[successors[i]]
+
+    def __iter__(self):
+        indexes = self.graph.indexes
+        return (indexes[dep] for dep in self.graph.core.successors(self.node))
+
+    def __contains__(self, index) -> bool:
+        if not isinstance(index, Index):
+            return False
+        dep = self.graph.node_of(index.location)
+        return dep is not None and self.graph.core.has_edge(self.node, dep)
+
+    def append(self, index: Index):
+        self.graph.core.add_edge(self.node, self.graph._node_id(index.location, index))
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
 # decl_map[KEY_0] = F
 # F.index.uri.key() = KEY_0
 # F.dependencies = [decl_map[KEY_!].index, decl_map[KEY_2].index, ...]
+#
+# Edges live in `core` (see graph/core.py); `nodes[i]` and `indexes[i]` are the dataclass
+# and Index payloads of core node `i`, and Function.dependencies is a DependencyView over it.
+# The payloads are kept as they carry the code blocks; the core only adds integer columns and
+# adjacency on top (testing/script/graph_memory_benchmark.py breaks the memory down).
 @dataclass
 class KnowledgeGraph:
     base_uri: str
     docs_map: Dict[str, 'Document'] = field(default_factory=dict) # only for parsing
     decl_map: Dict[str, Union[Function, Variable]] = field(default_factory=dict)
+    core: GraphCore = field(default_factory=GraphCore)
+    nodes: List[Location] = field(default_factory=list)
+    indexes: List[Optional[Index]] = field(default_factory=list)
+    partial: bool = False # set when a bounded scan stopped before exhausting its frontier
+    _query: Optional['GraphQuery'] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def query(self) -> 'GraphQuery':
+        """Memoized query engine over this graph (see graph/query.py)."""
+        if self._query is None:
+            from graph.query import GraphQuery
+            self._query = GraphQuery(self)
+        return self._query
+
+    def node_of(self, loc: Location) -> Optional[int]:
+        """Return the core node ID of `loc`, or None if the graph has never seen it."""
+        return self.core.node_id(loc.uri, loc.position.line, loc.position.character)
+
+    def node_of_key(self, key: str) -> Optional[int]:
+        decl = self.decl_map.get(key)
+        return self.node_of(decl) if decl is not None else None
+
+    def _node_id(self, loc: Location, index: Optional[Index] = None) -> int:
+        kind = KIND_FUNCTION if isinstance(loc, Function) else KIND_VARIABLE if isinstance(loc, Variable) else KIND_OTHER
+        node = self.core.add_node(loc.uri, getattr(loc, 'name', ''), loc.position.line, loc.position.character, kind)
+        if node == len(self.nodes):
+            self.nodes.append(loc)
+            self.indexes.append(None)
+        if self.indexes[node] is None:
+            self.indexes[node] = index or getattr(loc, 'index', None)
+        return node
+
+    def _attach(self, decl: Union[Function, Variable]) -> int:
+        node = self._node_id(decl)
+        if self.nodes[node] is not decl:
+            self.nodes[node] = decl
+            self.core.version += 1 # payload replaced: memoized queries and fingerprints are stale
+        if isinstance(decl, Function) and not isinstance(decl.dependencies, DependencyView):
+            pending = decl.dependencies
+            decl.dependencies = DependencyView(self, node)
+            for dep_index in pending:
+                if dep_index and hasattr(dep_index, 'location'):
+                    decl.dependencies.append(dep_index)
+        return node
 
     def add_decl(self, decl: Union[Function, Variable]):
         self.decl_map[decl.key()] = decl
+        self.core.declare(self._attach(decl))
 
-    def to_dot(self, output_file: str = "knowledge_graph.dot") -> str:
+    def add_dependency(self, decl: Function, index: Index, count: int = 1):
         """
-        Export the graph to DOT format for visualization with Graphviz.
-        
+        Record that `decl` depends on `index` in the graph's adjacency. Recording the same
+        dependency again adds `count` to the edge weight, so the weight is the number of
+        references from `decl` to `index`.
+        """
+        if not index:
+            return
+        self.core.add_edge(self._attach(decl), self._node_id(index.location, index), count)
+
+    def remove_document(self, uri: str) -> List[str]:
+        """
+        Forget the declarations of the document at `uri`, e.g. after it changed or was deleted.
+
+        Their nodes become placeholders without outgoing edges; edges from other documents
+        into them are kept, so a re-scan of the document can relink them (see
+        `Scanner.rescan`). Node IDs of every other declaration are unchanged.
+
+        Returns:
+            Keys of the removed declarations
+        """
+        uri_id = self.core.strings.get(uri)
+        removed = []
+        if uri_id is not None:
+            node_uri, declared = self.core.node_uri, self.core.declared
+            for node in range(len(self.core)):
+                if node_uri[node] != uri_id or not declared[node]:
+                    continue
+                key = self.nodes[node].key()
+                self.decl_map.pop(key, None)
+                self.core.remove_out_edges(node)
+                self.core.undeclare(node)
+                removed.append(key)
+        self.docs_map.pop(uri, None)
+        return removed
+
+    def dependents(self, key: str) -> List[Union[Function, Variable]]:
+        """
+        Return the declarations that directly depend on the declaration at `key`.
+
+        Runs in O(result) time using the reverse adjacency index.
+        """
+        node = self.node_of_key(key)
+        if node is None:
+            return []
+        declared = self.core.declared
+        return [self.nodes[p] for p in self.core.predecessors(node) if declared[p]]
+
+    def impact(self, key: str, max_depth: Optional[int] = None) -> List[Union[Function, Variable]]:
+        """
+        Return every declaration that transitively depends on `key` (its blast radius),
+        in breadth-first order. The declaration itself is not included.
+
         Args:
-            output_file: Path to save the DOT file
-            
+            key: The key of the declaration that changed
+            max_depth: Optional limit on the number of reverse hops to follow
+
         Returns:
-            The DOT content as a string
+            The affected declarations, nearest first
         """
-        dot_content = ["digraph KnowledgeGraph {"]
-        dot_content.append("  rankdir=LR;")
-        dot_content.append("  node [shape=box, style=filled, fontname=\"Arial\"];")
-        dot_content.append("  edge [fontname=\"Arial\", fontsize=10];")
-        dot_content.append("")
-        
+        start = self.node_of_key(key)
+        if start is None:
+            return []
+        declared = self.core.declared
+        visited = {start}
+        frontier = [start]
+        result = []
+        depth = 0
+        while frontier and (max_depth is None or depth < max_depth):
+            next_frontier = []
+            for current in frontier:
+                for dependent in self.core.predecessors(current):
+                    if dependent in visited:
+                        continue
+                    visited.add(dependent)
+                    next_frontier.append(dependent)
+                    if declared[dependent]:
+                        result.append(self.nodes[dependent])
+            frontier = next_frontier
+            depth += 1
+        return result
+
+    def diff(self, other: 'KnowledgeGraph') -> 'GraphDiff':
+        """
+        Compare this graph (the old scan) against `other` (the new scan).
+
+        Returns:
+            A `GraphDiff` listing added, removed, moved and changed declarations and
+            added/removed edges, computed in linear time over both graphs
+        """
+        from graph.diff import diff_graphs
+        return diff_graphs(self, other)
+
+    def cross_check_dependents(self, key: str, lsp: 'LangServer', add_missing: bool = False) -> List[str]:
+        """
+        Cross-check the reverse index of `key` against `textDocument/references`.
+
+        Every reference is mapped to the scanned function whose code block encloses it.
+        Functions that reference `key` but are missing from the reverse index are returned,
+        and recorded as dependents when `add_missing` is set.
+
+        Args:
+            key: The key of a declaration in the graph
+            lsp: The language server to query references with
+            add_missing: Whether to add the missing edges to the graph
+
+        Returns:
+            Keys of the enclosing functions missing from the reverse index
+        """
+        decl = self.decl_map.get(key)
+        if decl is None:
+            return []
+        refs = lsp.references(
+            line=decl.position.line,
+            character=decl.position.character,
+            keyword=decl.name,
+            path=decl.uri,
+        ) or []
+
+        node = self.node_of(decl)
+        missing = []
+        for ref in refs:
+            caller = self._enclosing_function(ref.uri, ref.range.start.line)
+            if caller is None:
+                continue
+            caller_key = caller.key()
+            caller_node = self.node_of(caller)
+            if caller_key == key or caller_key in missing or self.core.has_edge(caller_node, node):
+                continue
+            missing.append(caller_key)
+            if add_missing and isinstance(decl, Function) and decl.index:
+                self.add_dependency(caller, decl.index)
+        return missing
+
+    def _enclosing_function(self, uri: str, line: int) -> Optional[Function]:
+        doc = self.docs_map.get(uri)
+        candidates = doc.values() if doc is not None else (d for d in self.decl_map.values() if d.uri == uri)
+        enclosing = None
+        for node in candidates:
+            if not isinstance(node, Function) or node.key() not in self.decl_map:
+                continue
+            start = node.code_block.base_line_number
+            if start <= line < start + len(node.code_block.lines):
+                # Prefer the innermost (latest starting) function for nested definitions
+                if enclosing is None or start > enclosing.code_block.base_line_number:
+                    enclosing = node
+        return enclosing
+
+    def canonical_order(self) -> List[int]:
+        """
+        Core node IDs of the declarations in canonical order (relative file, line, character),
+        independent of the order they were scanned in. Exporters iterate in this order.
+        """
+        from graph.fingerprint import canonical_order
+        return self.query._cached("canonical_order", lambda: canonical_order(self))
+
+    def fingerprints(self) -> Dict[str, str]:
+        """
+        Content fingerprint of every declaration, keyed by declaration key (see graph/fingerprint.py).
+
+        A fingerprint covers the declaration's code and, Merkle style, the fingerprints of
+        everything it depends on, so it can key summary caches and artifacts across runs.
+        """
+        fingerprints = self._node_fingerprints()
+        return {self.nodes[node].key(): fingerprints[node].hex() for node in self.canonical_order()}
+
+    def fingerprint(self, key: Optional[str] = None) -> Optional[str]:
+        """
+        Fingerprint of the declaration at `key`, or of the whole graph when `key` is None.
+        Returns None for unknown keys.
+        """
+        fingerprints = self._node_fingerprints()
+        if key is None:
+            from graph.fingerprint import graph_fingerprint
+            return self.query._cached("graph_fingerprint", lambda: graph_fingerprint(self, fingerprints)).hex()
+        node = self.node_of_key(key)
+        return fingerprints[node].hex() if node is not None else None
+
+    def _node_fingerprints(self) -> Tuple[bytes, ...]:
+        from graph.fingerprint import node_fingerprints
+        return self.query._cached("fingerprints", lambda: node_fingerprints(self))
+
+    def _declared_edges(self) -> Iterator[Tuple[Union[Function, Variable], Union[Function, Variable]]]:
+        order = self.canonical_order()
+        rank = {node: i for i, node in enumerate(order)}
+        for src in order:
+            if not isinstance(self.nodes[src], Function):
+                continue
+            for dst in sorted((dst for dst in self.core.successors(src) if dst in rank), key=rank.__getitem__):
+                yield self.nodes[src], self.nodes[dst]
+
+    def write_dot(self, fp: TextIO):
+        """
+        Stream the graph in DOT format to an open text file, one node or edge at a time.
+
+        Args:
+            fp: A writable text file handle
+        """
+        fp.write("digraph KnowledgeGraph {\n")
+        fp.write("  rankdir=LR;\n")
+        fp.write("  node [shape=box, style=filled, fontname=\"Arial\"];\n")
+        fp.write("  edge [fontname=\"Arial\", fontsize=10];\n")
+        fp.write("\n")
+
         # Add nodes
-        for node_key, node in self.decl_map.items():
+        for node in map(self.nodes.__getitem__, self.canonical_order()):
+            node_key = node.key()
             # Trim base_uri from display key for shorter labels
             display_key = node_key
-            if hasattr(self, 'base_uri') and self.base_uri and node_key.startswith(self.base_uri):
+            if self.base_uri and node_key.startswith(self.base_uri):
                 display_key = node_key[len(self.base_uri):]
-            
+
             if isinstance(node, Function):
                 # Function nodes in blue
                 label = f"{node.name}\\n{display_key}"
-                dot_content.append(f'  "{node_key}" [label="{label}", fillcolor="lightblue"];')
+                fp.write(f'  "{node_key}" [label="{label}", fillcolor="lightblue"];\n')
             elif isinstance(node, Variable):
                 # Variable nodes in green
                 label = f"{node.name}\\n{display_key}"
-                dot_content.append(f'  "{node_key}" [label="{label}", fillcolor="lightgreen"];')
-        
-        dot_content.append("")
-        
+                fp.write(f'  "{node_key}" [label="{label}", fillcolor="lightgreen"];\n')
+
+        fp.write("\n")
+
         # Add edges (dependencies)
-        for node_key, node in self.decl_map.items():
-            if isinstance(node, Function) and node.dependencies:
-                for dep_index in node.dependencies:
-                    if dep_index and hasattr(dep_index, 'location'):
-                        dep_key = dep_index.location.key()
-                        if dep_key in self.decl_map:
-                            dot_content.append(f'  "{node_key}" -> "{dep_key}";')
-        
-        dot_content.append("}")
-        
-        dot_string = "\n".join(dot_content)
-        
-        # Save to file
-        with open(output_file, 'w') as f:
-            f.write(dot_string)
-        
-        return dot_string
+        for node, dep in self._declared_edges():
+            fp.write(f'  "{node.key()}" -> "{dep.key()}";\n')
 
-    def to_json(self, output_file: str = "knowledge_graph.json") -> str:
+        fp.write("}\n")
+
+    def to_dot(self, output_file: str = "knowledge_graph.dot", clustered: bool = False,
+               return_content: bool = True, **cluster_options) -> Optional[str]:
         """
-        Export the graph to JSON format for visualization with other tools.
-        
+        Export the graph to DOT format for visualization with Graphviz.
+
+        The file is streamed with `write_dot`; pass `return_content=False` for large graphs
+        so the document is never held in memory. With `clustered`, declarations are grouped
+        into per-module subgraphs instead and can be collapsed and pruned (see
+        `graph.dot.write_clustered_dot`), which keeps large repositories renderable.
+
         Args:
-            output_file: Path to save the JSON file
-            
+            output_file: Path to save the DOT file
+            clustered: Write the module-clustered view
+            return_content: Read the written document back and return it
+            **cluster_options: collapse, focus, max_depth, min_degree and module_depth,
+                passed to `write_clustered_dot`
+
         Returns:
-            The JSON content as a string
+            DOT format string, or None without `return_content`
         """
-        graph_data = {
-            "nodes": [],
-            "edges": []
-        }
-        
+        with open(output_file, 'w') as f:
+            if clustered or cluster_options:
+                from graph.dot import write_clustered_dot
+                write_clustered_dot(self, f, **cluster_options)
+            else:
+                self.write_dot(f)
+        if not return_content:
+            return None
+        with open(output_file) as f:
+            return f.read()
+
+    def write_json(self, fp: TextIO):
+        """
+        Stream the graph as JSON to an open text file, one node or edge per line.
+
+        Args:
+            fp: A writable text file handle
+        """
+        fingerprints = self._node_fingerprints()
+        fp.write('{\n  "partial": %s,\n  "fingerprint": %s,\n  "nodes": [' % (json.dumps(self.partial), json.dumps(self.fingerprint())))
+
         # Add nodes
-        for node_key, node in self.decl_map.items():
+        separator = "\n    "
+        for node_id in self.canonical_order():
+            node = self.nodes[node_id]
+            node_key = node.key()
             node_data = {
                 "id": node_key,
+                "fingerprint": fingerprints[node_id].hex(),
                 "type": type(node).__name__,
                 "name": getattr(node, 'name', ''),
                 "uri": node.uri,
@@ -152,37 +467,96 @@ class KnowledgeGraph:
                     "character": node.position.character
                 }
             }
-            
+
             if isinstance(node, Function):
                 node_data["dependencies_count"] = len(node.dependencies)
                 if node.index:
                     node_data["index_name"] = node.index.name
                     node_data["index_context"] = node.index.context
-            
-            graph_data["nodes"].append(node_data)
-        
+
+            fp.write(separator)
+            fp.write(json.dumps(node_data))
+            separator = ",\n    "
+
+        fp.write('\n  ],\n  "edges": [')
+
         # Add edges
-        for node_key, node in self.decl_map.items():
-            if isinstance(node, Function) and node.dependencies:
-                for dep_index in node.dependencies:
-                    if dep_index and hasattr(dep_index, 'location'):
-                        dep_key = dep_index.location.key()
-                        if dep_key in self.decl_map:
-                            edge_data = {
-                                "source": node_key,
-                                "target": dep_key,
-                                "source_name": node.name,
-                                "target_name": dep_index.name
-                            }
-                            graph_data["edges"].append(edge_data)
-        
-        json_string = json.dumps(graph_data, indent=2)
-        
-        # Save to file
+        separator = "\n    "
+        for node, dep in self._declared_edges():
+            edge_data = {
+                "source": node.key(),
+                "target": dep.key(),
+                "weight": self.core.weight(self.node_of(node), self.node_of(dep)),
+                "source_name": node.name,
+                "target_name": dep.name
+            }
+            fp.write(separator)
+            fp.write(json.dumps(edge_data))
+            separator = ",\n    "
+
+        fp.write("\n  ]\n}\n")
+
+    def to_json(self, output_file: str = "knowledge_graph.json", return_content: bool = True) -> Optional[str]:
+        """
+        Export the graph to JSON format for visualization with other tools.
+
+        The file is streamed with `write_json`; pass `return_content=False` for large graphs
+        so the document is never held in memory.
+
+        Args:
+            output_file: Path to save the JSON file
+            return_content: Read the written document back and return it
+
+        Returns:
+            JSON format string, or None without `return_content`
+        """
         with open(output_file, 'w') as f:
-            f.write(json_string)
-        
-        return json_string
+            self.write_json(f)
+        if not return_content:
+            return None
+        with open(output_file) as f:
+            return f.read()
+
+    def to_snapshot(self, output_file: str = "knowledge_graph.snapshot", compress: bool = True) -> str:
+        """
+        Save the graph, including code blocks, as a compact binary snapshot (see graph/snapshot.py).
+
+        Args:
+            output_file: Path to save the snapshot
+            compress: Wrap the snapshot in a zstd frame when `zstandard` is installed
+
+        Returns:
+            The path of the written file
+        """
+        from graph.snapshot import save_snapshot
+        save_snapshot(self, output_file, compress=compress)
+        return output_file
+
+    @classmethod
+    def from_snapshot(cls, snapshot_file: str) -> 'KnowledgeGraph':
+        """Load a graph saved with `to_snapshot`."""
+        from graph.snapshot import load_snapshot
+        return load_snapshot(snapshot_file)
+
+    def to_mapped(self, output_file: str = "knowledge_graph.kgmap") -> str:
+        """
+        Save the graph in the read-only memory-mappable layout (see graph/mapped.py).
+
+        Args:
+            output_file: Path to save the mapped snapshot
+
+        Returns:
+            The path of the written file
+        """
+        from graph.mapped import write_mapped
+        write_mapped(self, output_file)
+        return output_file
+
+    @staticmethod
+    def open_mapped(mapped_file: str) -> 'MappedGraph':
+        """Open a file written by `to_mapped` with mmap; lookups read it in place."""
+        from graph.mapped import MappedGraph
+        return MappedGraph(mapped_file)
 
     def print_summary(self):
         """
@@ -225,7 +599,7 @@ class KnowledgeGraph:
         if format.lower() == "dot":
             if not output_file:
                 output_file = "knowledge_graph.dot"
-            dot_content = self.to_dot(output_file)
+            self.to_dot(output_file, return_content=False)
             print(f"Graph exported to DOT format: {output_file}")
             print("To visualize with Graphviz, run:")
             print(f"  dot -Tpng {output_file} -o {output_file.replace('.dot', '.png')}")
@@ -234,7 +608,7 @@ class KnowledgeGraph:
         elif format.lower() == "json":
             if not output_file:
                 output_file = "knowledge_graph.json"
-            json_content = self.to_json(output_file)
+            self.to_json(output_file, return_content=False)
             print(f"Graph exported to JSON format: {output_file}")
             print("You can visualize this JSON with tools like:")
             print("- NetworkX (Python)")
@@ -0,0 +1,236 @@
+# Immutable, memory-mappable graph snapshots.
+#
+# The file is a fixed header followed by flat sections: a string table (offsets + UTF-8 blob),
+# one fixed-width record of uint32 fields per node, forward CSR adjacency with the edge weights,
+# reverse CSR adjacency, and the declared nodes sorted by key for binary search. `MappedGraph` opens it with mmap and reads
+# records in place, so worker processes opening the same file share its physical pages and
+# lookups never deserialize the whole graph.
+import mmap
+from array import array
+from typing import List, NamedTuple, Optional
+
+from graph.core import StringPool, KIND_FUNCTION, KIND_VARIABLE
+from graph.knowledge_graph import KnowledgeGraph
+
+MAGIC = b"KGMAP\x00\x00\x01"
+MAPPED_VERSION = 2 # 2: adds out_weights
+BYTE_ORDER_MARK = 0x0102030405060708
+
+# Node record layout (uint32 fields)
+F_KEY, F_URI, F_NAME, F_CODE, F_CONTEXT, F_KIND, F_LINE, F_CHARACTER, F_CODE_LINE, F_DECLARED = range(10)
+NODE_FIELDS = 10
+
+SECTIONS = ("str_offsets", "str_blob", "nodes", "out_offsets", "out_targets", "out_weights", "in_offsets", "in_targets", "key_order")
+# magic, then uint64: version, byte order mark, node count, string count, base uri string, (offset, size) per section
+HEADER_WORDS = 5 + 2 * len(SECTIONS)
+HEADER_SIZE = len(MAGIC) + 8 * HEADER_WORDS
+
+
+class MappedNode(NamedTuple):
+    key: str
+    name: str
+    uri: str
+    kind: int
+    line: int
+    character: int
+    code: str
+    code_line: int
+    context: str
+    declared: bool
+
+    @property
+    def type(self) -> str:
+        return {KIND_FUNCTION: "Function", KIND_VARIABLE: "Variable"}.get(self.kind, "Location")
+
+
+def _pad(size: int) -> int:
+    return (8 - size % 8) % 8
+
+
+def write_mapped(graph: KnowledgeGraph, output_file: str):
+    """Write `graph` in the memory-mappable layout read by `MappedGraph`."""
+    core = graph.core
+    strings = StringPool()
+    base_uri = strings.intern(graph.base_uri)
+    nodes = array('I')
+    for node, decl in enumerate(graph.nodes):
+        code_block = getattr(decl, 'code_block', None)
+        index = graph.indexes[node]
+        nodes.extend((
+            strings.intern(decl.key()),
+            strings.intern(decl.uri),
+            strings.intern(getattr(decl, 'name', '')),
+            strings.intern(str(code_block) if code_block is not None else ""),
+            strings.intern(index.context if index is not None else ""),
+            core.node_kind[node],
+            core.node_line[node],
+            core.node_character[node],
+            code_block.base_line_number if code_block is not None else 0,
+            core.declared[node],
+        ))
+
+    encoded = [s.encode('utf-8') for s in strings.strings]
+    str_offsets = array('Q', [0])
+    for data in encoded:
+        str_offsets.append(str_offsets[-1] + len(data))
+    out_offsets, out_targets = core.csr()
+    in_offsets, in_targets = core.csr(reverse=True)
+    declared_nodes = [node for node in range(len(core)) if core.declared[node]]
+    key_order = array('I', sorted(declared_nodes, key=lambda node: encoded[nodes[node * NODE_FIELDS + F_KEY]]))
+
+    sections = {
+        "str_offsets": str_offsets.tobytes(),
+        "str_blob": b"".join(encoded),
+        "nodes": nodes.tobytes(),
+        "out_offsets": out_offsets.tobytes(),
+        "out_targets": out_targets.tobytes(),
+        "out_weights": core.csr_weights().tobytes(),
+        "in_offsets": in_offsets.tobytes(),
+        "in_targets": in_targets.tobytes(),
+        "key_order": key_order.tobytes(),
+    }
+    header = array('Q', [MAPPED_VERSION, BYTE_ORDER_MARK, len(core), len(strings), base_uri])
+    offset = HEADER_SIZE
+    for name in SECTIONS:
+        header.extend((offset, len(sections[name])))
+        offset += len(sections[name]) + _pad(len(sections[name]))
+
+    with open(output_file, 'wb') as f:
+        f.write(MAGIC)
+        f.write(header.tobytes())
+        for name in SECTIONS:
+            f.write(sections[name])
+            f.write(b"\x00" * _pad(len(sections[name])))
+
+
+class MappedGraph:
+    """
+    Read-only view of a file written by `write_mapped`.
+
+    Opening maps the file and validates the header; nothing else is read until a lookup
+    touches it. Keys are found by binary search over the sorted key order, and adjacency is
+    read from the CSR sections, so every query costs O(log n + result).
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a mapped graph snapshot")
+        header = memoryview(self._mm)[len(MAGIC):HEADER_SIZE].cast('Q')
+        version, byte_order, self.node_count, self.string_count, base_uri = header[:5]
+        if version != MAPPED_VERSION:
+            raise ValueError(f"Unsupported mapped snapshot version: {version}")
+        if byte_order != BYTE_ORDER_MARK:
+            raise ValueError(f"{path} was written on a host with a different byte order")
+
+        sections = {}
+        for i, name in enumerate(SECTIONS):
+            offset, size = header[5 + 2 * i], header[6 + 2 * i]
+            sections[name] = memoryview(self._mm)[offset:offset + size]
+        header.release()
+        self._str_offsets = sections["str_offsets"].cast('Q')
+        self._str_blob = sections["str_blob"]
+        self._nodes = sections["nodes"].cast('I')
+        self._out_offsets = sections["out_offsets"].cast('I')
+        self._out_targets = sections["out_targets"].cast('I')
+        self._out_weights = sections["out_weights"].cast('I')
+        self._in_offsets = sections["in_offsets"].cast('I')
+        self._in_targets = sections["in_targets"].cast('I')
+        self._key_order = sections["key_order"].cast('I')
+        self.base_uri = self._string(base_uri)
+
+    def _string_bytes(self, string_id: int) -> memoryview:
+        return self._str_blob[self._str_offsets[string_id]:self._str_offsets[string_id + 1]]
+
+    def _string(self, string_id: int) -> str:
+        return str(self._string_bytes(string_id), 'utf-8')
+
+    def _field(self, node: int, field: int) -> int:
+        return self._nodes[node * NODE_FIELDS + field]
+
+    def node_id(self, key: str) -> Optional[int]:
+        """Binary search the sorted key order for `key`."""
+        target = key.encode('utf-8')
+        lo, hi = 0, len(self._key_order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            node = self._key_order[mid]
+            candidate = self._string_bytes(self._field(node, F_KEY))
+            if candidate == target:
+                return node
+            if bytes(candidate) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def node(self, node: int) -> MappedNode:
+        fields = self._nodes[node * NODE_FIELDS:(node + 1) * NODE_FIELDS]
+        return MappedNode(
+            key=self._string(fields[F_KEY]),
+            name=self._string(fields[F_NAME]),
+            uri=self._string(fields[F_URI]),
+            kind=fields[F_KIND],
+            line=fields[F_LINE],
+            character=fields[F_CHARACTER],
+            code=self._string(fields[F_CODE]),
+            code_line=fields[F_CODE_LINE],
+            context=self._string(fields[F_CONTEXT]),
+            declared=bool(fields[F_DECLARED]),
+        )
+
+    def get(self, key: str) -> Optional[MappedNode]:
+        node = self.node_id(key)
+        return self.node(node) if node is not None else None
+
+    def __contains__(self, key: str) -> bool:
+        return self.node_id(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._key_order)
+
+    def keys(self) -> List[str]:
+        return [self._string(self._field(node, F_KEY)) for node in self._key_order]
+
+    def _neighbours(self, key: str, reverse: bool) -> List[str]:
+        node = self.node_id(key)
+        if node is None:
+            return []
+        offsets, targets = (self._in_offsets, self._in_targets) if reverse else (self._out_offsets, self._out_targets)
+        result = []
+        for i in range(offsets[node], offsets[node + 1]):
+            other = targets[i]
+            if self._field(other, F_DECLARED):
+                result.append(self._string(self._field(other, F_KEY)))
+        return result
+
+    def dependencies(self, key: str) -> List[str]:
+        """Keys of the direct dependencies of `key`."""
+        return self._neighbours(key, reverse=False)
+
+    def dependents(self, key: str) -> List[str]:
+        """Keys of the declarations that directly depend on `key`."""
+        return self._neighbours(key, reverse=True)
+
+    def weight(self, src: str, dst: str) -> int:
+        """Reference count of the edge `src` -> `dst`, 0 if there is none."""
+        src_node, dst_node = self.node_id(src), self.node_id(dst)
+        if src_node is None or dst_node is None:
+            return 0
+        for i in range(self._out_offsets[src_node], self._out_offsets[src_node + 1]):
+            if self._out_targets[i] == dst_node:
+                return self._out_weights[i]
+        return 0
+
+    def close(self):
+        for name in ("_str_offsets", "_str_blob", "_nodes", "_out_offsets", "_out_targets", "_out_weights",
+                     "_in_offsets", "_in_targets", "_key_order"):
+            getattr(self, name).release()
+        self._mm.close()
+
+    def __enter__(self) -> 'MappedGraph':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
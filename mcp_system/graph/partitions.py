@@ -0,0 +1,213 @@
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+import ormsgpack
+
+from graph.knowledge_graph import KnowledgeGraph, Function, Variable, Index
+from graph.snapshot import save_snapshot, load_snapshot
+
+INDEX_FILE = "index.msgpack"
+INDEX_VERSION = 2 # 2: cross-partition edges carry their weight
+# Rough resident cost of a loaded partition, used for the LRU memory budget
+NODE_OVERHEAD_BYTES = 800
+EDGE_OVERHEAD_BYTES = 60
+
+
+def key_uri(key: str) -> str:
+    """Return the URI part of a declaration key (`<uri>:<line>:<character>`)."""
+    return key.rsplit(':', 2)[0]
+
+
+def partition_name(uri: str, base_uri: str, depth: Optional[int] = None) -> str:
+    """
+    Name of the partition holding `uri`: its directory relative to `base_uri`, optionally
+    truncated to the first `depth` components (e.g. depth=1 groups by top-level package).
+    """
+    relative = uri[len(base_uri):] if uri.startswith(base_uri) else uri
+    parts = [part for part in relative.split('/') if part][:-1]
+    if depth is not None:
+        parts = parts[:depth]
+    return '/'.join(parts) or '.'
+
+
+def write_partitions(graph: KnowledgeGraph, directory: str, depth: Optional[int] = None, compress: bool = True) -> Dict[str, int]:
+    """
+    Persist `graph` as one snapshot per package/module directory plus a global index.
+
+    Each partition holds its own declarations and the edges between them. Edges that cross
+    partitions are stored once, with their weight, in the global index, so any partition can
+    be loaded alone.
+
+    Args:
+        graph: The graph to persist
+        directory: Output directory (created if needed)
+        depth: Directory depth used to group modules into partitions, None for the full directory
+        compress: Wrap partition snapshots in zstd frames when available
+
+    Returns:
+        Number of declarations per partition
+    """
+    os.makedirs(directory, exist_ok=True)
+    core = graph.core
+    declared = core.declared
+
+    partition_of: Dict[int, str] = {}
+    for node, decl in enumerate(graph.nodes):
+        if declared[node]:
+            partition_of[node] = partition_name(decl.uri, graph.base_uri, depth)
+
+    # Copy declarations into per-partition graphs
+    parts: Dict[str, KnowledgeGraph] = {}
+    copies: Dict[int, Union[Function, Variable]] = {}
+    for node, name in partition_of.items():
+        part = parts.get(name)
+        if part is None:
+            part = parts[name] = KnowledgeGraph(base_uri=graph.base_uri, partial=graph.partial)
+        decl = graph.nodes[node]
+        context = decl.index.context if decl.index else ""
+        if isinstance(decl, Function):
+            copy = Function(uri=decl.uri, position=decl.position, name=decl.name, code_block=decl.code_block)
+        else:
+            copy = Variable(uri=decl.uri, position=decl.position, name=getattr(decl, 'name', ''))
+        copy.index = Index(name=copy.name, location=copy, context=context)
+        copies[node] = copy
+
+    cross_edges: List[Tuple[str, str, int]] = []
+    for node, name in partition_of.items():
+        copy = copies[node]
+        for dep in core.successors(node):
+            if not declared[dep]:
+                continue
+            if partition_of[dep] == name and isinstance(copy, Function):
+                parts[name].add_dependency(copy, copies[dep].index, core.weight(node, dep))
+            else:
+                cross_edges.append((copy.key(), copies[dep].key(), core.weight(node, dep)))
+        parts[name].add_decl(copy)
+
+    files, sizes = {}, {}
+    for i, (name, part) in enumerate(sorted(parts.items())):
+        files[name] = f"{i:05d}.snapshot"
+        save_snapshot(part, os.path.join(directory, files[name]), compress=compress)
+        code_bytes = sum(len(str(d.code_block)) for d in part.decl_map.values() if isinstance(d, Function))
+        sizes[name] = code_bytes + NODE_OVERHEAD_BYTES * len(part.core) + EDGE_OVERHEAD_BYTES * part.core.num_edges
+
+    index = {
+        "version": INDEX_VERSION,
+        "base_uri": graph.base_uri,
+        "depth": depth,
+        "files": files,
+        "sizes": sizes,
+        "cross_edges": cross_edges,
+    }
+    with open(os.path.join(directory, INDEX_FILE), 'wb') as f:
+        f.write(ormsgpack.packb(index))
+    return {name: len(part.decl_map) for name, part in parts.items()}
+
+
+class PartitionedGraph:
+    """
+    Read side of `write_partitions`: serves queries over a partitioned graph while keeping
+    only recently used partitions in memory.
+
+    Only the global index (partition list and cross-partition edges) is loaded up front.
+    A partition is loaded the first time a query touches one of its declarations and is
+    evicted, least recently used first, when the estimated resident size of loaded
+    partitions exceeds `memory_budget` bytes. The partition in use is never evicted.
+    """
+    def __init__(self, directory: str, memory_budget: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.memory_budget = memory_budget
+        with open(os.path.join(directory, INDEX_FILE), 'rb') as f:
+            index = ormsgpack.unpackb(f.read())
+        if index.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported partition index version: {index.get('version')}")
+        self.base_uri = index["base_uri"]
+        self.depth = index["depth"]
+        self.files: Dict[str, str] = index["files"]
+        self.sizes: Dict[str, int] = index["sizes"]
+        self.cross_out: Dict[str, List[str]] = {}
+        self.cross_in: Dict[str, List[str]] = {}
+        self.cross_weights: Dict[Tuple[str, str], int] = {}
+        for src, dst, weight in index["cross_edges"]:
+            self.cross_out.setdefault(src, []).append(dst)
+            self.cross_in.setdefault(dst, []).append(src)
+            self.cross_weights[(src, dst)] = weight
+        self._loaded: "OrderedDict[str, KnowledgeGraph]" = OrderedDict()
+        self.resident_bytes = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def partition_of(self, key: str) -> str:
+        return partition_name(key_uri(key), self.base_uri, self.depth)
+
+    def partition(self, name: str) -> Optional[KnowledgeGraph]:
+        """Return the loaded partition `name`, loading it (and evicting others) if needed."""
+        part = self._loaded.get(name)
+        if part is not None:
+            self._loaded.move_to_end(name)
+            return part
+        filename = self.files.get(name)
+        if filename is None:
+            return None
+
+        part = load_snapshot(os.path.join(self.directory, filename))
+        self.loads += 1
+        self._loaded[name] = part
+        self.resident_bytes += self.sizes[name]
+        while self.resident_bytes > self.memory_budget and len(self._loaded) > 1:
+            evicted, _ = self._loaded.popitem(last=False)
+            self.resident_bytes -= self.sizes[evicted]
+            self.evictions += 1
+        return part
+
+    def get(self, key: str) -> Optional[Union[Function, Variable]]:
+        part = self.partition(self.partition_of(key))
+        return part.decl_map.get(key) if part is not None else None
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def dependencies(self, key: str) -> List[str]:
+        """Keys of the direct dependencies of `key`, across partitions."""
+        decl = self.get(key)
+        if decl is None:
+            return []
+        keys = [dep.key() for dep in decl.dependencies] if isinstance(decl, Function) else []
+        return keys + self.cross_out.get(key, [])
+
+    def weight(self, src: str, dst: str) -> int:
+        """Reference count of the edge `src` -> `dst`, 0 if there is none."""
+        weight = self.cross_weights.get((src, dst))
+        if weight is not None:
+            return weight
+        part = self.partition(self.partition_of(src))
+        if part is None:
+            return 0
+        src_node, dst_node = part.node_of_key(src), part.node_of_key(dst)
+        return part.core.weight(src_node, dst_node) if src_node is not None and dst_node is not None else 0
+
+    def dependents(self, key: str) -> List[str]:
+        """Keys of the declarations that directly depend on `key`, across partitions."""
+        part = self.partition(self.partition_of(key))
+        if part is None:
+            return []
+        return [d.key() for d in part.dependents(key)] + self.cross_in.get(key, [])
+
+    def impact(self, key: str, max_depth: Optional[int] = None) -> List[str]:
+        """Keys of everything that transitively depends on `key`, nearest first."""
+        visited = {key}
+        frontier = [key]
+        result = []
+        depth = 0
+        while frontier and (max_depth is None or depth < max_depth):
+            next_frontier = []
+            for current in frontier:
+                for dependent in self.dependents(current):
+                    if dependent not in visited:
+                        visited.add(dependent)
+                        next_frontier.append(dependent)
+            result.extend(next_frontier)
+            frontier = next_frontier
+            depth += 1
+        return result
@@ -0,0 +1,250 @@
+from collections import deque
+from typing import Callable, Dict, Hashable, List, Optional, Tuple, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from graph.knowledge_graph import KnowledgeGraph, Function, Variable
+
+
+class GraphQuery:
+    """
+    Memoized analyses over a `KnowledgeGraph`.
+
+    Every query runs on the integer core and caches its answer as a tuple of node IDs.
+    The whole memo is dropped as soon as the graph's core version changes, so repeated
+    questions are answered from the cache until the next mutation.
+
+    Placeholder nodes (referenced but never declared) are traversed but not returned.
+    """
+    def __init__(self, graph: 'KnowledgeGraph'):
+        self.graph = graph
+        self._memo: Dict[Hashable, object] = {}
+        self._version = -1
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key: Hashable, compute: Callable[[], object]):
+        if self._version != self.graph.core.version:
+            self._memo.clear()
+            self._version = self.graph.core.version
+        if key in self._memo:
+            self.hits += 1
+            return self._memo[key]
+        self.misses += 1
+        value = self._memo[key] = compute()
+        return value
+
+    def _decls(self, nodes) -> List[Union['Function', 'Variable']]:
+        declared = self.graph.core.declared
+        return [self.graph.nodes[n] for n in nodes if declared[n]]
+
+    def dependencies(self, key: str, depth: Optional[int] = None) -> List[Union['Function', 'Variable']]:
+        """Transitive dependencies of `key` up to `depth` hops, nearest first."""
+        return self._decls(self._cached(("dependencies", key, depth), lambda: self._reach(key, depth, reverse=False)))
+
+    def dependents(self, key: str, depth: Optional[int] = None) -> List[Union['Function', 'Variable']]:
+        """Transitive dependents of `key` up to `depth` hops, nearest first."""
+        return self._decls(self._cached(("dependents", key, depth), lambda: self._reach(key, depth, reverse=True)))
+
+    def _reach(self, key: str, depth: Optional[int], reverse: bool) -> Tuple[int, ...]:
+        start = self.graph.node_of_key(key)
+        if start is None:
+            return ()
+        neighbours = self.graph.core.predecessors if reverse else self.graph.core.successors
+        visited = {start}
+        frontier = [start]
+        result = []
+        level = 0
+        while frontier and (depth is None or level < depth):
+            next_frontier = []
+            for node in frontier:
+                for nxt in neighbours(node):
+                    if nxt not in visited:
+                        visited.add(nxt)
+                        next_frontier.append(nxt)
+            result.extend(next_frontier)
+            frontier = next_frontier
+            level += 1
+        return tuple(result)
+
+    def call_path(self, source_key: str, target_key: str) -> Optional[List[Union['Function', 'Variable']]]:
+        """
+        Shortest chain of calls from `source_key` to `target_key`, both ends included.
+
+        Returns:
+            The declarations along the path, or None if `target_key` is unreachable
+        """
+        path = self._cached(("call_path", source_key, target_key), lambda: self._shortest_path(source_key, target_key))
+        return [self.graph.nodes[n] for n in path] if path is not None else None
+
+    def _shortest_path(self, source_key: str, target_key: str) -> Optional[Tuple[int, ...]]:
+        source = self.graph.node_of_key(source_key)
+        target = self.graph.node_of_key(target_key)
+        if source is None or target is None:
+            return None
+        parent = {source: source}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            if node == target:
+                path = [node]
+                while node != source:
+                    node = parent[node]
+                    path.append(node)
+                return tuple(reversed(path))
+            for nxt in self.graph.core.successors(node):
+                if nxt not in parent:
+                    parent[nxt] = node
+                    queue.append(nxt)
+        return None
+
+    def find(self, name: str) -> List[Union['Function', 'Variable']]:
+        """
+        Declarations matching `name`: a declaration key, a bare name (`handler`), or a name
+        qualified by the end of its file path (`api/views.py:handler`). Canonical order.
+        """
+        decl = self.graph.decl_map.get(name)
+        if decl is not None:
+            return [decl]
+        path, _, bare = name.rpartition(':')
+        names = self._cached("names", self._names)
+        return [decl for decl in self._decls(names.get(bare, ())) if not path or decl.uri.endswith('/' + path.lstrip('/'))]
+
+    def _names(self) -> Dict[str, Tuple[int, ...]]:
+        core = self.graph.core
+        strings = core.strings.strings
+        names: Dict[str, List[int]] = {}
+        for node in self.graph.canonical_order():
+            names.setdefault(strings[core.node_name[node]], []).append(node)
+        return {name: tuple(nodes) for name, nodes in names.items()}
+
+    def module_dependencies(self, module_depth: Optional[int] = None) -> Dict[Tuple[str, str], int]:
+        """
+        Dependencies aggregated between modules: (module, dependency module) -> number of
+        declaration-level edges. Modules are files relative to the graph's base URI, or
+        package directories of `module_depth` components (see `graph.dot.module_name`).
+        """
+        return self._cached(("modules", module_depth), lambda: self._module_dependencies(module_depth))
+
+    def _module_dependencies(self, module_depth: Optional[int]) -> Dict[Tuple[str, str], int]:
+        from graph.dot import module_name
+        graph = self.graph
+        declared = graph.core.declared
+        modules = {node: module_name(graph.nodes[node].uri, graph.base_uri, module_depth) for node in graph.canonical_order()}
+        counts: Dict[Tuple[str, str], int] = {}
+        for node, module in modules.items():
+            for dep in graph.core.successors(node):
+                if declared[dep] and modules[dep] != module:
+                    edge = (module, modules[dep])
+                    counts[edge] = counts.get(edge, 0) + 1
+        return counts
+
+    def strongly_connected_components(self, min_size: int = 2) -> List[List[Union['Function', 'Variable']]]:
+        """
+        Strongly connected components (mutually recursive groups) of at least `min_size` declarations.
+        Components are listed dependencies first.
+        """
+        components = self._cached("scc", self._tarjan)
+        result = []
+        for component in components:
+            decls = self._decls(component)
+            if len(decls) >= min_size:
+                result.append(decls)
+        return result
+
+    def topological_levels(self) -> List[List[Union['Function', 'Variable']]]:
+        """
+        Group declarations by dependency depth: level 0 has no dependencies and every other
+        declaration sits one level above its deepest dependency. Members of a cycle share a level.
+        """
+        return [self._decls(level) for level in self._cached("levels", self._levels)]
+
+    def pagerank(self, weighted: bool = True) -> Dict[str, float]:
+        """
+        PageRank of every declaration, keyed by declaration key, highest first. Edges are
+        weighted by reference count unless `weighted` is False (see graph/centrality.py).
+        """
+        from graph.centrality import pagerank
+        return self._cached(("pagerank", weighted), lambda: self._scores(pagerank(self.graph.core, weighted=weighted)))
+
+    def in_degree(self, weighted: bool = True) -> Dict[str, float]:
+        """Number of references to every declaration (or of distinct callers if not `weighted`), highest first."""
+        from graph.centrality import in_degree
+        return self._cached(("in_degree", weighted), lambda: self._scores(in_degree(self.graph.core, weighted=weighted)))
+
+    def _scores(self, values) -> Dict[str, float]:
+        # Ties keep canonical order so rankings do not depend on scan order
+        nodes = sorted(self.graph.canonical_order(), key=lambda node: values[node], reverse=True)
+        return {self.graph.nodes[node].key(): float(values[node]) for node in nodes}
+
+    def _levels(self) -> Tuple[Tuple[int, ...], ...]:
+        components = self._cached("scc", self._tarjan)
+        component_of = {}
+        for component_id, component in enumerate(components):
+            for node in component:
+                component_of[node] = component_id
+
+        successors = self.graph.core.successors
+        component_level = [0] * len(components)
+        levels: List[List[int]] = []
+        # Tarjan emits components after everything they reach, so dependencies come first
+        for component_id, component in enumerate(components):
+            level = 0
+            for node in component:
+                for nxt in successors(node):
+                    other = component_of[nxt]
+                    if other != component_id:
+                        level = max(level, component_level[other] + 1)
+            component_level[component_id] = level
+            while len(levels) <= level:
+                levels.append([])
+            levels[level].extend(component)
+        return tuple(tuple(level) for level in levels)
+
+    def _tarjan(self) -> Tuple[Tuple[int, ...], ...]:
+        """Iterative Tarjan's algorithm over the core adjacency."""
+        offsets, targets = self.graph.core.csr()
+        n = len(offsets) - 1
+        index = [-1] * n
+        lowlink = [0] * n
+        on_stack = bytearray(n)
+        stack: List[int] = []
+        components: List[Tuple[int, ...]] = []
+        counter = 0
+
+        for root in range(n):
+            if index[root] != -1:
+                continue
+            work = [(root, offsets[root])]
+            index[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = 1
+            while work:
+                node, edge = work[-1]
+                if edge < offsets[node + 1]:
+                    work[-1] = (node, edge + 1)
+                    nxt = targets[edge]
+                    if index[nxt] == -1:
+                        index[nxt] = lowlink[nxt] = counter
+                        counter += 1
+                        stack.append(nxt)
+                        on_stack[nxt] = 1
+                        work.append((nxt, offsets[nxt]))
+                    elif on_stack[nxt]:
+                        lowlink[node] = min(lowlink[node], index[nxt])
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(tuple(component))
+        return tuple(components)
@@ -1,36 +1,221 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlparse, unquote
+
 from graph.knowledge_graph import KnowledgeGraph, Symbol, Function, Index
 from graph.document import Document
+from graph.imports import ImportPrefilter, DEFAULT_EXCLUDE
 from servers.lsp.servers import PythonLangServer
 
 class Scanner:
-    def __init__(self, lsp):
-        self.graph = KnowledgeGraph(base_uri=lsp.root_uri)
+    def __init__(self, lsp, exclude: Iterable[str] = DEFAULT_EXCLUDE, graph: Optional[KnowledgeGraph] = None):
+        self.graph = graph if graph is not None else KnowledgeGraph(base_uri=lsp.root_uri)
         self.lsp = lsp
+        self.prefilter = ImportPrefilter(lsp.root_uri, exclude=exclude)
+        for root in lsp.workspace_roots:
+            self.prefilter.add_search_root(root)
+            self.prefilter.add_search_root(f"{root}/src")
+        self.scanned: Set[str] = set() # uris of documents whose functions have all been scanned
+        if graph is not None: # extending an existing graph: its documents count as scanned
+            self.scanned.update(decl.uri for decl in graph.decl_map.values())
+        self.frontier: Deque[Tuple[str, int]] = deque() # (uri, depth) pending documents of a bounded scan
+        self._queued: Set[str] = set()
+        self._lock = threading.RLock() # guards the graph and bookkeeping; LSP calls run outside of it
 
     def scan(self, entry_point: Document):
-        if entry_point.uri in self.graph.docs_map:
-            return
-        self.graph.docs_map[entry_point.uri] = entry_point
-        for node in entry_point.values():
-            if isinstance(node, Function):
-                for symbol in node.code_block:
-                    if not self.isinternal(symbol):
-                        continue
-                    if symbol.decl.uri not in self.graph.docs_map:
-                        self.scan(Document(filepath=symbol.decl.uri, lsp=self.lsp))
-                    definition = self.graph.docs_map[symbol.decl.uri].get(symbol.decl.key())
-                    if definition and isinstance(definition, Function):
-                        if definition.key() == node.key():
-                            continue
-                        if definition.index: # TODO -- FIXME:if the definition is in the same document, chances are the definition is not scanned yet (not indexed yet)
-                            node.add_dependency(definition.index)
-                node.index = Index(name=node.name, location=node, context="") # TODO: build context with code block and dependencies
-                self.graph.add_decl(node)
-
-        print("BOWEN YANG DEBUG", self.graph.to_json())
+        with self._lock:
+            if entry_point.uri in self.scanned:
+                return
+            self.graph.docs_map.setdefault(entry_point.uri, entry_point)
+            self.scanned.add(entry_point.uri)
+        for node in list(entry_point.values()):
+            if isinstance(node, Function) and node.key() not in self.graph.decl_map:
+                self._scan_function(node, visit=self._visit_recursive)
+
+    def rescan(self, uri: str) -> List[str]:
+        """
+        Bring the graph up to date with one changed document: drop its declarations and, if
+        it still exists, scan it again. Edges that other documents had into its declarations
+        follow each one by name (the position may have moved); edges into declarations that
+        are gone are kept on their placeholder.
+
+        Args:
+            uri: URI of the changed (or deleted) document
+
+        Returns:
+            Keys of the declarations that were removed and not declared again
+        """
+        core = self.graph.core
+        with self._lock:
+            uri_id = core.strings.get(uri)
+            old_nodes = [node for node in range(len(core)) if uri_id is not None
+                         and core.node_uri[node] == uri_id and core.declared[node]]
+            incoming = {node: (core.node_name[node], core.remove_in_edges(node)) for node in old_nodes}
+            removed = self.graph.remove_document(uri)
+            self.scanned.discard(uri)
+        if Path(unquote(urlparse(uri).path)).exists():
+            self.scan(self._document(uri))
+
+        with self._lock:
+            uri_id = core.strings.get(uri)
+            redeclared: Dict[int, List[int]] = {}
+            for node in range(len(core)):
+                if core.node_uri[node] == uri_id and core.declared[node]:
+                    redeclared.setdefault(core.node_name[node], []).append(node)
+            for node, (name, edges) in incoming.items():
+                candidates = redeclared.get(name, [])
+                target = candidates[0] if len(candidates) == 1 else node
+                for src, weight in edges:
+                    if src != target and src not in incoming: # edges within the document were re-scanned
+                        core.add_edge(src, target, weight)
+            return [key for key in removed if key not in self.graph.decl_map]
+
+    def scan_many(self, entry_points: Iterable[str], max_workers: int = 4) -> KnowledgeGraph:
+        """
+        Fully scan several entry points, one worker per sub-project, into the shared graph.
+
+        With a `WorkspaceLangServers` backend each sub-project is served by its own language
+        server, so packages are scanned in parallel (at most `max_workers` at a time) and
+        edges that cross package boundaries land in the same merged graph.
+
+        Args:
+            entry_points: Paths or URIs of the documents to start from
+            max_workers: Maximum number of sub-projects scanned concurrently
+
+        Returns:
+            The merged knowledge graph
+        """
+        groups: Dict[str, List[str]] = {}
+        for uri in entry_points:
+            groups.setdefault(self.lsp.root_for(uri), []).append(uri)
+
+        def scan_group(uris: List[str]):
+            for uri in uris:
+                self.scan(self._document(uri))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(scan_group, groups.values()))
+        return self.graph
+
+    def scan_bounded(
+        self,
+        entry_point: Optional[Document] = None,
+        max_depth: Optional[int] = None,
+        max_documents: Optional[int] = None,
+        time_budget: Optional[float] = None,
+    ) -> KnowledgeGraph:
+        """
+        Breadth-first scan from `entry_point` that stops once any budget is exhausted.
+
+        Documents left unscanned stay in `self.frontier` and the graph is marked as partial.
+        Calling this method again (with or without a new entry point) resumes from the
+        frontier and extends the same graph.
+
+        Args:
+            entry_point: Document to start from, or None to only resume the pending frontier
+            max_depth: Maximum number of document hops from the entry point
+            max_documents: Maximum number of documents scanned by this call
+            time_budget: Wall-clock budget of this call in seconds
+
+        Returns:
+            The (possibly partial) knowledge graph
+        """
+        deadline = time.monotonic() + time_budget if time_budget is not None else None
+        if entry_point is not None:
+            with self._lock:
+                self.graph.docs_map.setdefault(entry_point.uri, entry_point)
+            self._enqueue(entry_point.uri, depth=0)
+
+        too_deep: Deque[Tuple[str, int]] = deque()
+        scanned_count = 0
+        while self.frontier:
+            if max_documents is not None and scanned_count >= max_documents:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            uri, depth = self.frontier[0]
+            if uri in self.scanned: # scanned meanwhile by a full scan
+                self.frontier.popleft()
+                self._queued.discard(uri)
+                continue
+            if max_depth is not None and depth > max_depth:
+                too_deep.append(self.frontier.popleft())
+                continue
+
+            completed = True
+            for node in self.graph.docs_map[uri].values():
+                if not isinstance(node, Function) or node.key() in self.graph.decl_map:
+                    continue
+                if deadline is not None and time.monotonic() >= deadline:
+                    completed = False # resume this document from its next unscanned function
+                    break
+                self._scan_function(node, visit=lambda dep_uri: self._enqueue(dep_uri, depth + 1))
+            if not completed:
+                break
+
+            self.frontier.popleft()
+            self._queued.discard(uri)
+            self.scanned.add(uri)
+            scanned_count += 1
+
+        self.frontier.extend(too_deep)
+        self.graph.partial = bool(self.frontier)
+        return self.graph
+
+    def _scan_function(self, node: Function, visit: Callable[[str], Document]):
+        node.code_block.skip_names = self.prefilter.external_names(node.uri)
+        node.code_block.skipped = 0
+        for symbol in node.code_block:
+            if not self.isinternal(symbol):
+                continue
+            definition = visit(symbol.decl.uri).get(symbol.decl.key())
+            if definition and isinstance(definition, Function):
+                if definition.key() == node.key():
+                    continue
+                # Index lazily so definitions that are not scanned yet (same document, cycles,
+                # bounded scans) still get their edge
+                with self._lock:
+                    self.graph.add_dependency(node, self._index(definition))
+        with self._lock:
+            self.prefilter.skipped += node.code_block.skipped
+            self._index(node) # TODO: build context with code block and dependencies
+            self.graph.add_decl(node)
+
+    def _index(self, node: Function) -> Index:
+        if node.index is None:
+            node.index = Index(name=node.name, location=node, context="")
+        return node.index
+
+    def _document(self, uri: str) -> Document:
+        with self._lock:
+            doc = self.graph.docs_map.get(uri)
+        if doc is None:
+            # Loading asks the language server for the symbols, so it runs unlocked; if two
+            # threads load the same document, the first one stored wins
+            doc = Document(filepath=uri, lsp=self.lsp)
+            with self._lock:
+                doc = self.graph.docs_map.setdefault(uri, doc)
+        return doc
+
+    def _visit_recursive(self, uri: str) -> Document:
+        doc = self._document(uri)
+        self.scan(doc)
+        return doc
+
+    def _enqueue(self, uri: str, depth: int) -> Document:
+        doc = self._document(uri)
+        with self._lock:
+            if uri not in self.scanned and uri not in self._queued:
+                self._queued.add(uri)
+                self.frontier.append((uri, depth))
+        return doc
 
     def isinternal(self, symbol: Symbol):
-        return symbol.decl.uri.startswith(self.lsp.root_uri) and symbol.decl.uri.find(".venv") == -1
+        return symbol.decl.uri.startswith(self.lsp.root_uri) and not self.prefilter.is_excluded(symbol.decl.uri)
 
 if __name__ == "__main__":
     # pylsp = PythonLangServer("/Users/nahemah1022/NVIDIA/proj/aistore")
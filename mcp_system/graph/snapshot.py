@@ -0,0 +1,143 @@
+# Compact binary snapshots of a KnowledgeGraph.
+#
+# A snapshot is one msgpack map. Node attributes are stored column-wise (numeric columns as
+# raw `array` bytes) and edges as the CSR arrays of the graph core, so loading is mostly
+# `array.frombytes`. With `zstandard` installed the payload is wrapped in a zstd frame,
+# which `load_snapshot` detects from its magic number.
+from array import array
+from typing import Dict
+
+import ormsgpack
+
+from graph.code_block import CodeBlock
+from graph.core import GraphCore, KIND_FUNCTION, KIND_VARIABLE, KIND_OTHER
+from graph.imports import uri_to_path
+from graph.knowledge_graph import KnowledgeGraph, DependencyView, Function, Variable, Location, Index, Position
+
+try:
+    import zstandard
+except ImportError: # optional: snapshots are written uncompressed without it
+    zstandard = None
+
+SNAPSHOT_VERSION = 1
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def _column(typecode: str, values) -> bytes:
+    return array(typecode, values).tobytes()
+
+
+def _from_column(typecode: str, data: bytes) -> array:
+    column = array(typecode)
+    column.frombytes(data)
+    return column
+
+
+def snapshot_dict(graph: KnowledgeGraph) -> Dict:
+    """Return the msgpack-ready representation of `graph`."""
+    core = graph.core
+    code, code_line, context = [], [], []
+    for node in graph.nodes:
+        code_block = getattr(node, 'code_block', None)
+        code.append(str(code_block) if code_block is not None else "")
+        code_line.append(code_block.base_line_number if code_block is not None else 0)
+        index = getattr(node, 'index', None)
+        context.append(index.context if index is not None else "")
+
+    offsets, targets = core.csr()
+    return {
+        "version": SNAPSHOT_VERSION,
+        "base_uri": graph.base_uri,
+        "partial": graph.partial,
+        "strings": core.strings.strings,
+        "node_uri": core.node_uri.tobytes(),
+        "node_name": core.node_name.tobytes(),
+        "node_line": core.node_line.tobytes(),
+        "node_character": core.node_character.tobytes(),
+        "node_kind": core.node_kind.tobytes(),
+        "declared": bytes(core.declared),
+        "code": code,
+        "code_line": _column('I', code_line),
+        "context": context,
+        "offsets": offsets.tobytes(),
+        "targets": targets.tobytes(),
+        "weights": core.csr_weights().tobytes(),
+    }
+
+
+def save_snapshot(graph: KnowledgeGraph, output_file: str, compress: bool = True):
+    """
+    Write `graph` to `output_file` as a msgpack snapshot.
+
+    Args:
+        graph: The graph to persist
+        output_file: Destination path
+        compress: Wrap the payload in a zstd frame (ignored when zstandard is not installed)
+    """
+    payload = ormsgpack.packb(snapshot_dict(graph))
+    if compress and zstandard is not None:
+        payload = zstandard.ZstdCompressor(level=3).compress(payload)
+    with open(output_file, 'wb') as f:
+        f.write(payload)
+
+
+def load_snapshot(snapshot_file: str) -> KnowledgeGraph:
+    """Load a graph written by `save_snapshot`."""
+    with open(snapshot_file, 'rb') as f:
+        payload = f.read()
+    if payload.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError(f"{snapshot_file} is zstd-compressed but the zstandard package is not installed")
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    return graph_from_snapshot_dict(ormsgpack.unpackb(payload))
+
+
+def graph_from_snapshot_dict(data: Dict) -> KnowledgeGraph:
+    if data.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {data.get('version')}")
+
+    core = GraphCore.from_arrays(
+        strings=data["strings"],
+        node_uri=_from_column('I', data["node_uri"]),
+        node_name=_from_column('I', data["node_name"]),
+        node_line=_from_column('I', data["node_line"]),
+        node_character=_from_column('I', data["node_character"]),
+        node_kind=_from_column('B', data["node_kind"]),
+        declared=data["declared"],
+        offsets=_from_column('I', data["offsets"]),
+        targets=_from_column('I', data["targets"]),
+        weights=_from_column('I', data["weights"]) if "weights" in data else None,
+    )
+    strings = core.strings.strings
+    code = data["code"]
+    code_line = _from_column('I', data["code_line"])
+    context = data["context"]
+
+    graph = KnowledgeGraph(base_uri=data["base_uri"], core=core, partial=data["partial"])
+    nodes, indexes, decl_map = graph.nodes, graph.indexes, graph.decl_map
+    paths: Dict[int, str] = {}
+    for node, (uri_id, name_id, line, character, kind) in enumerate(
+        zip(core.node_uri, core.node_name, core.node_line, core.node_character, core.node_kind)
+    ):
+        uri = strings[uri_id]
+        name = strings[name_id]
+        position = Position(line=line, character=character)
+        if kind == KIND_FUNCTION:
+            path = paths.get(uri_id)
+            if path is None:
+                path = paths[uri_id] = str(uri_to_path(uri))
+            code_block = CodeBlock(code[node].split('\n'), None, path, base_line_number=code_line[node])
+            decl = Function(uri=uri, position=position, name=name, code_block=code_block)
+            decl.dependencies = DependencyView(graph, node)
+        elif kind == KIND_VARIABLE:
+            decl = Variable(uri=uri, position=position, name=name)
+        else:
+            decl = Location(uri=uri, position=position)
+        index = None
+        if kind != KIND_OTHER:
+            index = decl.index = Index(name=name, location=decl, context=context[node])
+        nodes.append(decl)
+        indexes.append(index)
+        if core.declared[node]:
+            decl_map[decl.key()] = decl
+    return graph
@@ -0,0 +1,113 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from graph.code_block import CodeBlock
+from graph.imports import ImportPrefilter
+
+
+class RecordingLangServer:
+    """A stand-in for LangServer that records the definition lookups a CodeBlock sends."""
+    separators = set(' \n\t.,!?;(){}[]<>:\'#*/=@')
+    keywords = {"def", "return", "+"}
+    inlie_comment = "#"
+    multiline_comment = ('"""', '"""')
+    string_delimiters = [('"', '"'), ("'", "'")]
+
+    def __init__(self):
+        self.queried = []
+
+    def show_definition(self, line, character, keyword, path):
+        self.queried.append(keyword)
+        return None
+
+
+class TestImportPrefilter(unittest.TestCase):
+
+    def setUp(self):
+        """
+        A project with an `app` package, a `src/` layout package `lib`, an in-repo package
+        named `build` and a virtualenv inside the repository.
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name).resolve()
+        files = {
+            "app/__init__.py": "",
+            "app/sibling.py": "",
+            "app/main.py": (
+                "import os\n"
+                "import numpy as np\n"
+                "import app.sibling as sib\n"
+                "from . import sibling\n"
+                "from .sibling import helper\n"
+                "from lib.core import run\n"
+                "from build.tools import make\n"
+                "from requests import get\n"
+            ),
+            "src/lib/__init__.py": "",
+            "src/lib/core.py": "",
+            "build/__init__.py": "",
+            "build/tools.py": "",
+            ".venv/lib/site-packages/requests/__init__.py": "",
+        }
+        for name, content in files.items():
+            path = self.root / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content)
+        self.main = (self.root / "app" / "main.py").as_uri()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_relative_and_absolute_imports_are_internal(self):
+        names = ImportPrefilter(self.root.as_uri()).external_names(self.main)
+        self.assertNotIn("sib", names)
+        self.assertNotIn("sibling", names)
+        self.assertNotIn("helper", names)
+
+    def test_stdlib_and_third_party_are_external(self):
+        names = ImportPrefilter(self.root.as_uri()).external_names(self.main)
+        self.assertTrue({"os", "np", "get"} <= names)
+
+    def test_src_layout(self):
+        self.assertNotIn("run", ImportPrefilter(self.root.as_uri()).external_names(self.main))
+
+    def test_in_repo_build_package_is_internal_by_default(self):
+        prefilter = ImportPrefilter(self.root.as_uri())
+        self.assertNotIn("make", prefilter.external_names(self.main))
+        self.assertFalse(prefilter.is_excluded((self.root / "build" / "tools.py").as_uri()))
+
+    def test_excluded_imports(self):
+        """Modules found only in excluded locations stay external, even on a search root."""
+        site_packages = self.root / ".venv" / "lib" / "site-packages"
+        prefilter = ImportPrefilter(self.root.as_uri(), search_roots=[str(site_packages)])
+        self.assertTrue(prefilter.is_excluded((site_packages / "requests" / "__init__.py").as_uri()))
+        self.assertIn("get", prefilter.external_names(self.main))
+
+        prefilter = ImportPrefilter(self.root.as_uri(), exclude=("*/build/*",))
+        self.assertIn("make", prefilter.external_names(self.main))
+
+    def test_unreadable_module(self):
+        self.assertEqual(ImportPrefilter(self.root.as_uri()).external_names((self.root / "missing.py").as_uri()), frozenset())
+
+
+class TestChainRoot(unittest.TestCase):
+
+    def test_chain_root(self):
+        line = "y = np.linalg.norm(x)"
+        self.assertEqual(CodeBlock._chain_root(line, line.index("np"), "np", "y"), "np")
+        self.assertEqual(CodeBlock._chain_root(line, line.index("linalg"), "linalg", "np"), "np")
+        self.assertEqual(CodeBlock._chain_root(line, line.index("norm"), "norm", "np"), "np")
+        self.assertEqual(CodeBlock._chain_root(line, line.index("x)"), "x", "np"), "x")
+
+    def test_skipped_chains_are_not_queried(self):
+        lsp = RecordingLangServer()
+        block = CodeBlock(["def f(x):", "    return np.linalg.norm(x) + helper(x)"], lsp, "/repo/a.py", base_line_number=0)
+        block.skip_names = frozenset({"np"})
+        list(block)
+        self.assertEqual(lsp.queried, ["f", "x", "x", "helper", "x"])
+        self.assertEqual(block.skipped, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
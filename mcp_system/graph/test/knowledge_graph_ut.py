@@ -0,0 +1,296 @@
+import json
+import os
+import tempfile
+import unittest
+
+from graph.core import GraphCore
+from graph.knowledge_graph import KnowledgeGraph, Function, Index, Position
+
+
+class FakeCodeBlock:
+    """A stand-in for CodeBlock exposing only the attributes the graph reads."""
+    def __init__(self, lines, base_line_number=0):
+        self.lines = lines
+        self.base_line_number = base_line_number
+
+    def __str__(self):
+        return '\n'.join(self.lines)
+
+
+def make_function(name: str, line: int, uri: str = "file:///repo/a.py", length: int = 2) -> Function:
+    func = Function(
+        uri=uri,
+        position=Position(line=line, character=4),
+        name=name,
+        code_block=FakeCodeBlock([f"def {name}():"] + ["    pass"] * (length - 1), base_line_number=line),
+    )
+    func.index = Index(name=name, location=func, context="")
+    return func
+
+
+class TestKnowledgeGraph(unittest.TestCase):
+
+    def setUp(self):
+        """Build a small call graph: main -> handler -> helper, main -> helper."""
+        self.graph = KnowledgeGraph(base_uri="file:///repo")
+        self.helper = make_function("helper", 0)
+        self.handler = make_function("handler", 3)
+        self.main = make_function("main", 6)
+        for func in (self.helper, self.handler, self.main):
+            self.graph.add_decl(func)
+        self.graph.add_dependency(self.handler, self.helper.index)
+        self.graph.add_dependency(self.main, self.handler.index)
+        self.graph.add_dependency(self.main, self.helper.index)
+
+    def test_dependents(self):
+        names = {decl.name for decl in self.graph.dependents(self.helper.key())}
+        self.assertEqual(names, {"handler", "main"})
+        self.assertEqual(self.graph.dependents(self.main.key()), [])
+
+    def test_dependents_indexed_on_add_decl(self):
+        """Dependencies recorded before add_decl are picked up by the reverse index."""
+        late = make_function("late", 9)
+        late.add_dependency(self.helper.index)
+        self.graph.add_decl(late)
+        self.assertIn("late", {decl.name for decl in self.graph.dependents(self.helper.key())})
+
+    def test_impact(self):
+        self.assertEqual([d.name for d in self.graph.impact(self.helper.key())], ["handler", "main"])
+        self.assertEqual([d.name for d in self.graph.impact(self.handler.key(), max_depth=1)], ["main"])
+
+    def test_dependencies_view(self):
+        """Function.dependencies reads from the integer core and deduplicates in O(1)."""
+        self.graph.add_dependency(self.main, self.helper.index)
+        self.assertEqual([dep.name for dep in self.main.dependencies], ["handler", "helper"])
+        self.assertIn(self.helper.index, self.main.dependencies)
+        self.assertNotIn(self.main.index, self.main.dependencies)
+        self.assertEqual(self.graph.core.num_edges, 3)
+
+    def test_location_key_follows_moves(self):
+        func = make_function("moved", 20)
+        self.assertEqual(func.key(), "file:///repo/a.py:20:4")
+        func.position = Position(line=30, character=4)
+        self.assertEqual(func.key(), "file:///repo/a.py:30:4")
+        func.uri = "file:///repo/b.py"
+        self.assertEqual(func.key(), "file:///repo/b.py:30:4")
+        self.assertEqual(func.index.key(), func.key())
+
+    def test_csr(self):
+        offsets, targets = self.graph.core.csr()
+        main = self.graph.node_of(self.main)
+        successors = targets[offsets[main]:offsets[main + 1]]
+        self.assertEqual({self.graph.nodes[n].name for n in successors}, {"handler", "helper"})
+
+    def test_core_node_ids_and_lazy_adjacency(self):
+        core = GraphCore()
+        wide = core.add_node("file:///repo/a.py", "wide", 0, 2**32 - 1)
+        tall = core.add_node("file:///repo/a.py", "tall", 1, 0)
+        other = core.add_node("file:///repo/b.py", "tall", 1, 0)
+        self.assertEqual(len({wide, tall, other}), 3)
+        self.assertEqual(core.node_id("file:///repo/a.py", 0, 2**32 - 1), wide)
+        self.assertIsNone(core.node_id("file:///repo/a.py", 0, 0))
+        self.assertEqual(core.add_node("file:///repo/b.py", "tall", 1, 0), other)
+
+        self.assertEqual(len(core.successors(wide)), 0)
+        core.add_edge(wide, tall)
+        core.add_edge(wide, other)
+        self.assertEqual(list(core.successors(wide)), [tall, other])
+        self.assertEqual(list(core.predecessors(other)), [wide])
+        core.remove_out_edges(wide)
+        self.assertEqual((len(core.successors(wide)), len(core.predecessors(tall)), core.num_edges), (0, 0, 0))
+        core.add_edge(other, wide, 3)
+        self.assertEqual(core.weight(other, wide), 3)
+        offsets, targets = core.csr()
+        self.assertEqual((list(offsets), list(targets)), ([0, 0, 0, 1], [wide]))
+
+        rebuilt = GraphCore.from_arrays(core.strings.strings, core.node_uri, core.node_name, core.node_line,
+                                        core.node_character, core.node_kind, core.declared, offsets, targets,
+                                        core.csr_weights())
+        self.assertEqual(rebuilt.node_id("file:///repo/a.py", 0, 2**32 - 1), wide)
+        self.assertEqual((list(rebuilt.predecessors(wide)), rebuilt.weight(other, wide)), ([other], 3))
+        self.assertEqual(len(rebuilt.successors(wide)), 0)
+
+    def test_query_find_and_modules(self):
+        other = make_function("helper", 0, uri="file:///repo/sub/b.py")
+        self.graph.add_decl(other)
+        self.graph.add_dependency(self.main, other.index)
+        self.assertEqual(self.graph.query.find("helper"), [self.helper, other])
+        self.assertEqual(self.graph.query.find("sub/b.py:helper"), [other])
+        self.assertEqual(self.graph.query.find("ub/b.py:helper"), [])
+        self.assertEqual(self.graph.query.find(self.main.key()), [self.main])
+        self.assertEqual(self.graph.query.module_dependencies(), {("a.py", "sub/b.py"): 1})
+        self.assertEqual(self.graph.query.module_dependencies(module_depth=1), {(".", "sub"): 1})
+
+    def test_edge_weights_and_centrality(self):
+        self.graph.add_dependency(self.main, self.helper.index)
+        self.graph.add_dependency(self.main, self.helper.index, count=2)
+        main, helper = self.graph.node_of(self.main), self.graph.node_of(self.helper)
+        self.assertEqual(self.graph.core.weight(main, helper), 4)
+        self.assertEqual(self.graph.core.num_edges, 3)
+        self.assertEqual(self.graph.query.in_degree(), {self.helper.key(): 5.0, self.handler.key(): 1.0, self.main.key(): 0.0})
+        rank = self.graph.query.pagerank()
+        self.assertEqual(list(rank), [self.helper.key(), self.handler.key(), self.main.key()])
+        self.assertAlmostEqual(sum(rank.values()), 1.0)
+
+    def test_query_paths_and_levels(self):
+        query = self.graph.query
+        self.assertEqual([d.name for d in query.call_path(self.main.key(), self.helper.key())], ["main", "helper"])
+        self.assertIsNone(query.call_path(self.helper.key(), self.main.key()))
+        self.assertEqual([[d.name for d in level] for level in query.topological_levels()], [["helper"], ["handler"], ["main"]])
+        self.assertEqual({d.name for d in query.dependencies(self.main.key(), depth=1)}, {"handler", "helper"})
+
+    def test_query_cycles_and_invalidation(self):
+        query = self.graph.query
+        self.assertEqual(query.strongly_connected_components(), [])
+        query.strongly_connected_components()
+        self.assertEqual(query.hits, 1)
+        self.graph.add_dependency(self.helper, self.main.index)
+        cycles = query.strongly_connected_components()
+        self.assertEqual(len(cycles), 1)
+        self.assertEqual({d.name for d in cycles[0]}, {"helper", "handler", "main"})
+        self.assertEqual(len(query.topological_levels()), 1)
+
+    def test_remove_document_and_relink(self):
+        """A changed document's declarations become placeholders; incoming edges can be moved on."""
+        other = make_function("caller", 0, uri="file:///repo/b.py")
+        self.graph.add_decl(other)
+        self.graph.add_dependency(other, self.helper.index)
+        removed = self.graph.remove_document("file:///repo/a.py")
+        self.assertEqual(set(removed), {self.helper.key(), self.handler.key(), self.main.key()})
+        self.assertEqual(list(self.graph.decl_map), [other.key()])
+        self.assertEqual(self.graph.core.num_edges, 1) # caller -> helper survives for relinking
+        self.assertEqual(self.graph.query.find("helper"), [])
+
+        moved = make_function("helper", 10)
+        self.graph.add_decl(moved)
+        core = self.graph.core
+        for src, weight in core.remove_in_edges(self.graph.node_of(self.helper)):
+            core.add_edge(src, self.graph.node_of(moved), weight)
+        self.assertEqual([d.name for d in self.graph.dependents(moved.key())], ["caller"])
+        self.assertEqual(core.weight(self.graph.node_of(other), self.graph.node_of(moved)), 1)
+        self.assertEqual(core.num_edges, 1)
+
+    def test_json_export(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "graph.json")
+            content = self.graph.to_json(path)
+            with open(path) as f:
+                data = json.load(f)
+            self.assertIsNone(self.graph.to_json(path, return_content=False))
+        self.assertEqual(json.loads(content), data)
+        self.assertEqual(len(data["nodes"]), 3)
+        self.assertEqual({(e["source_name"], e["target_name"]) for e in data["edges"]},
+                         {("handler", "helper"), ("main", "handler"), ("main", "helper")})
+
+    def test_clustered_dot(self):
+        other = make_function("other", 0, uri="file:///repo/sub/b.py")
+        self.graph.add_decl(other)
+        self.graph.add_dependency(other, self.main.index)
+        self.graph.add_dependency(other, self.helper.index)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "graph.dot")
+            collapsed = self.graph.to_dot(path, collapse=True)
+            with open(path) as f:
+                self.assertEqual(f.read(), collapsed)
+            focused = self.graph.to_dot(os.path.join(tmp, "focus.dot"), focus=self.handler.key(), max_depth=1)
+        self.assertIn('[weight=2, penwidth=2.00, label="2"]', collapsed)
+        self.assertEqual(collapsed.count(" -> "), 1)
+        self.assertEqual(focused.count("subgraph cluster_"), 1)
+        self.assertNotIn(other.key(), focused)
+        self.assertEqual(focused.count(" -> "), 3)
+
+    def test_snapshot_roundtrip(self):
+        from graph.snapshot import load_snapshot, save_snapshot
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "graph.snapshot")
+            save_snapshot(self.graph, path)
+            loaded = load_snapshot(path)
+        self.assertEqual(set(loaded.decl_map), set(self.graph.decl_map))
+        main = loaded.decl_map[self.main.key()]
+        self.assertEqual([dep.name for dep in main.dependencies], ["handler", "helper"])
+        self.assertEqual(str(main.code_block), str(self.main.code_block))
+        self.assertEqual([d.name for d in loaded.impact(self.helper.key())], ["handler", "main"])
+
+    def test_partitions_load_on_demand(self):
+        from graph.partitions import PartitionedGraph, write_partitions
+        other = make_function("other", 0, uri="file:///repo/sub/b.py")
+        self.graph.add_decl(other)
+        self.graph.add_dependency(other, self.main.index, count=3)
+        self.graph.add_dependency(self.main, self.helper.index)
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(write_partitions(self.graph, tmp), {".": 3, "sub": 1})
+            parts = PartitionedGraph(tmp, memory_budget=1)
+            self.assertEqual(parts.dependencies(other.key()), [self.main.key()])
+            self.assertEqual(parts.weight(other.key(), self.main.key()), 3)
+            self.assertEqual(parts.weight(self.main.key(), self.helper.key()), 2)
+            self.assertEqual(parts.weight(self.helper.key(), self.main.key()), 0)
+            self.assertEqual(set(parts.impact(self.helper.key())), {self.handler.key(), self.main.key(), other.key()})
+            self.assertEqual(len(parts._loaded), 1)
+            self.assertGreater(parts.evictions, 0)
+
+    def test_fingerprints_are_canonical(self):
+        # Same code scanned in a different order, under another checkout path
+        other = KnowledgeGraph(base_uri="file:///elsewhere")
+        main, handler, helper = (make_function(f.name, f.position.line, uri="file:///elsewhere/a.py")
+                                 for f in (self.main, self.handler, self.helper))
+        other.add_dependency(main, helper.index)
+        other.add_dependency(main, handler.index)
+        other.add_dependency(handler, helper.index)
+        for func in (main, handler, helper):
+            other.add_decl(func)
+        self.assertEqual(other.fingerprint(), self.graph.fingerprint())
+        self.assertEqual(list(other.fingerprints().values()), list(self.graph.fingerprints().values()))
+        self.assertEqual([d.name for d, _ in other._declared_edges()], ["handler", "main", "main"])
+
+        # A change reaches every transitive dependent, and cycles are handled
+        before = self.graph.fingerprints()
+        helper = make_function("helper", 0, length=3)
+        self.graph.add_decl(helper)
+        changed = self.graph.fingerprints()
+        self.assertTrue(all(before[key] != changed[key] for key in before))
+        self.graph.add_dependency(helper, self.main.index)
+        self.assertTrue(all(changed[key] != after for key, after in self.graph.fingerprints().items()))
+        self.assertNotEqual(self.graph.fingerprint(), other.fingerprint())
+
+    def test_mapped_snapshot(self):
+        self.graph.add_dependency(self.main, self.helper.index, count=2)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = self.graph.to_mapped(os.path.join(tmp, "graph.kgmap"))
+            with KnowledgeGraph.open_mapped(path) as mapped:
+                self.assertEqual(len(mapped), 3)
+                self.assertEqual(sorted(mapped.keys()), sorted(self.graph.decl_map))
+                node = mapped.get(self.main.key())
+                self.assertEqual((node.name, node.type), ("main", "Function"))
+                self.assertEqual(node.code, str(self.main.code_block))
+                self.assertEqual(mapped.dependencies(self.main.key()), [self.handler.key(), self.helper.key()])
+                self.assertEqual(sorted(mapped.dependents(self.helper.key())), sorted([self.handler.key(), self.main.key()]))
+                self.assertEqual(mapped.weight(self.main.key(), self.helper.key()), 3)
+                self.assertEqual(mapped.weight(self.main.key(), self.handler.key()), 1)
+                self.assertEqual(mapped.weight(self.helper.key(), self.main.key()), 0)
+                self.assertIsNone(mapped.get("file:///repo/a.py:99:0"))
+
+    def test_diff(self):
+        new = KnowledgeGraph(base_uri="file:///repo")
+        helper = make_function("helper", 0)
+        handler = make_function("handler", 4) # moved down one line
+        main = make_function("main", 7, length=3) # moved and changed
+        extra = make_function("extra", 20)
+        for func in (helper, handler, main, extra):
+            new.add_decl(func)
+        new.add_dependency(handler, helper.index)
+        new.add_dependency(main, handler.index)
+        new.add_dependency(main, extra.index)
+
+        diff = self.graph.diff(new)
+        self.assertEqual(diff.added, [extra.key()])
+        self.assertEqual(diff.removed, [])
+        self.assertEqual(diff.moved, {self.handler.key(): handler.key(), self.main.key(): main.key()})
+        self.assertEqual(diff.changed, [main.key()])
+        self.assertEqual(diff.added_edges, [(main.key(), extra.key())])
+        self.assertEqual(diff.removed_edges, [(main.key(), helper.key())])
+        self.assertEqual(set(diff.resummarize(new)), {extra.key(), main.key()})
+        self.assertTrue(self.graph.diff(self.graph).is_empty())
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
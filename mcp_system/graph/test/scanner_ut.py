@@ -0,0 +1,156 @@
+import ast
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from lsprotocol import types
+
+from graph.scanner import Scanner
+from servers.lsp.servers.workspace import WorkspaceLangServers
+
+
+class FakeLangServer:
+    """
+    A stand-in for one pyright process: document symbols and definitions come from parsing
+    the workspace's files with `ast`, and every request is recorded with the root serving it.
+    """
+    separators = set(' \n\t.,!?;(){}[]<>:\'#*/=@')
+    keywords = {"def", "return", "import", "from", "+"}
+    inlie_comment = "#"
+    multiline_comment = ('"""', '"""')
+    string_delimiters = [('"', '"'), ("'", "'")]
+
+    def __init__(self, root_uri: str, workspace: Path, requests: list):
+        self.root_uri = root_uri
+        self.requests = requests
+        self.functions = {} # name -> (uri, line, character, end line) of every function in the workspace
+        for path in workspace.rglob("*.py"):
+            for node in ast.walk(ast.parse(path.read_text())):
+                if isinstance(node, ast.FunctionDef):
+                    self.functions[node.name] = (path.as_uri(), node.lineno - 1, node.col_offset, node.end_lineno)
+
+    def for_uri(self, uri):
+        return self
+
+    def document_symbols(self, uri):
+        self.requests.append((self.root_uri, "document_symbols", uri))
+        symbols = []
+        for name, (def_uri, line, character, end_line) in self.functions.items():
+            if def_uri == uri:
+                symbols.append(types.SymbolInformation(
+                    name=name,
+                    kind=types.SymbolKind.Function,
+                    location=types.Location(uri=uri, range=types.Range(
+                        start=types.Position(line=line, character=character),
+                        end=types.Position(line=end_line, character=0),
+                    )),
+                ))
+        return symbols
+
+    def show_definition(self, line, character, keyword, path):
+        self.requests.append((self.root_uri, "show_definition", keyword))
+        if keyword not in self.functions:
+            return None
+        uri, def_line, def_character, _ = self.functions[keyword]
+        position = types.Position(line=def_line, character=def_character + 4)
+        return [types.Location(uri=uri, range=types.Range(start=position, end=position))]
+
+    def close(self):
+        pass
+
+
+class TestScanMany(unittest.TestCase):
+
+    def setUp(self):
+        """A monorepo of two packages, `a` calling into `b`."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name).resolve()
+        files = {
+            "pkg_a/pyproject.toml": "",
+            "pkg_a/a.py": "from b import helper\n\ndef run():\n    return helper()\n",
+            "pkg_b/pyproject.toml": "",
+            "pkg_b/b.py": "def helper():\n    return leaf()\n\ndef leaf():\n    return 1\n",
+        }
+        for name, content in files.items():
+            path = self.root / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content)
+        self.requests = []
+        self.started = []
+        lock = threading.Lock()
+
+        def factory(root_uri):
+            with lock:
+                self.started.append(root_uri)
+            return FakeLangServer(root_uri, self.root, self.requests)
+
+        self.lsp = WorkspaceLangServers(self.root.as_uri(), factory)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_scan_many_two_roots(self):
+        a = (self.root / "pkg_a" / "a.py").as_uri()
+        b = (self.root / "pkg_b" / "b.py").as_uri()
+        graph = Scanner(self.lsp).scan_many([a, b])
+
+        self.assertEqual({decl.name for decl in graph.decl_map.values()}, {"run", "helper", "leaf"})
+        self.assertEqual([decl.name for decl in graph.query.find("run")[0].dependencies], ["helper"])
+        self.assertEqual([decl.name for decl in graph.query.find("helper")[0].dependencies], ["leaf"])
+
+        # Each document's requests went to the server of its own package
+        self.assertEqual(sorted(self.started), sorted(self.lsp.workspace_roots))
+        roots = {uri: root for root, method, uri in self.requests if method == "document_symbols"}
+        self.assertEqual(roots, {a: self.lsp.root_for(a), b: self.lsp.root_for(b)})
+        self.assertIn((self.lsp.root_for(a), "show_definition", "helper"), self.requests)
+        self.assertIn((self.lsp.root_for(b), "show_definition", "leaf"), self.requests)
+
+
+class TestScanManyConcurrent(unittest.TestCase):
+
+    def setUp(self):
+        """Eight packages whose functions call each other within and across packages."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name).resolve()
+        self.packages, self.modules, self.functions = 8, 6, 10
+        self.entry_points = []
+        for i in range(self.packages):
+            (self.root / f"pkg_{i}").mkdir()
+            (self.root / f"pkg_{i}" / "pyproject.toml").write_text("")
+            for j in range(self.modules):
+                lines = []
+                for k in range(self.functions):
+                    callees = [f"f_{(i + 1) % self.packages}_{j}_{k}", f"f_{i}_{j}_{(k + 1) % self.functions}"]
+                    lines += [f"def f_{i}_{j}_{k}():", *(f"    {callee}()" for callee in callees), ""]
+                path = self.root / f"pkg_{i}" / f"m_{i}_{j}.py"
+                path.write_text("\n".join(lines))
+                self.entry_points.append(path.as_uri())
+        self.lsp = WorkspaceLangServers(self.root.as_uri(), lambda root_uri: FakeLangServer(root_uri, self.root, []))
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6) # switch threads as often as possible to surface races
+        self.addCleanup(sys.setswitchinterval, interval)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_node_ids_stay_aligned(self):
+        graph = Scanner(self.lsp).scan_many(self.entry_points, max_workers=self.packages)
+
+        total = self.packages * self.modules * self.functions
+        self.assertEqual(len(graph.decl_map), total)
+        self.assertEqual(len(graph.nodes), len(graph.core))
+        self.assertEqual(len(graph.core), total)
+        core = graph.core
+        for node, loc in enumerate(graph.nodes):
+            key = f"{core.strings[core.node_uri[node]]}:{core.node_line[node]}:{core.node_character[node]}"
+            self.assertEqual(loc.key(), key)
+            self.assertEqual(core.node_id(loc.uri, loc.position.line, loc.position.character), node)
+        self.assertEqual(core.num_edges, 2 * total)
+        for decl in graph.decl_map.values():
+            self.assertEqual(len(decl.dependencies), 2, decl.name)
+
+
+if __name__ == "__main__":
+    unittest.main()
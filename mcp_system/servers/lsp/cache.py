@@ -0,0 +1,159 @@
+import os
+import threading
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+from urllib.parse import urlparse, unquote
+
+from lsprotocol.types import Position
+
+# Bookkeeping cost of one entry on top of its value, for the memory cap
+ENTRY_OVERHEAD_BYTES = 256
+# Resolved positions are tiny; the memo is simply reset when it reaches this many
+MAX_POSITIONS = 100_000
+
+
+def _file_path(path: str) -> str:
+    return unquote(urlparse(path).path) if path.startswith("file://") else os.path.abspath(path)
+
+
+class ResponseCache:
+    """
+    In-process LRU cache of language server answers for the MCP tools.
+
+    Entries are keyed by (tool, file content hash, resolved position, keyword), so the same
+    question asked with slightly different approximate positions shares one entry. A file's
+    hash is only recomputed when its mtime or size changes; when the content really changed,
+    every entry for that file is dropped. Answers that depend on *other* files (e.g. the
+    file a definition points into) are indexed under those files too when they are passed
+    as `related`, so `invalidate` of one file drops exactly the entries that mention it.
+
+    The cache holds at most `max_bytes` of values (plus a fixed per-entry overhead) and
+    evicts least recently used entries first.
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[Tuple[str, ...], str, int]]" = OrderedDict() # key -> (paths, value, size)
+        self._positions: Dict[Tuple[str, int, int, str], Tuple[int, int]] = {} # (digest, line, character, keyword) -> resolved
+        self._files: Dict[str, Tuple[int, int, str]] = {} # path -> (mtime_ns, size, digest)
+        self._by_path: Dict[str, Set[Hashable]] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def content_hash(self, path: str) -> str:
+        """Hash of the file's current content, re-read only when its mtime or size changed."""
+        path = _file_path(path)
+        stat = os.stat(path)
+        with self._lock:
+            known = self._files.get(path)
+        if known is not None and known[0] == stat.st_mtime_ns and known[1] == stat.st_size:
+            return known[2]
+        with open(path, 'rb') as f:
+            digest = blake2b(f.read(), digest_size=16).hexdigest()
+        if known is not None and known[2] != digest:
+            self.invalidate(path)
+        with self._lock:
+            self._files[path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def key(self, tool: str, path: str, line: int, character: int, keyword: str,
+            locate: Callable[[], Position]) -> Hashable:
+        """
+        Cache key of a tool call. `locate` resolves the approximate position and is only
+        called the first time a (content, position, keyword) combination is seen.
+        """
+        path = _file_path(path)
+        digest = self.content_hash(path)
+        approximate = (digest, line, character, keyword)
+        with self._lock:
+            resolved = self._positions.get(approximate)
+        if resolved is None:
+            position = locate() # reads the file: not under the lock
+            resolved = (position.line, position.character)
+            with self._lock:
+                if len(self._positions) >= MAX_POSITIONS:
+                    self._positions.clear()
+                self._positions[approximate] = resolved
+        return (tool, path, digest, resolved, keyword)
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: str, related: Iterable[str] = ()):
+        """Store `value`; `related` are other files it was derived from (see `invalidate`)."""
+        paths = tuple({key[1], *map(_file_path, related)})
+        size = len(value) + ENTRY_OVERHEAD_BYTES
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (paths, value, size)
+            for path in paths:
+                self._by_path.setdefault(path, set()).add(key)
+            self.bytes += size
+            while self.bytes > self.max_bytes and len(self._entries) > 1:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_compute(self, tool: str, path: str, line: int, character: int, keyword: str,
+                       locate: Callable[[], Position], compute: Callable[[], str],
+                       related: Optional[Callable[[str], Iterable[str]]] = None) -> str:
+        """
+        Return the cached answer for this call, computing and storing it on a miss.
+        `related` maps a computed answer to the other files it depends on.
+        """
+        key = self.key(tool, path, line, character, keyword, locate)
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value, related(value) if related is not None else ())
+        return value
+
+    def _remove(self, key: Hashable):
+        paths, _, size = self._entries.pop(key)
+        self.bytes -= size
+        for path in paths:
+            keys = self._by_path.get(path)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_path[path]
+
+    def invalidate(self, path: str):
+        """Drop every entry for or related to `path`, e.g. after the file changed on disk."""
+        path = _file_path(path)
+        with self._lock:
+            keys = list(self._by_path.get(path, ()))
+            for key in keys:
+                self._remove(key)
+            self._files.pop(path, None)
+            self.invalidations += len(keys) # entries dropped, like `evictions`
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_path.clear()
+            self._files.clear()
+            self._positions.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
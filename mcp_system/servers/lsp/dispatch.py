@@ -0,0 +1,88 @@
+import asyncio
+import functools
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict
+
+from fastmcp import Context
+
+
+class ToolDispatcher:
+    """
+    Runs the blocking parts of MCP tools (language server round trips, file reads) on a
+    bounded thread pool so FastMCP's event loop keeps serving other clients meanwhile.
+
+    Each client session may have at most `per_client` calls in flight; further calls from
+    the same session wait for a slot, so one busy client cannot take every worker. When all
+    workers are busy, waiting calls are admitted round robin across sessions (fair queuing),
+    so a session with a long backlog does not delay the others' next call.
+    """
+    def __init__(self, max_workers: int = 8, per_client: int = 2):
+        self.max_workers = max_workers
+        self.per_client = per_client
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mcp-tool")
+        self._limits: "weakref.WeakKeyDictionary[Any, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+        self._free = max_workers
+        self._waiting: "OrderedDict[Any, Deque[asyncio.Future]]" = OrderedDict() # session -> waiting calls, in service order
+
+    def _limit(self, ctx: Context) -> asyncio.Semaphore:
+        # The session object lives exactly as long as the client connection
+        session = ctx.session
+        semaphore = self._limits.get(session)
+        if semaphore is None:
+            semaphore = self._limits[session] = asyncio.Semaphore(self.per_client)
+        return semaphore
+
+    async def _admit(self, session):
+        if self._free > 0 and not self._waiting:
+            self._free -= 1
+            return
+        admitted = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(session, deque()).append(admitted)
+        try:
+            await admitted
+        except asyncio.CancelledError:
+            if admitted.done() and not admitted.cancelled():
+                self._release() # admitted just before the cancel: pass the slot on
+            else:
+                queue = self._waiting.get(session)
+                if queue is not None and admitted in queue:
+                    queue.remove(admitted)
+                    if not queue:
+                        del self._waiting[session]
+            raise
+
+    def _release(self):
+        if not self._waiting:
+            self._free += 1
+            return
+        # Serve the session at the head of the ring, then move it to the back
+        session, queue = next(iter(self._waiting.items()))
+        admitted = queue.popleft()
+        if queue:
+            self._waiting.move_to_end(session)
+        else:
+            del self._waiting[session]
+        admitted.set_result(None)
+
+    async def run(self, ctx: Context, fn: Callable, *args, **kwargs):
+        """Call `fn(*args, **kwargs)` on the pool within the calling client's concurrency limit."""
+        async with self._limit(ctx):
+            await self._admit(ctx.session)
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+            finally:
+                self._release()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.max_workers,
+            "busy": self.max_workers - self._free,
+            "waiting_sessions": len(self._waiting),
+            "waiting_calls": sum(len(queue) for queue in self._waiting.values()),
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,137 @@
+import os
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from urllib.parse import urlparse, unquote
+
+# Default budget for the documentation part of a hover; the signature is never cut
+HOVER_CHARS = 600
+
+_PATH = re.compile(r"[^\s:,'\"()\[\]]+\.pyi?\b")
+_FENCE = re.compile(r"^\s*(```\w*|---)\s*$")
+
+
+class CompactEncoder:
+    """
+    Renders language server results as short plain text for the LLM reading the tool output.
+
+    Paths are relative to the workspace root (absolute outside of it), positions are
+    1-based `line:col` with inclusive `line:col-col` ranges, locations in the same file
+    share one file header, and hover documentation beyond `hover_chars` is truncated.
+    """
+    def __init__(self, root: str = "", hover_chars: Optional[int] = HOVER_CHARS):
+        self.root = root
+        self.hover_chars = hover_chars
+
+    @property
+    def root(self) -> str:
+        return self._root
+
+    @root.setter
+    def root(self, root: str):
+        self._root = _path_of(root).rstrip("/") if root else ""
+
+    def path(self, uri: str) -> str:
+        """Workspace-relative path of a URI or absolute path."""
+        path = _path_of(uri)
+        if self._root and path.startswith(self._root + "/"):
+            return path[len(self._root) + 1:]
+        return path
+
+    def absolute(self, path: str) -> str:
+        """Inverse of `path`: resolve a (possibly workspace-relative) path or URI to an absolute path."""
+        path = _path_of(path)
+        return path if os.path.isabs(path) or not self._root else os.path.join(self._root, path)
+
+    def range(self, lsp_range: Any) -> str:
+        start, end = lsp_range.start, lsp_range.end
+        if end.line == start.line:
+            if end.character <= start.character + 1:
+                return f"{start.line + 1}:{start.character + 1}"
+            return f"{start.line + 1}:{start.character + 1}-{end.character}"
+        return f"{start.line + 1}:{start.character + 1}-{end.line + 1}:{end.character}"
+
+    def locations(self, result: Any, empty: str = "no definition found") -> str:
+        """
+        Encode a Location, a LocationLink or a list of them as one `path:ranges` line per file,
+        e.g. `pkg/mod.py:12:5-9, 40:1-3`.
+        """
+        if result is None:
+            return empty
+        items = result if isinstance(result, list) else [result]
+        by_file: Dict[str, List[str]] = {}
+        for item in items:
+            uri = getattr(item, 'uri', None) or item.target_uri
+            lsp_range = item.range if hasattr(item, 'range') else item.target_selection_range
+            by_file.setdefault(self.path(uri), []).append(self.range(lsp_range))
+        return "\n".join(f"{path}:{', '.join(ranges)}" for path, ranges in by_file.items()) or empty
+
+    def hover(self, text: Optional[str], empty: str = "no hover information") -> str:
+        """
+        Keep the signature of a hover on one line, drop markdown fences and separators, and
+        cut the documentation after `hover_chars` characters.
+        """
+        if not text:
+            return empty
+        lines = [line.rstrip() for line in text.strip().splitlines()]
+        if lines and lines[0].startswith("```"): # markdown: the signature is the first code block
+            end = next((i for i in range(1, len(lines)) if lines[i].startswith("```")), len(lines))
+            signature, rest = lines[1:end], lines[end + 1:]
+        else: # plain text: the signature is the first paragraph
+            end = lines.index("") if "" in lines else len(lines)
+            signature, rest = lines[:end], lines[end + 1:]
+        signature = " ".join(line.strip() for line in signature)
+        signature = re.sub(r",?\s*\)", ")", re.sub(r"\(\s+", "(", signature))
+        doc = "\n".join(line for line in rest if not _FENCE.match(line))
+        doc = re.sub(r"\n{3,}", "\n\n", doc).strip()
+        return "\n".join(part for part in (signature, self.truncate(doc)) if part) or empty
+
+    def truncate(self, text: str) -> str:
+        """Cut `text` at a word boundary after `hover_chars` characters, saying how much was left out."""
+        if self.hover_chars is None or len(text) <= self.hover_chars:
+            return text
+        cut = text.rfind(" ", 0, self.hover_chars)
+        cut = cut if cut > self.hover_chars // 2 else self.hover_chars
+        return f"{text[:cut].rstrip()} …[+{len(text) - cut} chars]"
+
+    def group_by_file(self, entries: Iterable[str]) -> str:
+        """
+        Turn `path:rest` entries into a `path` header followed by indented `rest` lines for each
+        run of entries in the same file.
+        """
+        lines = []
+        current = None
+        for entry in entries:
+            path, _, rest = entry.partition(":")
+            if path != current:
+                lines.append(path)
+                current = path
+            lines.append(f"  {rest}")
+        return "\n".join(lines)
+
+    def files_in(self, text: str) -> Set[str]:
+        """Absolute paths of the source files mentioned in encoded (or raw) output."""
+        return {os.path.normpath(self.absolute(unquote(match))) for match in _PATH.findall(text)}
+
+
+def paginate(listing: str, limit: int, cursor: Optional[str], format_page: Callable[[List[str]], str] = "\n".join) -> str:
+    """
+    Return one page of a newline-separated listing with a header saying where the page
+    starts and, when more results remain, the cursor for the next page. `format_page`
+    renders the page's entries.
+    """
+    try:
+        offset = int(cursor) if cursor else 0
+        if offset < 0:
+            raise ValueError(cursor)
+    except ValueError:
+        raise ValueError(f"Invalid cursor {cursor!r}; pass the next_cursor of a previous call")
+    entries = listing.split("\n") if listing else []
+    page = entries[offset:offset + limit]
+    header = f"results {offset + 1}-{offset + len(page)} of {len(entries)}" if page else f"no results (total {len(entries)})"
+    if offset + limit < len(entries):
+        header += f", next_cursor: {offset + limit}"
+    return "\n".join([header, format_page(page)]) if page else header
+
+
+def _path_of(uri: str) -> str:
+    return unquote(urlparse(uri).path) if uri.startswith("file://") else uri
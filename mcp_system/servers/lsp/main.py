@@ -4,14 +4,29 @@ import sys
 from pathlib import Path
 
 from fmcp import mcp
-from tools import register_tools
+from tools import register_tools, register_graph, register_summaries, register_watcher
 
 @click.command()
 @click.option("--repository", "-r", type=Path, help="")
+@click.option("--graph", "-g", type=Path, help="Knowledge graph snapshot (KnowledgeGraph.to_snapshot) backing the graph tools")
+@click.option("--summaries", "-s", type=Path, help="Component summaries stored by CacheAgent, for ExplainSymbol")
+@click.option("--cache-mb", type=int, default=64, show_default=True, help="Memory cap of the tool response cache")
+@click.option("--workers", type=int, default=8, show_default=True, help="Threads running tool calls")
+@click.option("--per-client", type=int, default=2, show_default=True, help="Concurrent tool calls allowed per client session")
+@click.option("--pool-size", type=int, default=1, show_default=True, help="Language servers shared by all sessions (each keeps its own index)")
+@click.option("--hover-chars", type=int, default=600, show_default=True,
+              help="Truncate hover documentation after this many characters (0 for no limit)")
+@click.option("--watch/--no-watch", default=True, show_default=True,
+              help="Follow edits to the repository (inotify on Linux, else polling) and refresh answers")
+@click.option("--wait-timeout", type=float, default=None,
+              help="Seconds a tool call made while the language server starts waits for it (default: no limit)")
+@click.option("--transport", type=click.Choice(["sse", "streamable-http", "stdio"]), default="sse", show_default=True,
+              help="streamable-http serves many clients from one process")
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", type=int, default=8000, show_default=True)
 @click.option("-v", "--verbose", count=True)
-def main(repository: Path | None, verbose: bool):
-    register_tools(uri=repository.absolute().as_uri())
-    mcp.run(transport="sse")
+def main(repository: Path | None, graph: Path | None, summaries: Path | None, cache_mb: int, workers: int, per_client: int, pool_size: int,
+         hover_chars: int, watch: bool, wait_timeout: float | None, transport: str, host: str, port: int, verbose: bool):
     logging_level = logging.WARN
     if verbose == 1:
         logging_level = logging.INFO
@@ -19,6 +34,27 @@ def main(repository: Path | None, verbose: bool):
         logging_level = logging.DEBUG
     logging.basicConfig(level=logging_level, stream=sys.stderr)
 
+    # The language server starts in the background; clients can connect (and list tools) right away
+    register_tools(
+        uri=repository.absolute().as_uri(),
+        cache_bytes=cache_mb * 1024 * 1024,
+        max_workers=workers,
+        per_client=per_client,
+        pool_size=pool_size,
+        hover_chars=hover_chars or None,
+        wait_timeout=wait_timeout,
+    )
+    if graph is not None:
+        register_graph(str(graph))
+    if summaries is not None:
+        register_summaries(str(summaries))
+    if watch:
+        register_watcher(str(repository.absolute()))
+    if transport == "stdio":
+        mcp.run(transport=transport)
+    else:
+        mcp.run(transport=transport, host=host, port=port)
+
 
 if __name__ == "__main__":
     main()
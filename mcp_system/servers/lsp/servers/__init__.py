@@ -1 +1,4 @@
-from servers.lsp.servers.python import PythonLangServer
\ No newline at end of file
+from servers.lsp.servers.python import PythonLangServer
+from servers.lsp.servers.workspace import WorkspaceLangServers
+from servers.lsp.servers.pool import LangServerPool
+from servers.lsp.servers.lazy import LazyLangServer
@@ -1,8 +1,8 @@
 import subprocess
 import threading
 import json
+import logging
 import time
-import select
 from abc import ABC, abstractmethod
 from pathlib import Path
 from urllib.parse import urlparse, unquote
@@ -10,6 +10,9 @@ from typing import Union, Any, Set, Tuple, Optional
 
 from lsprotocol import types, converters
 
+# Never print: with the stdio transport, stdout is the MCP JSON-RPC channel
+logger = logging.getLogger(__name__)
+
 class LangServer(ABC):
     def __init__(self, cmd, root_uri: str):
         self.cmd = cmd
@@ -24,6 +27,14 @@ class LangServer(ABC):
         threading.Thread(target=self._read_stderr, daemon=True).start()
 
         self._id = 0
+        self._lock = threading.Lock() # guards request IDs and the pending table
+        self._write_lock = threading.Lock() # keeps concurrent messages from interleaving on stdin
+        self._pending: dict[int, list] = {} # request id -> [event set on response, response]
+        self._documents_lock = threading.Lock()
+        self._documents: dict[str, Tuple[int, str]] = {} # open uri -> (version, text last sent)
+        # Responses are routed to their waiters by a reader thread, so any number of
+        # threads can have requests in flight on the one pipe at the same time
+        threading.Thread(target=self._read_stdout, daemon=True).start()
         self.converter = converters.get_converter()
         self.root_uri = Path(root_uri).resolve().as_uri() if not root_uri.startswith("file://") else root_uri
 
@@ -66,13 +77,13 @@ class LangServer(ABC):
             ))
         except Exception as e:
             # If this fails, it's not critical - we'll just filter the messages
-            print(f"Note: Could not disable diagnostics: {e}")
+            logger.warning("Could not disable diagnostics: %s", e)
 
     def _read_stderr(self):
-        """Read stderr output from the language server process"""
+        """Forward the language server's stderr output to the log"""
         if self.proc and self.proc.stderr:
             for line in self.proc.stderr:
-                print("[stderr]", line.strip())
+                logger.info("[stderr] %s", line.decode('utf-8', 'replace').strip())
 
     def _send(self, msg):
         """Send a message to the language server via stdio"""
@@ -87,8 +98,9 @@ class LangServer(ABC):
         message = header + body
         
         try:
-            self.proc.stdin.write(message.encode('utf-8'))
-            self.proc.stdin.flush()
+            with self._write_lock:
+                self.proc.stdin.write(message.encode('utf-8'))
+                self.proc.stdin.flush()
         except (IOError, OSError) as e:
             raise RuntimeError(f"Failed to send message to LSP server: {e}")
 
@@ -116,60 +128,119 @@ class LangServer(ABC):
             if content_length == 0:
                 return None
             
-            # Read exactly the specified number of bytes
-            body = self.proc.stdout.read(content_length)
+            # Read exactly the specified number of bytes; the unbuffered pipe returns short reads
+            chunks = []
+            remaining = content_length
+            while remaining > 0:
+                chunk = self.proc.stdout.read(remaining)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                remaining -= len(chunk)
+            body = b''.join(chunks)
             if len(body) != content_length:
-                print(f"Warning: Expected {content_length} bytes but got {len(body)}, body: {body}")
+                logger.warning("Expected %d bytes but got %d, body: %r", content_length, len(body), body)
                 return None
             
             # Parse JSON - this should now be a complete, valid JSON object
             return json.loads(body.decode('utf-8'))
         except (json.JSONDecodeError, ValueError, IOError, OSError) as e:
-            print(f"Error reading message from LSP server: {e}")
+            logger.error("Error reading message from LSP server: %s", e)
             return None
 
-    def _wait_for(self, target_id, timeout=5.0):
-        """Wait for a specific response from the language server with improved timeout"""
-        start = time.time()
-        
-        while time.time() - start < timeout:
-            try:
-                # Use select to check if data is available
-                if not self.proc or not self.proc.stdout:
+    def _read_stdout(self):
+        """Route responses from the language server to the threads waiting for them"""
+        while self.proc and self.proc.stdout:
+            message = self._read_message()
+            if not message:
+                if not self.proc or self.proc.poll() is not None:
                     break
-                ready, _, _ = select.select([self.proc.stdout], [], [], 0.1)
-                if not ready:
-                    continue
-                
-                message = self._read_message()
-                if not message:
-                    continue
-                
-                # Skip all diagnostic-related notifications
-                method = message.get("method", "")
-                if method in [
-                    "textDocument/publishDiagnostics",
-                    "textDocument/publishDiagnostics/relatedInformation",
-                    "textDocument/publishDiagnostics/tagSupport"
-                ]:
-                    # print(f"Skipping diagnostic message: {method}")
-                    continue
-                
-                # Return the message if it matches our target ID
-                if message.get("id") == target_id:
-                    return message
-            except (IOError, OSError) as e:
-                print(f"Error waiting for LSP response: {e}")
-                break
-        
-        return None
+                continue
+
+            # Notifications (diagnostics etc.) and server-to-client requests carry a method
+            if "method" in message:
+                continue
+
+            with self._lock:
+                waiter = self._pending.pop(message.get("id"), None)
+            if waiter is not None:
+                waiter[1] = message
+                waiter[0].set()
+
+        # The server is gone: release everything still waiting
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for event, _ in pending.values():
+            event.set()
+
+    def _register(self) -> Tuple[int, list]:
+        """
+        Allocate a request id and its waiter. Callers wait on the returned waiter itself: the
+        reader thread removes it from `_pending` as soon as the response arrives.
+        """
+        with self._lock:
+            self._id += 1
+            waiter = self._pending[self._id] = [threading.Event(), None]
+            return self._id, waiter
+
+    def _wait_for(self, target_id, waiter, timeout=5.0):
+        """Wait for a specific response from the language server with improved timeout"""
+        return self._wait_for_all([(target_id, waiter)], timeout).get(target_id)
+
+    def _wait_for_all(self, waiters: list[Tuple[int, list]], timeout=5.0) -> dict:
+        """
+        Wait for the responses to several (id, waiter) requests from `_register`, in whatever
+        order the server sends them. Gives up on the ones still unanswered `timeout` seconds
+        after the call, so a batch waits at most `timeout` in total.
+        """
+        responses = {}
+        timed_out = []
+        start = time.monotonic()
+        deadline = start + timeout
+        for target_id, waiter in waiters:
+            if not waiter[0].wait(max(0.0, deadline - time.monotonic())):
+                with self._lock:
+                    self._pending.pop(target_id, None)
+                if waiter[1] is None: # the response may have landed just after the wait gave up
+                    timed_out.append(target_id)
+            if waiter[1] is not None: # None: the server went away
+                responses[target_id] = waiter[1]
+        if timed_out:
+            logger.warning("Timed out waiting for LSP responses %s after %.1fs", timed_out, time.monotonic() - start)
+        return responses
+
+    def _send_request(self, msg):
+        try:
+            self._send(msg)
+        except Exception:
+            with self._lock:
+                self._pending.pop(msg.id, None)
+            raise
 
     def request(self, cls: types.REQUESTS, params) -> types.RESPONSES:
         """Send a request to the language server and wait for response"""
-        self._id += 1
-        msg = cls(params=params, id=self._id)
-        self._send(msg)
-        return self._wait_for(self._id)
+        request_id, waiter = self._register()
+        self._send_request(cls(params=params, id=request_id))
+        return self._wait_for(request_id, waiter)
+
+    def request_many(self, requests: list[Tuple[Any, Any]]) -> list[Optional[dict]]:
+        """
+        Send several requests back to back and wait for all of their responses, so the
+        server works on them together instead of one round trip at a time.
+
+        Args:
+            requests: (request class, params) pairs
+
+        Returns:
+            The raw responses in request order, None for requests that timed out
+        """
+        waiters = []
+        for cls, params in requests:
+            request_id, waiter = self._register()
+            self._send_request(cls(params=params, id=request_id))
+            waiters.append((request_id, waiter))
+        responses = self._wait_for_all(waiters)
+        return [responses.get(request_id) for request_id, _ in waiters]
 
     def notify(self, msg: types.NOTIFICATIONS):
         """Send a notification to the language server"""
@@ -189,17 +260,73 @@ class LangServer(ABC):
         """Cleanup when the object is destroyed"""
         self.close()
 
+    def for_uri(self, uri: str) -> 'LangServer':
+        """Return the language server responsible for `uri`; a single server handles its whole workspace."""
+        return self
+
+    def root_for(self, uri: str) -> str:
+        """Return the root URI of the project containing `uri`."""
+        return self.root_uri
+
+    @property
+    def workspace_roots(self) -> list[str]:
+        """Root URIs of the projects served by this server."""
+        return [self.root_uri]
+
     def _open(self, uri: str):
-        self.notify(types.TextDocumentDidOpenNotification(
-            params=types.DidOpenTextDocumentParams(
-                text_document=types.TextDocumentItem(
-                    uri=uri,
-                    language_id=self.language_id,
-                    version=1,
-                    text=self._read_file_from_uri(uri)
+        """
+        Make sure the server has the current content of `uri`: open it the first time, and
+        send the full new text as a `didChange` with the next version when it changed since.
+        """
+        text = self._read_file_from_uri(uri)
+        with self._documents_lock:
+            known = self._documents.get(uri)
+            if known is None:
+                self.notify(types.TextDocumentDidOpenNotification(
+                    params=types.DidOpenTextDocumentParams(
+                        text_document=types.TextDocumentItem(
+                            uri=uri,
+                            language_id=self.language_id,
+                            version=1,
+                            text=text
+                        )
+                    )
+                ))
+                self._documents[uri] = (1, text)
+            elif known[1] != text:
+                version = known[0] + 1
+                self.notify(types.TextDocumentDidChangeNotification(
+                    params=types.DidChangeTextDocumentParams(
+                        text_document=types.VersionedTextDocumentIdentifier(uri=uri, version=version),
+                        content_changes=[types.TextDocumentContentChangeEvent_Type2(text=text)],
+                    )
+                ))
+                self._documents[uri] = (version, text)
+
+    def did_change(self, uri: str):
+        """Resend `uri` if it is open and its content on disk changed."""
+        with self._documents_lock:
+            is_open = uri in self._documents
+        if is_open:
+            self._open(uri)
+
+    def did_close(self, uri: str):
+        """Close `uri` if it is open, e.g. after it was deleted."""
+        with self._documents_lock:
+            if self._documents.pop(uri, None) is None:
+                return
+            self.notify(types.TextDocumentDidCloseNotification(
+                params=types.DidCloseTextDocumentParams(text_document=types.TextDocumentIdentifier(uri=uri))
+            ))
+
+    def files_changed(self, changes: list[Tuple[str, types.FileChangeType]]):
+        """Tell the server which (uri, change type) files changed on disk, so it re-reads closed files too."""
+        if changes:
+            self.notify(types.WorkspaceDidChangeWatchedFilesNotification(
+                params=types.DidChangeWatchedFilesParams(
+                    changes=[types.FileEvent(uri=uri, type=change) for uri, change in changes]
                 )
-            )
-        ))
+            ))
 
     def _read_file_from_uri(self, uri: str) -> str:
         parsed = urlparse(uri)
@@ -252,7 +379,7 @@ class LangServer(ABC):
             path: Path to the source file (with or without 'file://' prefix).
 
         Returns:
-            A `types.Hover` object containing reference/documentation information.
+            The hover text (type and documentation), or None if there is nothing to show.
         """
         uri = Path(path).resolve().as_uri() if not path.startswith("file://") else path
         self._open(uri)
@@ -264,8 +391,104 @@ class LangServer(ABC):
                 position=self.locator(line, character, keyword, path),
             )
         )
+        if result is None or result.get("result") is None:
+            return None
         return self.converter.structure(result["result"], types.Hover).contents.value
 
+    def _batch(self, items: list[Tuple[str, int, int, str]], make_request) -> list[Any]:
+        """
+        Locate every (path, line, character, keyword) item, pipeline one request per item
+        with `request_many`, and return the raw result or an Exception for each item.
+        """
+        outcomes: list[Any] = [None] * len(items)
+        pending = []
+        opened = set()
+        for i, (path, line, character, keyword) in enumerate(items):
+            try:
+                uri = Path(path).resolve().as_uri() if not path.startswith("file://") else path
+                if uri not in opened:
+                    self._open(uri)
+                    opened.add(uri)
+                position = self.locator(line, character, keyword, path)
+                pending.append((i, make_request(types.TextDocumentIdentifier(uri=uri), position)))
+            except Exception as e:
+                outcomes[i] = e
+        responses = self.request_many([request for _, request in pending])
+        for (i, _), response in zip(pending, responses):
+            if response is None:
+                outcomes[i] = TimeoutError("No response from the language server")
+            elif "error" in response:
+                outcomes[i] = RuntimeError(response["error"].get("message", "language server error"))
+            else:
+                outcomes[i] = response.get("result")
+        return outcomes
+
+    def show_definitions(self, items: list[Tuple[str, int, int, str]]) -> list[Any]:
+        """
+        Batch form of `show_definition`: the requests for all items are in flight together.
+
+        Args:
+            items: (path, line, character, keyword) tuples, as for `show_definition`
+
+        Returns:
+            For each item, its definition result or the Exception that prevented resolving it
+        """
+        outcomes = self._batch(items, lambda doc, position: (
+            types.TextDocumentDefinitionRequest,
+            types.DefinitionParams(text_document=doc, position=position),
+        ))
+        return [
+            outcome if isinstance(outcome, Exception) or outcome is None
+            else self.converter.structure({"jsonrpc": "2.0", "id": 0, "result": outcome}, types.TextDocumentTypeDefinitionResponse).result
+            for outcome in outcomes
+        ]
+
+    def hovers(self, items: list[Tuple[str, int, int, str]]) -> list[Union[str, Exception, None]]:
+        """
+        Batch form of `hover`: the requests for all items are in flight together.
+
+        Args:
+            items: (path, line, character, keyword) tuples, as for `hover`
+
+        Returns:
+            For each item, its hover text, None if there is nothing to show, or the Exception
+            that prevented resolving it
+        """
+        outcomes = self._batch(items, lambda doc, position: (
+            types.TextDocumentHoverRequest,
+            types.HoverParams(text_document=doc, position=position),
+        ))
+        return [
+            outcome if isinstance(outcome, Exception) or outcome is None
+            else self.converter.structure(outcome, types.Hover).contents.value
+            for outcome in outcomes
+        ]
+
+    def definition_and_hover(self, line: int, character: int, keyword: str, path: str) -> Tuple[Any, Optional[str]]:
+        """
+        `show_definition` and `hover` of one symbol, with both requests in flight together.
+
+        Returns:
+            (definition result or None, hover text or None)
+        """
+        uri = Path(path).resolve().as_uri() if not path.startswith("file://") else path
+        self._open(uri)
+        doc = types.TextDocumentIdentifier(uri=uri)
+        position = self.locator(line, character, keyword, path)
+        definition, hover = self.request_many([
+            (types.TextDocumentDefinitionRequest, types.DefinitionParams(text_document=doc, position=position)),
+            (types.TextDocumentHoverRequest, types.HoverParams(text_document=doc, position=position)),
+        ])
+        if definition is not None and definition.get("result") is not None:
+            definition = self.converter.structure(definition, types.TextDocumentTypeDefinitionResponse).result
+        else:
+            definition = None
+        if hover is not None and hover.get("result") is not None:
+            hover = self.converter.structure(hover["result"], types.Hover).contents.value
+        else:
+            hover = None
+        return definition, hover
+
     def references(self, line: int, character: int, keyword: str, path: str) -> list[types.Location]:
         """
         Retrieves all references (including definition) to the given symbol in the codebase.
@@ -279,7 +502,7 @@ class LangServer(ABC):
             path: Path to the source file (with or without 'file://' prefix).
 
         Returns:
-            A list of `types.Location` where the symbol is referenced.
+            A list of `types.Location` where the symbol is referenced, empty if the server did not answer.
         """
         uri = Path(path).resolve().as_uri() if not path.startswith("file://") else path
         self._open(uri)
@@ -293,7 +516,8 @@ class LangServer(ABC):
                 context=types.ReferenceContext(include_declaration=True)
             )
         )
-        return self.converter.structure(result["result"], list[types.Location])
+        raw = (result or {}).get("result") or [] # None when the request timed out
+        return self.converter.structure(raw, list[types.Location])
 
     def document_symbols(
         self,
@@ -320,7 +544,7 @@ class LangServer(ABC):
             )
         )
 
-        raw = result.get("result", [])
+        raw = (result or {}).get("result") or [] # None when the request timed out
 
         if not raw:
             return []
@@ -343,6 +567,25 @@ class LangServer(ABC):
             structured = self.converter.structure(raw, list[types.SymbolInformation])
             return filter_by_kind(structured)
 
+    def workspace_symbols(self, query: str) -> list[Union[types.SymbolInformation, types.WorkspaceSymbol]]:
+        """
+        Searches the symbols of the whole workspace whose name matches `query` (fuzzy matching
+        is up to the server; an empty query may return everything).
+
+        Args:
+            query: Name, or part of a name, to search for.
+
+        Returns:
+            The matching SymbolInformation (or WorkspaceSymbol) entries.
+        """
+        result = self.request(types.WorkspaceSymbolRequest, params=types.WorkspaceSymbolParams(query=query))
+        raw = (result or {}).get("result") or [] # None when the request timed out
+        if not raw:
+            return []
+        if "range" in raw[0]["location"]: # SymbolInformation
+            return self.converter.structure(raw, list[types.SymbolInformation])
+        return self.converter.structure(raw, list[types.WorkspaceSymbol])
+
     @property
     @abstractmethod
     def language_id(self) -> str:
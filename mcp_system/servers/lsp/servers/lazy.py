@@ -0,0 +1,83 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+from servers.lsp.servers.base import LangServer
+
+logger = logging.getLogger(__name__)
+
+
+class LazyLangServer:
+    """
+    A language server (or pool) behind the `LangServer` interface that is started on a
+    background thread, so the MCP server can accept connections while pyright initializes.
+
+    Calls made before the server is up wait for it (up to `wait_timeout` seconds), which
+    queues early tool calls instead of failing them. Document sync notifications from before
+    that point are dropped: the server reads the files from disk when it starts anyway.
+    """
+    def __init__(self, server_factory: Callable[[], LangServer], wait_timeout: Optional[float] = None):
+        self.wait_timeout = wait_timeout
+        self._server: Optional[LangServer] = None
+        self._error: Optional[BaseException] = None
+        self._ready = threading.Event()
+        self._started_at = time.monotonic()
+        self._ready_after: Optional[float] = None
+        self._thread = threading.Thread(target=self._start, args=(server_factory,), name="lang-server-start", daemon=True)
+        self._thread.start()
+
+    def _start(self, server_factory: Callable[[], LangServer]):
+        try:
+            self._server = server_factory()
+            logger.info("language server ready after %.1fs", time.monotonic() - self._started_at)
+        except BaseException as e:
+            self._error = e
+            logger.exception("language server failed to start")
+        finally:
+            self._ready_after = time.monotonic() - self._started_at
+            self._ready.set()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set() and self._error is None
+
+    def wait(self, timeout: Optional[float] = None) -> LangServer:
+        """Block until the server is up and return it; raise if it failed or `timeout` passed."""
+        if not self._ready.wait(timeout):
+            raise TimeoutError(f"The language server is still starting after {time.monotonic() - self._started_at:.1f}s")
+        if self._error is not None:
+            raise RuntimeError(f"The language server failed to start: {self._error!r}") from self._error
+        return self._server
+
+    def status(self) -> dict:
+        """`starting`, `ready` or `failed`, with the seconds spent starting so far (or in total)."""
+        if not self._ready.is_set():
+            return {"status": "starting", "seconds": round(time.monotonic() - self._started_at, 3)}
+        status = {"status": "ready" if self._error is None else "failed", "seconds": round(self._ready_after, 3)}
+        if self._error is not None:
+            status["error"] = repr(self._error)
+        return status
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"): # not set up yet while unpickling or in __init__
+            raise AttributeError(name)
+        return getattr(self.wait(self.wait_timeout), name)
+
+    # Document sync before the server is up has nothing to update
+    def did_change(self, uri: str):
+        if self.ready:
+            self._server.did_change(uri)
+
+    def did_close(self, uri: str):
+        if self.ready:
+            self._server.did_close(uri)
+
+    def files_changed(self, changes: List[Tuple[str, Any]]):
+        if self.ready:
+            self._server.files_changed(changes)
+
+    def close(self):
+        self._ready.wait()
+        if self._server is not None:
+            self._server.close()
@@ -0,0 +1,66 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Tuple
+
+from servers.lsp.servers.base import LangServer
+
+
+class LangServerPool:
+    """
+    Several language servers over the same workspace behind the `LangServer` interface.
+
+    Every call goes to the member with the fewest calls in flight. Each member keeps its own
+    index, so a pool of one is the cheapest setup; extra members only add throughput when
+    many clients keep a single server busy.
+    """
+    def __init__(self, server_factory: Callable[[], LangServer], size: int = 1):
+        if size < 1:
+            raise ValueError("A language server pool needs at least one server")
+        with ThreadPoolExecutor(max_workers=size) as executor:
+            self.servers: List[LangServer] = list(executor.map(lambda _: server_factory(), range(size)))
+        self._lock = threading.Lock()
+        self._in_flight = [0] * size
+
+    def _acquire(self) -> int:
+        with self._lock:
+            member = min(range(len(self.servers)), key=self._in_flight.__getitem__)
+            self._in_flight[member] += 1
+            return member
+
+    def _release(self, member: int):
+        with self._lock:
+            self._in_flight[member] -= 1
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.servers[0], name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            member = self._acquire()
+            try:
+                return getattr(self.servers[member], name)(*args, **kwargs)
+            finally:
+                self._release(member)
+        return call
+
+    def for_uri(self, uri: str) -> 'LangServerPool':
+        """The pool serves its whole workspace; calls keep being balanced over the members."""
+        return self
+
+    # Document sync goes to every member, each of which keeps its own copy of the workspace
+    def did_change(self, uri: str):
+        for server in self.servers:
+            server.did_change(uri)
+
+    def did_close(self, uri: str):
+        for server in self.servers:
+            server.did_close(uri)
+
+    def files_changed(self, changes: List[Tuple[str, Any]]):
+        for server in self.servers:
+            server.files_changed(changes)
+
+    def close(self):
+        for server in self.servers:
+            server.close()
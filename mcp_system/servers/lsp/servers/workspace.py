@@ -0,0 +1,113 @@
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+from urllib.parse import urlparse, unquote
+
+from servers.lsp.servers.base import LangServer
+
+PROJECT_MARKERS = ("pyproject.toml", "setup.py", "setup.cfg")
+SKIP_DIRS = {".git", ".hg", ".venv", "venv", "node_modules", "site-packages", "build", "dist", "__pycache__"}
+
+
+class WorkspaceLangServers:
+    """
+    Routes requests to one language server per sub-project of a monorepo.
+
+    Sub-projects are discovered by marker files (pyproject.toml, setup.py, ...). Servers are
+    started lazily the first time a document of their sub-project is touched, so startup time
+    and memory scale with the packages a scan actually visits. Files outside every sub-project
+    are served by a server rooted at the workspace root.
+    """
+    def __init__(
+        self,
+        root_uri: str,
+        server_factory: Callable[[str], LangServer],
+        markers: Iterable[str] = PROJECT_MARKERS,
+    ):
+        self.root_uri = Path(root_uri).resolve().as_uri() if not root_uri.startswith("file://") else root_uri
+        self.server_factory = server_factory
+        self.subproject_roots = self._discover(markers)
+        self._servers: Dict[str, LangServer] = {}
+        self._starting: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def _discover(self, markers: Iterable[str]) -> List[str]:
+        markers = set(markers)
+        root_path = Path(unquote(urlparse(self.root_uri).path))
+        roots = []
+        for dirpath, dirnames, filenames in os.walk(root_path):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith(".")]
+            if markers.intersection(filenames):
+                roots.append(Path(dirpath).resolve().as_uri())
+        # Deepest roots first so nested packages win over their parents
+        return sorted(roots, key=len, reverse=True)
+
+    @property
+    def workspace_roots(self) -> List[str]:
+        return list(self.subproject_roots) or [self.root_uri]
+
+    def root_for(self, uri: str) -> str:
+        uri = Path(uri).resolve().as_uri() if not uri.startswith("file://") else uri
+        for root in self.subproject_roots:
+            if uri == root or uri.startswith(root + "/"):
+                return root
+        return self.root_uri
+
+    def for_uri(self, uri: str) -> LangServer:
+        """Return the language server of the sub-project containing `uri`, starting it if needed."""
+        return self._server(self.root_for(uri))
+
+    def _server(self, root: str) -> LangServer:
+        while True:
+            with self._lock:
+                server = self._servers.get(root)
+                if server is not None:
+                    return server
+                starting = self._starting.get(root)
+                if starting is None:
+                    self._starting[root] = threading.Event()
+                    break
+            starting.wait() # another thread is starting this server
+
+        try:
+            server = self.server_factory(root)
+            with self._lock:
+                self._servers[root] = server
+        finally:
+            with self._lock:
+                self._starting.pop(root).set()
+        return server
+
+    # Document sync only reaches servers that are already running; the others read the
+    # current content from disk when they start
+    def did_change(self, uri: str):
+        server = self.servers.get(self.root_for(uri))
+        if server is not None:
+            server.did_change(uri)
+
+    def did_close(self, uri: str):
+        server = self.servers.get(self.root_for(uri))
+        if server is not None:
+            server.did_close(uri)
+
+    def files_changed(self, changes: List[Tuple[str, Any]]):
+        groups: Dict[str, List[Tuple[str, Any]]] = {}
+        for uri, change in changes:
+            groups.setdefault(self.root_for(uri), []).append((uri, change))
+        servers = self.servers
+        for root, group in groups.items():
+            if root in servers:
+                servers[root].files_changed(group)
+
+    @property
+    def servers(self) -> Dict[str, LangServer]:
+        """Servers started so far, keyed by sub-project root URI."""
+        with self._lock:
+            return dict(self._servers)
+
+    def close(self):
+        with self._lock:
+            servers, self._servers = list(self._servers.values()), {}
+        for server in servers:
+            server.close()
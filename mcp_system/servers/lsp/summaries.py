@@ -0,0 +1,60 @@
+import json
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlparse, unquote
+
+
+class Summary(NamedTuple):
+    name: str
+    path: str
+    code: str
+    context: Optional[str]
+    dependencies: Tuple[Tuple[str, str], ...] # (name, path) of each direct dependency
+
+
+def _path_of(uri: str) -> str:
+    return unquote(urlparse(uri).path) if uri.startswith("file://") else uri
+
+
+class SummaryIndex:
+    """
+    The component summaries `CacheAgent` stores (a JSON list of `CacheAgentState`, see
+    `CacheAgentPreprocess.store_data`), indexed by (file path, name) for O(1) lookups.
+
+    States do not record positions, so components sharing a name in one file (e.g. methods
+    of different classes) are told apart by the first line of their code.
+    """
+    def __init__(self, states: List[dict]):
+        self._by_name: Dict[Tuple[str, str], List[Summary]] = {}
+        for state in states:
+            node = state["node"]
+            summary = Summary(
+                name=node["name"],
+                path=_path_of(node["path"]),
+                code=node.get("code_content") or "",
+                context=state.get("context"),
+                dependencies=tuple((dep["name"], _path_of(dep["path"])) for dep in state.get("dependencies") or ()),
+            )
+            self._by_name.setdefault((summary.path, summary.name), []).append(summary)
+
+    @classmethod
+    def load(cls, path: str) -> 'SummaryIndex':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def __len__(self) -> int:
+        return sum(len(summaries) for summaries in self._by_name.values())
+
+    def lookup(self, path: str, name: str, first_line: Optional[str] = None) -> Optional[Summary]:
+        """
+        Summary of the component `name` defined in `path` (a path or file URI). When several
+        match, the one whose code starts with `first_line` wins.
+        """
+        candidates = self._by_name.get((_path_of(path), name))
+        if not candidates:
+            return None
+        if len(candidates) > 1 and first_line is not None:
+            first_line = first_line.strip()
+            for summary in candidates:
+                if summary.code.lstrip().split("\n", 1)[0].strip() == first_line:
+                    return summary
+        return candidates[0]
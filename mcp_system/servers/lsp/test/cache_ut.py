@@ -0,0 +1,129 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from lsprotocol.types import Position
+
+from servers.lsp.cache import ENTRY_OVERHEAD_BYTES, ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.a = self.write("a.py", "def a():\n    return b()\n")
+        self.b = self.write("b.py", "def b():\n    return 1\n")
+        self.locates = 0
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name: str, text: str) -> str:
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def locate(self) -> Position:
+        self.locates += 1
+        return Position(line=1, character=11)
+
+    def key(self, cache: ResponseCache, path: str, tool: str = "ShowDefinition", character: int = 10):
+        return cache.key(tool, path, 1, character, "b", self.locate)
+
+    def test_key_shares_resolved_positions(self):
+        cache = ResponseCache()
+        first = self.key(cache, self.a, character=10)
+        second = self.key(cache, self.a, character=10)
+        self.assertEqual(first, second)
+        self.assertEqual(self.locates, 1)
+        # Another approximate position resolving to the same place shares the entry
+        self.assertEqual(self.key(cache, self.a, character=12), first)
+        self.assertEqual(self.locates, 2)
+        self.assertEqual(cache.key("ShowDefinition", "file://" + self.a, 1, 10, "b", self.locate), first)
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_bytes=3 * (ENTRY_OVERHEAD_BYTES + 1))
+        keys = [self.key(cache, self.a, tool=f"tool{i}") for i in range(4)]
+        for key in keys[:3]:
+            cache.put(key, "x")
+        self.assertEqual(cache.get(keys[0]), "x") # now the most recently used
+        cache.put(keys[3], "x")
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertEqual([cache.get(key) for key in (keys[0], keys[2], keys[3])], ["x"] * 3)
+        stats = cache.stats()
+        self.assertEqual((stats["entries"], stats["evictions"]), (3, 1))
+        self.assertEqual(stats["bytes"], 3 * (ENTRY_OVERHEAD_BYTES + 1))
+
+    def test_invalidate_drops_entries_for_and_related_to_path(self):
+        cache = ResponseCache()
+        own = self.key(cache, self.a, tool="Hover")
+        derived = self.key(cache, self.a)
+        other = self.key(cache, self.b)
+        cache.put(own, "hover of b")
+        cache.put(derived, "b.py:1:5", related=[self.b])
+        cache.put(other, "b.py:1:5")
+
+        cache.invalidate("file://" + self.b)
+        self.assertEqual(cache.get(own), "hover of b")
+        self.assertIsNone(cache.get(derived))
+        self.assertIsNone(cache.get(other))
+        self.assertEqual(cache.stats()["invalidations"], 2)
+
+        cache.invalidate(self.b) # nothing left to drop
+        self.assertEqual(cache.stats()["invalidations"], 2)
+        cache.invalidate(self.a)
+        self.assertEqual(cache.stats()["entries"], 0)
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+    def test_content_change_drops_entries(self):
+        cache = ResponseCache()
+        key = self.key(cache, self.a)
+        cache.put(key, "b.py:1:5")
+        self.write("a.py", "def a():\n    return b() + 1\n")
+        self.assertNotEqual(self.key(cache, self.a), key)
+        self.assertIsNone(cache.get(key))
+
+    def test_get_or_compute(self):
+        cache = ResponseCache()
+        calls = []
+        compute = lambda: calls.append(1) or f"{self.b}:1:5"
+        for _ in range(3):
+            value = cache.get_or_compute("ShowDefinition", self.a, 1, 10, "b", self.locate, compute,
+                                         related=lambda value: [value.split(":")[0]])
+        self.assertEqual((value, len(calls)), (f"{self.b}:1:5", 1))
+        cache.invalidate(self.b)
+        cache.get_or_compute("ShowDefinition", self.a, 1, 10, "b", self.locate, compute)
+        self.assertEqual(len(calls), 2)
+
+    def test_concurrent_use(self):
+        cache = ResponseCache(max_bytes=50 * (ENTRY_OVERHEAD_BYTES + 8))
+        paths = [self.write(f"m{i}.py", f"x = {i}\n") for i in range(20)]
+        errors = []
+
+        def run(n):
+            try:
+                for i in range(300):
+                    path = paths[(n + i) % len(paths)]
+                    key = cache.key("Hover", path, i % 7, 0, "x", lambda: Position(line=i % 7, character=0))
+                    cache.put(key, f"{i:8d}", related=[paths[i % len(paths)]])
+                    cache.get(key)
+                    if i % 10 == 0:
+                        cache.invalidate(paths[(n * i) % len(paths)])
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        stats = cache.stats()
+        self.assertLessEqual(stats["bytes"], cache.max_bytes)
+        self.assertEqual(stats["bytes"], stats["entries"] * (ENTRY_OVERHEAD_BYTES + 8))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from servers.lsp.dispatch import ToolDispatcher
+
+
+class FakeSession:
+    pass
+
+
+class FakeContext:
+    def __init__(self, session):
+        self.session = session
+
+
+class TestToolDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.order = []
+        self.running = {}
+        self.peak = {}
+
+    def work(self, name: str, session: str, seconds: float = 0.02):
+        with self.lock:
+            self.order.append(name)
+            self.running[session] = self.running.get(session, 0) + 1
+            self.peak[session] = max(self.peak.get(session, 0), self.running[session])
+        time.sleep(seconds)
+        with self.lock:
+            self.running[session] -= 1
+        return name
+
+    def test_per_client_limit(self):
+        dispatcher = ToolDispatcher(max_workers=8, per_client=2)
+        a, b = FakeContext(FakeSession()), FakeContext(FakeSession())
+
+        async def main():
+            calls = [dispatcher.run(a, self.work, f"a{i}", "a") for i in range(6)]
+            calls += [dispatcher.run(b, self.work, f"b{i}", "b") for i in range(2)]
+            return await asyncio.gather(*calls)
+
+        results = asyncio.run(main())
+        dispatcher.close()
+        self.assertEqual(results, [f"a{i}" for i in range(6)] + ["b0", "b1"])
+        self.assertEqual(self.peak, {"a": 2, "b": 2})
+        self.assertEqual(dispatcher.stats()["busy"], 0)
+
+    def test_fair_queuing_across_sessions(self):
+        dispatcher = ToolDispatcher(max_workers=1, per_client=10)
+        a, b, c = (FakeContext(FakeSession()) for _ in range(3))
+
+        async def main():
+            # a queues a long backlog first; b and c must not wait behind all of it
+            calls = [asyncio.ensure_future(dispatcher.run(a, self.work, f"a{i}", "a", 0.01)) for i in range(4)]
+            await asyncio.sleep(0)
+            calls += [asyncio.ensure_future(dispatcher.run(b, self.work, f"b{i}", "b", 0.01)) for i in range(2)]
+            calls += [asyncio.ensure_future(dispatcher.run(c, self.work, "c0", "c", 0.01))]
+            await asyncio.sleep(0)
+            self.assertEqual(dispatcher.stats()["waiting_sessions"], 3)
+            await asyncio.gather(*calls)
+
+        asyncio.run(main())
+        dispatcher.close()
+        self.assertEqual(self.order, ["a0", "a1", "b0", "c0", "a2", "b1", "a3"])
+        self.assertEqual(dispatcher.stats(), {"workers": 1, "busy": 0, "waiting_sessions": 0, "waiting_calls": 0})
+
+    def test_cancelled_call_leaves_the_queue(self):
+        dispatcher = ToolDispatcher(max_workers=1, per_client=10)
+        a, b = FakeContext(FakeSession()), FakeContext(FakeSession())
+
+        async def main():
+            first = asyncio.ensure_future(dispatcher.run(a, self.work, "a0", "a", 0.05))
+            await asyncio.sleep(0)
+            waiting = asyncio.ensure_future(dispatcher.run(b, self.work, "b0", "b"))
+            await asyncio.sleep(0)
+            waiting.cancel()
+            await first
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            self.assertEqual(await dispatcher.run(a, self.work, "a1", "a"), "a1")
+
+        asyncio.run(main())
+        dispatcher.close()
+        self.assertEqual(self.order, ["a0", "a1"])
+        self.assertEqual(dispatcher.stats()["busy"], 0)
+
+    def test_errors_release_the_slot(self):
+        dispatcher = ToolDispatcher(max_workers=1, per_client=1)
+        a = FakeContext(FakeSession())
+
+        def fail():
+            raise ValueError("boom")
+
+        async def main():
+            with self.assertRaises(ValueError):
+                await dispatcher.run(a, fail)
+            return await dispatcher.run(a, self.work, "a0", "a")
+
+        self.assertEqual(asyncio.run(main()), "a0")
+        dispatcher.close()
+        self.assertEqual(dispatcher.stats()["busy"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
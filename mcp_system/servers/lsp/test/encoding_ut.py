@@ -0,0 +1,134 @@
+import unittest
+
+from lsprotocol import types
+
+from servers.lsp.encoding import CompactEncoder, paginate
+
+
+def location(uri: str, line: int, character: int, end_line: int, end_character: int) -> types.Location:
+    return types.Location(uri=uri, range=types.Range(
+        start=types.Position(line=line, character=character),
+        end=types.Position(line=end_line, character=end_character),
+    ))
+
+
+def parse_range(text: str):
+    """Inverse of `CompactEncoder.range`: 1-based `line:col[-[line:]col]` to 0-based (start, end)."""
+    start, _, end = text.partition("-")
+    line, character = (int(part) for part in start.split(":"))
+    if not end:
+        return (line - 1, character - 1), (line - 1, character)
+    end_line, _, end_character = end.rpartition(":")
+    return (line - 1, character - 1), (int(end_line) - 1 if end_line else line - 1, int(end_character))
+
+
+class TestCompactEncoder(unittest.TestCase):
+
+    def setUp(self):
+        self.encoder = CompactEncoder(root="file:///repo")
+
+    def test_paths_round_trip(self):
+        for path in ("/repo/pkg/mod.py", "/elsewhere/lib.py", "/repo/with space.py"):
+            self.assertEqual(self.encoder.absolute(self.encoder.path(path)), path)
+        self.assertEqual(self.encoder.path("file:///repo/with%20space.py"), "with space.py")
+        self.assertEqual(self.encoder.path("/repo/pkg/mod.py"), "pkg/mod.py")
+        self.assertEqual(self.encoder.path("/repository/mod.py"), "/repository/mod.py")
+
+    def test_ranges_round_trip(self):
+        # A one-character range and an empty one both encode as the start position alone
+        for start, end in [((11, 4), (11, 5)), ((11, 4), (11, 9)), ((3, 0), (7, 12))]:
+            lsp_range = types.Range(start=types.Position(*start), end=types.Position(*end))
+            self.assertEqual(parse_range(self.encoder.range(lsp_range)), (start, end))
+        empty = types.Range(start=types.Position(11, 4), end=types.Position(11, 4))
+        self.assertEqual(self.encoder.range(empty), "12:5")
+
+    def test_locations_group_by_file_and_round_trip(self):
+        result = [
+            location("file:///repo/pkg/mod.py", 11, 4, 11, 9),
+            location("file:///elsewhere/lib.py", 0, 0, 0, 3),
+            location("file:///repo/pkg/mod.py", 39, 0, 39, 3),
+        ]
+        encoded = self.encoder.locations(result)
+        self.assertEqual(encoded, "pkg/mod.py:12:5-9, 40:1-3\n/elsewhere/lib.py:1:1-3")
+        self.assertEqual(self.encoder.files_in(encoded), {"/repo/pkg/mod.py", "/elsewhere/lib.py"})
+        decoded = []
+        for line in encoded.split("\n"):
+            path, _, ranges = line.partition(":")
+            decoded += [(self.encoder.absolute(path), parse_range(r)) for r in ranges.split(", ")]
+        expected = [(item.uri[len("file://"):], ((item.range.start.line, item.range.start.character),
+                                                 (item.range.end.line, item.range.end.character)))
+                    for item in result]
+        self.assertEqual(sorted(decoded), sorted(expected))
+
+    def test_location_links_and_empty(self):
+        link = types.LocationLink(
+            target_uri="file:///repo/a.py",
+            target_range=types.Range(start=types.Position(0, 0), end=types.Position(5, 0)),
+            target_selection_range=types.Range(start=types.Position(0, 4), end=types.Position(0, 7)),
+        )
+        self.assertEqual(self.encoder.locations(link), "a.py:1:5-7")
+        self.assertEqual(self.encoder.locations(None), "no definition found")
+        self.assertEqual(self.encoder.locations([], empty="none"), "none")
+
+    def test_hover(self):
+        text = "```python\n(function) def f(\n    x: int,\n) -> int\n```\n---\nDoubles x.\n\n\n\nMore."
+        self.assertEqual(self.encoder.hover(text), "(function) def f(x: int) -> int\nDoubles x.\n\nMore.")
+        self.assertEqual(self.encoder.hover("(variable) x: int"), "(variable) x: int")
+        self.assertEqual(self.encoder.hover(None), "no hover information")
+
+    def test_hover_truncation(self):
+        encoder = CompactEncoder(hover_chars=20)
+        doc = "word " * 10
+        signature, rest = encoder.hover(f"(function) def f() -> None\n\n{doc}").split("\n")
+        self.assertEqual(signature, "(function) def f() -> None")
+        self.assertEqual(rest, "word word word word …[+30 chars]")
+        self.assertEqual(CompactEncoder(hover_chars=None).truncate(doc), doc)
+
+
+class TestPaginate(unittest.TestCase):
+
+    def setUp(self):
+        self.listing = "\n".join(f"a.py:{i}:1 name{i}" for i in range(1, 6))
+
+    def pages(self, limit: int):
+        """Follow next_cursor from the first page to the last."""
+        pages, cursor = [], None
+        while True:
+            page = paginate(self.listing, limit, cursor)
+            pages.append(page)
+            header = page.split("\n", 1)[0]
+            if "next_cursor: " not in header:
+                return pages
+            cursor = header.rsplit("next_cursor: ", 1)[1]
+
+    def test_page_boundaries(self):
+        pages = self.pages(2)
+        self.assertEqual([page.split("\n")[0] for page in pages], [
+            "results 1-2 of 5, next_cursor: 2",
+            "results 3-4 of 5, next_cursor: 4",
+            "results 5-5 of 5",
+        ])
+        entries = [line for page in pages for line in page.split("\n")[1:]]
+        self.assertEqual(entries, self.listing.split("\n"))
+
+    def test_exact_fit_has_no_cursor(self):
+        self.assertEqual(self.pages(5)[0].split("\n")[0], "results 1-5 of 5")
+        self.assertEqual(len(self.pages(1)), 5)
+
+    def test_past_the_end_and_empty(self):
+        self.assertEqual(paginate(self.listing, 2, "5"), "no results (total 5)")
+        self.assertEqual(paginate(self.listing, 2, "9"), "no results (total 5)")
+        self.assertEqual(paginate("", 10, None), "no results (total 0)")
+
+    def test_invalid_cursor(self):
+        for cursor in ("abc", "-1", "1.5"):
+            with self.assertRaises(ValueError):
+                paginate(self.listing, 2, cursor)
+
+    def test_format_page(self):
+        page = paginate(self.listing, 2, "1", CompactEncoder().group_by_file)
+        self.assertEqual(page, "results 2-3 of 5, next_cursor: 3\na.py\n  2:1 name2\n  3:1 name3")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from lsprotocol import types
+
+from servers.lsp.servers.python import PythonLangServer
+from servers.lsp.servers.base import LangServer
+
+# A stdio language server that answers every request at once, except workspace symbol
+# queries for "silent", which it never answers, and requests about broken.py, which fail
+FAKE_SERVER = r'''
+import json, sys
+stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+while True:
+    headers = {}
+    while True:
+        line = stdin.readline()
+        if not line:
+            sys.exit(0)
+        line = line.strip()
+        if not line:
+            break
+        key, value = line.split(b":", 1)
+        headers[key.strip().lower()] = value.strip()
+    message = json.loads(stdin.read(int(headers[b"content-length"])))
+    if "id" not in message:
+        continue
+    method, params = message["method"], message.get("params") or {}
+    if method == "workspace/symbol" and params.get("query") == "silent":
+        continue
+    position = params.get("position", {"line": 0, "character": 0})
+    uri = params.get("textDocument", {}).get("uri", "file:///x.py")
+    if uri.endswith("broken.py"):
+        body = json.dumps({"jsonrpc": "2.0", "id": message["id"], "error": {"code": -32603, "message": "broken"}}).encode()
+        stdout.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+        stdout.flush()
+        continue
+    location = {"uri": uri, "range": {"start": position, "end": position}}
+    result = {
+        "initialize": {"capabilities": {}},
+        "textDocument/hover": {"contents": {"kind": "plaintext", "value": "hover %(line)d:%(character)d" % position}},
+        "textDocument/definition": [location],
+        "textDocument/references": [location],
+    }.get(method)
+    body = json.dumps({"jsonrpc": "2.0", "id": message["id"], "result": result}).encode()
+    stdout.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+    stdout.flush()
+'''
+
+
+class FakeLangServer(PythonLangServer):
+    def __init__(self, root_uri: str):
+        LangServer.__init__(self, cmd=[sys.executable, "-c", FAKE_SERVER], root_uri=root_uri)
+
+
+class TestRequests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp.name, "mod.py")
+        with open(cls.path, "w") as f:
+            f.write("".join(f"name{i} = {i}\n" for i in range(10)))
+        cls.broken = os.path.join(cls.tmp.name, "broken.py")
+        with open(cls.broken, "w") as f:
+            f.write("name0 = 0\n")
+        cls.lsp = FakeLangServer(Path(cls.tmp.name).as_uri())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.lsp.close()
+        cls.tmp.cleanup()
+
+    def test_immediate_responses_are_not_lost(self):
+        start = time.monotonic()
+        for i in range(100):
+            result = self.lsp.request(types.WorkspaceSymbolRequest, types.WorkspaceSymbolParams(query=f"q{i}"))
+            self.assertIsNotNone(result)
+        for i in range(50):
+            definition, hover = self.lsp.definition_and_hover(i % 10, 0, f"name{i % 10}", self.path)
+            self.assertEqual(definition[0].range.start.line, i % 10)
+            self.assertEqual(hover, f"hover {i % 10}:0")
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_batch_keeps_request_order(self):
+        items = [(self.path, i, 0, f"name{i}") for i in range(10)]
+        self.assertEqual(self.lsp.hovers(items), [f"hover {i}:0" for i in range(10)])
+        definitions = self.lsp.show_definitions(items)
+        self.assertEqual([d[0].range.start.line for d in definitions], list(range(10)))
+
+    def test_batch_reports_failures_per_item(self):
+        missing = os.path.join(self.tmp.name, "missing.py")
+        items = [(self.path, 1, 0, "name1"), (missing, 0, 0, "name0"), (self.broken, 0, 0, "name0"), (self.path, 2, 0, "name2")]
+        first, absent, broken, last = self.lsp.hovers(items)
+        self.assertEqual((first, last), ("hover 1:0", "hover 2:0"))
+        self.assertIsInstance(absent, FileNotFoundError)
+        self.assertIsInstance(broken, RuntimeError)
+        self.assertEqual(str(broken), "broken")
+
+        request_many = self.lsp.request_many
+        self.lsp.request_many = lambda requests: [None] * len(requests)
+        try:
+            outcomes = self.lsp.show_definitions(items[:1])
+        finally:
+            self.lsp.request_many = request_many
+        self.assertIsInstance(outcomes[0], TimeoutError)
+
+    def test_concurrent_requests(self):
+        errors = []
+
+        def run(n):
+            items = [(self.path, (n + i) % 10, 0, f"name{(n + i) % 10}") for i in range(5)]
+            expected = [f"hover {line}:0" for _, line, _, _ in items]
+            for _ in range(10):
+                if self.lsp.hovers(items) != expected:
+                    errors.append(n)
+
+        threads = [threading.Thread(target=run, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_batch_timeout_is_overall(self):
+        waiters = []
+        for _ in range(5):
+            request_id, waiter = self.lsp._register()
+            self.lsp._send_request(types.WorkspaceSymbolRequest(id=request_id, params=types.WorkspaceSymbolParams(query="silent")))
+            waiters.append((request_id, waiter))
+        start = time.monotonic()
+        self.assertEqual(self.lsp._wait_for_all(waiters, timeout=0.2), {})
+        self.assertLess(time.monotonic() - start, 0.6)
+        self.assertFalse(any(request_id in self.lsp._pending for request_id, _ in waiters))
+
+    def test_references(self):
+        [location] = self.lsp.references(3, 0, "name3", self.path)
+        self.assertEqual(location.range.start.line, 3)
+
+    def test_references_timeout(self):
+        request = self.lsp.request
+        self.lsp.request = lambda cls, params: None
+        try:
+            self.assertEqual(self.lsp.references(3, 0, "name3", self.path), [])
+            self.assertEqual(self.lsp.document_symbols(self.path), [])
+        finally:
+            self.lsp.request = request
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import threading
+import unittest
+
+from servers.lsp.servers.lazy import LazyLangServer
+
+
+class FakeLangServer:
+    root_uri = "file:///repo"
+
+    def __init__(self):
+        self.synced = []
+        self.closed = False
+
+    def hover(self, line, character, keyword, path):
+        return f"hover {keyword}"
+
+    def did_change(self, uri):
+        self.synced.append(uri)
+
+    def did_close(self, uri):
+        self.synced.append(uri)
+
+    def files_changed(self, changes):
+        self.synced.extend(uri for uri, _ in changes)
+
+    def close(self):
+        self.closed = True
+
+
+class TestLazyLangServer(unittest.TestCase):
+
+    def setUp(self):
+        self.started = threading.Event()
+        self.server = FakeLangServer()
+
+    def factory(self):
+        self.started.wait(5)
+        return self.server
+
+    def test_calls_wait_for_the_server(self):
+        lazy = LazyLangServer(self.factory)
+        self.assertFalse(lazy.ready)
+        self.assertEqual(lazy.status()["status"], "starting")
+        lazy.did_change("file:///repo/early.py") # nothing to update yet
+
+        answers = []
+        caller = threading.Thread(target=lambda: answers.append(lazy.hover(0, 0, "x", "a.py")))
+        caller.start()
+        caller.join(0.05)
+        self.assertTrue(caller.is_alive())
+        self.started.set()
+        caller.join(5)
+        self.assertEqual(answers, ["hover x"])
+
+        self.assertTrue(lazy.ready)
+        self.assertEqual(lazy.status()["status"], "ready")
+        self.assertEqual(lazy.root_uri, "file:///repo")
+        lazy.did_change("file:///repo/a.py")
+        lazy.did_close("file:///repo/b.py")
+        lazy.files_changed([("file:///repo/c.py", 2)])
+        self.assertEqual(self.server.synced, ["file:///repo/a.py", "file:///repo/b.py", "file:///repo/c.py"])
+        lazy.close()
+        self.assertTrue(self.server.closed)
+
+    def test_wait_timeout(self):
+        lazy = LazyLangServer(self.factory, wait_timeout=0.05)
+        with self.assertRaises(TimeoutError):
+            lazy.hover(0, 0, "x", "a.py")
+        self.started.set()
+        self.assertEqual(lazy.hover(0, 0, "x", "a.py"), "hover x")
+        lazy.close()
+
+    def test_failed_start(self):
+        def factory():
+            raise FileNotFoundError("pyright-langserver")
+
+        lazy = LazyLangServer(factory)
+        with self.assertRaises(RuntimeError) as raised:
+            lazy.hover(0, 0, "x", "a.py")
+        self.assertIsInstance(raised.exception.__cause__, FileNotFoundError)
+        status = lazy.status()
+        self.assertEqual(status["status"], "failed")
+        self.assertIn("pyright-langserver", status["error"])
+        self.assertFalse(lazy.ready)
+        lazy.did_change("file:///repo/a.py")
+        lazy.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import threading
+import time
+import unittest
+
+from servers.lsp.servers.pool import LangServerPool
+
+
+def wait_until(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.001)
+
+
+class FakeLangServer:
+    """Records calls; `hover` blocks until the test releases it."""
+    root_uri = "file:///repo"
+
+    def __init__(self, number: int, release: threading.Event):
+        self.number = number
+        self.release = release
+        self.synced = []
+        self.closed = False
+
+    def hover(self, line, character, keyword, path):
+        self.release.wait(5)
+        return self.number
+
+    def did_change(self, uri):
+        self.synced.append(("change", uri))
+
+    def did_close(self, uri):
+        self.synced.append(("close", uri))
+
+    def files_changed(self, changes):
+        self.synced.append(("files", changes))
+
+    def close(self):
+        self.closed = True
+
+
+class TestLangServerPool(unittest.TestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.created = iter(range(100))
+        self.pool = LangServerPool(lambda: FakeLangServer(next(self.created), self.release), size=3)
+
+    def test_balances_calls_in_flight(self):
+        answers = []
+        threads = [threading.Thread(target=lambda: answers.append(self.pool.hover(0, 0, "x", "a.py"))) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        wait_until(lambda: sum(self.pool._in_flight) == 6)
+        self.assertEqual(self.pool._in_flight, [2, 2, 2])
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(answers), [0, 0, 1, 1, 2, 2])
+        self.assertEqual(self.pool._in_flight, [0, 0, 0])
+
+    def test_errors_release_the_member(self):
+        def fail(*args):
+            raise FileNotFoundError("a.py")
+        for server in self.pool.servers:
+            server.hover = fail
+        for _ in range(4):
+            with self.assertRaises(FileNotFoundError):
+                self.pool.hover(0, 0, "x", "a.py")
+        self.assertEqual(self.pool._in_flight, [0, 0, 0])
+
+    def test_sync_and_close_reach_every_member(self):
+        self.pool.did_change("file:///repo/a.py")
+        self.pool.did_close("file:///repo/b.py")
+        self.pool.files_changed([("file:///repo/a.py", 2)])
+        self.pool.close()
+        for server in self.pool.servers:
+            self.assertEqual(server.synced, [("change", "file:///repo/a.py"), ("close", "file:///repo/b.py"),
+                                             ("files", [("file:///repo/a.py", 2)])])
+            self.assertTrue(server.closed)
+
+    def test_attributes_and_for_uri(self):
+        self.assertEqual(self.pool.root_uri, "file:///repo")
+        self.assertIs(self.pool.for_uri("file:///repo/a.py"), self.pool)
+        with self.assertRaises(ValueError):
+            LangServerPool(lambda: None, size=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
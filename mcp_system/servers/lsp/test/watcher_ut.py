@@ -0,0 +1,93 @@
+import os
+import queue
+import tempfile
+import time
+import unittest
+
+from lsprotocol.types import Position
+
+from servers.lsp.cache import ResponseCache
+from servers.lsp.watcher import FileWatcher
+
+# Short enough to keep the tests fast; the debounce spans several polls so one edit burst is one batch
+POLL_INTERVAL = 0.05
+DEBOUNCE = 0.2
+TIMEOUT = 5
+
+
+class TestPollingWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self.tmp.name)
+        self.edited = self.write("edited.py", "x = 1\n")
+        self.deleted = self.write("deleted.py", "y = 1\n")
+        self.write("notes.txt", "not python\n")
+        self.batches = queue.Queue()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name: str, text: str) -> str:
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def watch(self, on_change) -> FileWatcher:
+        watcher = FileWatcher(self.root, on_change, debounce=DEBOUNCE, poll_interval=POLL_INTERVAL, use_inotify=False)
+        self.assertEqual(watcher.backend, "polling")
+        watcher.start()
+        self.addCleanup(watcher.stop)
+        time.sleep(POLL_INTERVAL * 4) # let the first snapshot be taken before touching files
+        return watcher
+
+    def test_changes_arrive_in_one_batch(self):
+        self.watch(self.batches.put)
+        self.write("edited.py", "x = 2  # longer\n")
+        created = self.write(os.path.join("pkg", "created.py"), "z = 1\n")
+        os.remove(self.deleted)
+        self.write("notes.txt", "still not python\n")
+
+        self.assertEqual(self.batches.get(timeout=TIMEOUT), {self.edited, created, self.deleted})
+        time.sleep(DEBOUNCE * 2)
+        self.assertTrue(self.batches.empty())
+
+    def test_failing_handler_keeps_watching(self):
+        def on_change(paths):
+            self.batches.put(paths)
+            raise FileNotFoundError(next(iter(paths)))
+
+        self.watch(on_change)
+        self.write("edited.py", "x = 2  # longer\n")
+        self.assertEqual(self.batches.get(timeout=TIMEOUT), {self.edited})
+        os.remove(self.deleted)
+        self.assertEqual(self.batches.get(timeout=TIMEOUT), {self.deleted})
+
+    def test_change_evicts_related_cache_entries(self):
+        cache = ResponseCache()
+        user = self.write("user.py", "from edited import x\nprint(x)\n")
+        unrelated = self.write("unrelated.py", "w = 1\n")
+        locate = lambda: Position(line=1, character=6)
+        derived = cache.get_or_compute("ShowDefinition", user, 1, 6, "x", locate,
+                                       compute=lambda: "edited.py:1:1-2", related=lambda _: [self.edited])
+        kept = cache.get_or_compute("ShowDefinition", unrelated, 0, 0, "w", locate, compute=lambda: "unrelated.py:1:1-2")
+
+        def on_change(paths):
+            for path in paths:
+                cache.invalidate(path)
+            self.batches.put(paths)
+
+        self.watch(on_change)
+        self.write("edited.py", "x = 2  # longer\n")
+        self.assertEqual(self.batches.get(timeout=TIMEOUT), {self.edited})
+
+        # user.py itself did not change, but its answer was derived from edited.py
+        self.assertIsNone(cache.get(cache.key("ShowDefinition", user, 1, 6, "x", locate)))
+        self.assertEqual(cache.get(cache.key("ShowDefinition", unrelated, 0, 0, "w", locate)), kept)
+        self.assertEqual(derived, "edited.py:1:1-2")
+
+
+if __name__ == '__main__':
+    unittest.main()
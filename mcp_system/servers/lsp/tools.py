@@ -1,42 +1,152 @@
-from typing import Annotated
-from pydantic import Field
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Annotated, Callable, List, Literal, Optional, Set, Tuple, Union
+from pydantic import BaseModel, Field
 from fastmcp import Context
+from starlette.requests import Request
+from starlette.responses import JSONResponse
 
 from fmcp import mcp
-from servers import PythonLangServer
+from cache import ResponseCache
+from dispatch import ToolDispatcher
+from encoding import CompactEncoder, paginate
+from summaries import SummaryIndex
+from watcher import FileWatcher
+from servers import PythonLangServer, LangServerPool, LazyLangServer
 
-pylsp = None
+logger = logging.getLogger(__name__)
 
-def register_tools(uri: str):
-    global pylsp
-    pylsp = PythonLangServer(root_uri=uri)
+pylsp = None # LazyLangServer: starts in the background, early calls wait for it
+graph = None # preloaded KnowledgeGraph backing the graph tools
+graph_lock = threading.RLock() # the watcher updates the graph while tools read it
+graph_scanner = None # re-scans changed documents into `graph`
+watcher = None
+summaries = None # SummaryIndex of the CacheAgent summaries, for ExplainSymbol
+cache = ResponseCache() # answers of the position-based tools
+encoder = CompactEncoder() # renders tool results as short text
+dispatcher = ToolDispatcher() # runs blocking tool bodies off the event loop
+
+def register_tools(uri: str, cache_bytes: Optional[int] = None, max_workers: Optional[int] = None, per_client: Optional[int] = None,
+                   pool_size: int = 1, hover_chars: Optional[int] = -1, wait_timeout: Optional[float] = None):
+    """
+    Start the language server(s) for the repository at `uri` on a background thread and return
+    at once. The server, the response cache and the dispatcher are module-level, so every client
+    session shares one warm index. Tool calls made before the server is up wait for it, for at
+    most `wait_timeout` seconds (None for no limit). `hover_chars` caps hover documentation
+    (None for no cap, -1 keeps the default).
+    """
+    global pylsp, dispatcher
+    encoder.root = uri
+    if hover_chars != -1:
+        encoder.hover_chars = hover_chars
+    if pool_size > 1:
+        pylsp = LazyLangServer(lambda: LangServerPool(lambda: PythonLangServer(root_uri=uri), size=pool_size), wait_timeout)
+    else:
+        pylsp = LazyLangServer(lambda: PythonLangServer(root_uri=uri), wait_timeout)
+    if cache_bytes is not None:
+        cache.max_bytes = cache_bytes
+    if max_workers is not None or per_client is not None:
+        dispatcher.close()
+        dispatcher = ToolDispatcher(
+            max_workers=max_workers or dispatcher.max_workers,
+            per_client=per_client or dispatcher.per_client,
+        )
+
+def register_graph(snapshot_path: str):
+    """Load the graph snapshot (written by `KnowledgeGraph.to_snapshot`) that the graph tools answer from."""
+    global graph
+    from graph.snapshot import load_snapshot
+    graph = load_snapshot(snapshot_path)
+
+def register_summaries(summaries_path: str):
+    """Load the component summaries stored by `CacheAgent` (`CacheAgentPreprocess.store_data`)."""
+    global summaries
+    summaries = SummaryIndex.load(summaries_path)
+
+def register_watcher(root: str, use_inotify: bool = True):
+    """Keep the language server, the response cache and the graph in sync with edits under `root`."""
+    global watcher
+    watcher = FileWatcher(root, _on_files_changed, use_inotify=use_inotify).start()
+
+def _on_files_changed(paths: Set[str]):
+    """
+    Watcher callback: drop cached answers for `paths`, then sync them to the language server
+    and the graph. A path that fails (e.g. deleted mid-way) is logged and skipped, not the batch.
+    """
+    global graph_scanner
+    from lsprotocol.types import FileChangeType
+    changed = []
+    for path in sorted(paths):
+        if path == watcher.root or not path.endswith(watcher.suffixes):
+            cache.clear() # events were lost, or a whole directory went away
+            continue
+        cache.invalidate(path) # first, so stale answers go even if the sync below fails
+        uri = Path(path).as_uri()
+        try:
+            if os.path.exists(path):
+                try:
+                    pylsp.did_change(uri)
+                    changed.append((uri, FileChangeType.Changed))
+                    continue
+                except FileNotFoundError: # deleted between the check and the read
+                    pass
+            pylsp.did_close(uri)
+            changed.append((uri, FileChangeType.Deleted))
+        except Exception:
+            logger.exception("Failed to sync %s to the language server", path)
+    if changed:
+        cache.invalidate(watcher.root) # workspace-wide answers, e.g. WorkspaceSymbol
+    try:
+        pylsp.files_changed(changed)
+    except Exception:
+        logger.exception("Failed to send %d file changes to the language server", len(changed))
+
+    if graph is None:
+        return
+    with graph_lock:
+        if graph_scanner is None:
+            from graph.scanner import Scanner
+            graph_scanner = Scanner(pylsp, graph=graph)
+        for uri, _ in changed:
+            if uri in graph_scanner.scanned:
+                try:
+                    graph_scanner.rescan(uri)
+                except Exception:
+                    logger.exception("Failed to rescan %s into the graph", uri)
 
 @mcp.tool
 async def ShowDefinition(
-    file_path: Annotated[str, Field(description="The absolute path of the file to query symbol's definition")],
+    file_path: Annotated[str, Field(description="The path of the file to query symbol's definition, absolute or relative to the repository root")],
     line_num: Annotated[int, Field(description="The zero-indexed row number of the line in the file")],
     character_num: Annotated[int, Field(description="The zero-indexed column number of the character in the file")],
     keyword: str,
     ctx: Context
 ) -> str:
-    """Query the definition of the symbol at the given position in the file."""
+    """Query the definition of the symbol at the given position in the file. Answers `path:line:col-col`, 1-based, with paths relative to the repository root."""
     await ctx.debug("Starting analysis of numerical data")
+    file_path = encoder.absolute(file_path)
 
     try:
-        result = pylsp.show_definition(
-            line=line_num,
-            character=character_num,
-            keyword=keyword,
-            path=file_path,
+        return await dispatcher.run(
+            ctx, cache.get_or_compute, "definition", file_path, line_num, character_num, keyword,
+            locate=lambda: pylsp.locator(line_num, character_num, keyword, file_path),
+            compute=lambda: encoder.locations(pylsp.show_definition(
+                line=line_num,
+                character=character_num,
+                keyword=keyword,
+                path=file_path,
+            )),
+            related=encoder.files_in,
         )
-        return result.__str__()
     except Exception as e:
         await ctx.error(f"failed: {str(e)}")
         raise
 
 @mcp.tool
 async def HoverInformation(
-    file_path: Annotated[str, Field(description="The absolute path of the file to query symbol's definition")],
+    file_path: Annotated[str, Field(description="The path of the file to query symbol's definition, absolute or relative to the repository root")],
     line_num: Annotated[int, Field(description="The zero-indexed row number of the line in the file")],
     character_num: Annotated[int, Field(description="The zero-indexed column number of the character in the file")],
     keyword: str,
@@ -44,15 +154,468 @@ async def HoverInformation(
 ) -> str:
     """Query the definition of the symbol at the given position in the file."""
     await ctx.debug("Starting analysis of numerical data")
+    file_path = encoder.absolute(file_path)
+
+    # The hover text comes from the defining file, which rarely appears in it: ask for the
+    # definition in the same round trip and index the entry under that file too
+    defining: Set[str] = set()
+    def compute() -> str:
+        definition, hover = pylsp.definition_and_hover(line_num, character_num, keyword, file_path)
+        defining.update(encoder.files_in(encoder.locations(definition)))
+        return encoder.hover(hover)
+
+    try:
+        return await dispatcher.run(
+            ctx, cache.get_or_compute, "hover", file_path, line_num, character_num, keyword,
+            locate=lambda: pylsp.locator(line_num, character_num, keyword, file_path),
+            compute=compute,
+            related=lambda _: defining,
+        )
+    except Exception as e:
+        await ctx.error(f"failed: {str(e)}")
+        raise
+
+class SymbolQuery(BaseModel):
+    file_path: str = Field(description="The path of the file containing the symbol, absolute or relative to the repository root")
+    line_num: int = Field(description="The zero-indexed row number of the line in the file")
+    character_num: int = Field(description="The zero-indexed column number of the character in the file")
+    keyword: str = Field(description="The symbol to look up")
+
+def _batch(tool: str, queries: List[SymbolQuery], resolve, format_result, track_definitions: bool = False) -> str:
+    """
+    Answer `queries` from the cache where possible and resolve the rest with one batched
+    `resolve` call. One block per query, in order; failures are reported inline instead of
+    failing the call and are not cached. With `track_definitions`, the definitions of the
+    misses are resolved too, so their entries are dropped when the defining file changes.
+    """
+    queries = [q.model_copy(update={"file_path": encoder.absolute(q.file_path)}) for q in queries]
+    bodies: List[Optional[str]] = [None] * len(queries)
+    keys: List = [None] * len(queries)
+    misses = []
+    for i, q in enumerate(queries):
+        try:
+            keys[i] = cache.key(tool, q.file_path, q.line_num, q.character_num, q.keyword,
+                                locate=lambda q=q: pylsp.locator(q.line_num, q.character_num, q.keyword, q.file_path))
+            bodies[i] = cache.get(keys[i])
+        except Exception as e:
+            bodies[i] = f"error: {e}"
+        if bodies[i] is None:
+            misses.append(i)
+
+    items = [(queries[i].file_path, queries[i].line_num, queries[i].character_num, queries[i].keyword) for i in misses]
+    outcomes = resolve(items)
+    definitions = pylsp.show_definitions(items) if track_definitions and items else [None] * len(items)
+    for i, outcome, definition in zip(misses, outcomes, definitions):
+        if isinstance(outcome, Exception):
+            bodies[i] = f"error: {outcome}"
+        else:
+            bodies[i] = format_result(outcome)
+            related = encoder.files_in(bodies[i])
+            if definition is not None and not isinstance(definition, Exception):
+                related |= encoder.files_in(encoder.locations(definition))
+            cache.put(keys[i], bodies[i], related)
+
+    return "\n\n".join(
+        f"[{i}] {q.keyword} @ {encoder.path(q.file_path)}\n{body}"
+        for i, (q, body) in enumerate(zip(queries, bodies))
+    )
+
+@mcp.tool
+async def ShowDefinitions(
+    queries: Annotated[List[SymbolQuery], Field(description="Symbols to resolve, each with its file, approximate zero-indexed position and keyword")],
+    ctx: Context
+) -> str:
+    """Resolve the definitions of several symbols in one call. Returns one `path:line:col-col` entry (1-based, relative to the repository root) per query, in order, with per-query errors inline."""
+    try:
+        return await dispatcher.run(ctx, _batch, "definitions", queries, lambda items: pylsp.show_definitions(items), encoder.locations)
+    except Exception as e:
+        await ctx.error(f"failed: {str(e)}")
+        raise
+
+@mcp.tool
+async def HoverMany(
+    queries: Annotated[List[SymbolQuery], Field(description="Symbols to describe, each with its file, approximate zero-indexed position and keyword")],
+    ctx: Context
+) -> str:
+    """Fetch hover information (signature and docs) for several symbols in one call. Returns one entry per query, in order, with per-query errors inline."""
+    try:
+        return await dispatcher.run(ctx, _batch, "hovers", queries, lambda items: pylsp.hovers(items), encoder.hover,
+                                    track_definitions=True)
+    except Exception as e:
+        await ctx.error(f"failed: {str(e)}")
+        raise
+
+PAGE_LIMIT = Field(description="Maximum number of results to return", ge=1, le=500)
+PAGE_CURSOR = Field(description="`next_cursor` from a previous call to fetch the following page")
+
+KIND_FILTER = Field(description="Only return these symbol kinds, by name (Class, Function, Method, Variable, ...) or SymbolKind number; one kind or a list")
+
+def _kinds(kind_filter: Union[int, str, List[Union[int, str]], None]) -> Optional[set]:
+    if kind_filter is None or kind_filter == []:
+        return None
+    from lsprotocol.types import SymbolKind
+    by_name = {kind.name.lower(): kind for kind in SymbolKind}
+    kinds = set()
+    for kind in kind_filter if isinstance(kind_filter, list) else [kind_filter]:
+        if isinstance(kind, int) or kind.isdigit():
+            kinds.add(SymbolKind(int(kind)))
+        elif kind.strip().lower() in by_name:
+            kinds.add(by_name[kind.strip().lower()])
+        else:
+            raise ValueError(f"Unknown symbol kind {kind!r}; use names like Class, Function, Method, Variable")
+    return kinds
+
+def _symbol_listing(path: str, kinds: Optional[set]) -> str:
+    """All symbols of a file, flattened depth first with their container, filtered by kind."""
+    lines = []
+    def visit(symbols, container: str):
+        for symbol in symbols:
+            name = f"{container}.{symbol.name}" if container else symbol.name
+            symbol_range = symbol.range if hasattr(symbol, 'range') else symbol.location.range
+            if kinds is None or symbol.kind in kinds:
+                lines.append(f"{symbol.kind.name} {name} lines {symbol_range.start.line + 1}-{symbol_range.end.line + 1}")
+            visit(getattr(symbol, 'children', None) or [], name)
+    visit(pylsp.document_symbols(path), "")
+    return "\n".join(lines)
+
+def _reference_listing(line_num: int, character_num: int, keyword: str, path: str) -> str:
+    """Every reference to the symbol as `path:line:col  source line`, 1-based."""
+    from graph.imports import uri_to_path
+    sources = {}
+    lines = []
+    for location in pylsp.references(line=line_num, character=character_num, keyword=keyword, path=path):
+        file = uri_to_path(location.uri)
+        if file not in sources:
+            try:
+                sources[file] = file.read_text(encoding="utf-8").splitlines()
+            except OSError:
+                sources[file] = []
+        start = location.range.start
+        text = sources[file][start.line].strip() if start.line < len(sources[file]) else ""
+        lines.append(f"{encoder.path(str(file))}:{start.line + 1}:{start.character + 1}  {text[:120]}")
+    return "\n".join(lines)
+
+def _workspace_symbol_listing(query: str, kinds: Optional[set]) -> str:
+    """Workspace symbols matching `query` as `path:line:col  Kind container.name`, 1-based, sorted by file and line."""
+    entries = []
+    for symbol in pylsp.workspace_symbols(query):
+        if kinds is not None and symbol.kind not in kinds:
+            continue
+        name = f"{symbol.container_name}.{symbol.name}" if symbol.container_name else symbol.name
+        start = getattr(symbol.location, 'range', None)
+        start = start.start if start is not None else None
+        where = f"{start.line + 1}:{start.character + 1}" if start is not None else "1:1"
+        entries.append((encoder.path(symbol.location.uri), start.line if start is not None else 0, f"{where}  {symbol.kind.name} {name}"))
+    return "\n".join(f"{path}:{rest}" for path, _, rest in sorted(entries, key=lambda entry: entry[:2]))
+
+def _page_of(tool: str, path: str, line: int, character: int, keyword: str, locate, compute, limit: int, cursor: Optional[str],
+             format_page: Callable[[List[str]], str] = "\n".join) -> str:
+    # The full listing is cached, so following pages are served without asking the language server again
+    listing = cache.get_or_compute(tool, path, line, character, keyword, locate=locate, compute=compute, related=encoder.files_in)
+    return paginate(listing, limit, cursor, format_page)
+
+@mcp.tool
+async def SymbolLocator(
+    file_path: Annotated[str, Field(description="The path of the file containing the symbol, absolute or relative to the repository root")],
+    line_num: Annotated[int, Field(description="The zero-indexed row number of the line in the file")],
+    character_num: Annotated[int, Field(description="The zero-indexed column number of the character in the file")],
+    keyword: str,
+    limit: Annotated[int, PAGE_LIMIT] = 50,
+    cursor: Annotated[Optional[str], PAGE_CURSOR] = None,
+    ctx: Context = None,
+) -> str:
+    """Find all references to the symbol at the given position across the workspace, with the source line of each, grouped by file as `line:col  source` (1-based). Results are paginated."""
+    file_path = encoder.absolute(file_path)
+    try:
+        return await dispatcher.run(
+            ctx, _page_of, "references", file_path, line_num, character_num, keyword,
+            lambda: pylsp.locator(line_num, character_num, keyword, file_path),
+            lambda: _reference_listing(line_num, character_num, keyword, file_path),
+            limit, cursor, encoder.group_by_file,
+        )
+    except Exception as e:
+        await ctx.error(f"failed: {str(e)}")
+        raise
+
+@mcp.tool
+async def DocumentSymbols(
+    file_path: Annotated[str, Field(description="The path of the file to list symbols of, absolute or relative to the repository root")],
+    kind_filter: Annotated[Union[int, str, List[Union[int, str]], None], KIND_FILTER] = None,
+    limit: Annotated[int, PAGE_LIMIT] = 100,
+    cursor: Annotated[Optional[str], PAGE_CURSOR] = None,
+    ctx: Context = None,
+) -> str:
+    """List the symbols defined in a file as `Kind qualified.name lines start-end` (1-based), optionally filtered by kind. Results are paginated."""
+    file_path = encoder.absolute(file_path)
+    try:
+        from lsprotocol.types import Position
+        kinds = _kinds(kind_filter)
+        tool = "symbols:" + ",".join(sorted(kind.name for kind in kinds)) if kinds else "symbols"
+        return await dispatcher.run(
+            ctx, _page_of, tool, file_path, 0, 0, "",
+            lambda: Position(line=0, character=0),
+            lambda: _symbol_listing(file_path, kinds),
+            limit, cursor,
+        )
+    except Exception as e:
+        await ctx.error(f"failed: {str(e)}")
+        raise
+
+def _workspace_page(query: str, kinds: Optional[set], limit: int, cursor: Optional[str]) -> str:
+    # Workspace-wide listings are indexed under the repository root, which the watcher
+    # invalidates on every change, so following pages are served from the same listing
+    tool = "workspace_symbols:" + ",".join(sorted(kind.name for kind in kinds)) if kinds else "workspace_symbols"
+    key = (tool, encoder.root, None, None, query)
+    listing = cache.get(key)
+    if listing is None:
+        listing = _workspace_symbol_listing(query, kinds)
+        if listing: # pyright answers nothing until it has indexed the workspace
+            cache.put(key, listing)
+    return paginate(listing, limit, cursor, encoder.group_by_file)
 
+@mcp.tool
+async def WorkspaceSymbol(
+    query: Annotated[str, Field(description="Name, or part of a name, of the symbols to find across the repository")],
+    kind_filter: Annotated[Union[int, str, List[Union[int, str]], None], KIND_FILTER] = None,
+    limit: Annotated[int, PAGE_LIMIT] = 50,
+    cursor: Annotated[Optional[str], PAGE_CURSOR] = None,
+    ctx: Context = None,
+) -> str:
+    """Search the symbols of the whole repository by name, optionally filtered by kind. Answers `line:col  Kind container.name` (1-based) grouped by file. Results are paginated."""
     try:
-        result = pylsp.hover(
-            line=line_num,
-            character=character_num,
-            keyword=keyword,
-            path=file_path,
+        return await dispatcher.run(ctx, _workspace_page, query, _kinds(kind_filter), limit, cursor)
+    except Exception as e:
+        await ctx.error(f"failed: {str(e)}")
+        raise
+
+def _describe(decl) -> str:
+    return f"{getattr(decl, 'name', '')} ({encoder.path(decl.uri)}:{decl.position.line + 1}:{decl.position.character + 1})"
+
+def _resolve(symbol: str):
+    """Return the single declaration `symbol` names, or raise ValueError listing the candidates."""
+    if graph is None:
+        raise ValueError("No knowledge graph loaded; start the server with --graph")
+    matches = graph.query.find(symbol)
+    if not matches:
+        raise ValueError(f"No declaration named {symbol!r} in the knowledge graph")
+    if len(matches) > 1:
+        candidates = "\n".join(f"  {decl.key()}  {_describe(decl)}" for decl in matches[:20])
+        raise ValueError(f"{symbol!r} is ambiguous, qualify it with its file or pass a key:\n{candidates}")
+    return matches[0]
+
+def _listing(title: str, decls: List) -> str:
+    return "\n".join([f"{title} ({len(decls)}):"] + [f"  {_describe(decl)}" for decl in decls])
+
+def _dependency_graph(symbol: str, depth: int, direction: str) -> str:
+    with graph_lock:
+        decl = _resolve(symbol)
+        reach = graph.query.dependencies if direction == "dependencies" else graph.query.dependents
+        return f"{_describe(decl)}\n" + _listing(direction, reach(decl.key(), depth or None))
+
+def _call_path(source: str, target: str) -> str:
+    with graph_lock:
+        src, dst = _resolve(source), _resolve(target)
+        path = graph.query.call_path(src.key(), dst.key())
+        if path is None:
+            return f"{_describe(dst)} is not reachable from {_describe(src)}"
+        return "\n  -> ".join(_describe(decl) for decl in path)
+
+def _module_dependencies(module: Optional[str], package_depth: Optional[int], limit: int) -> str:
+    if graph is None:
+        raise ValueError("No knowledge graph loaded; start the server with --graph")
+    with graph_lock:
+        edges = dict(graph.query.module_dependencies(package_depth))
+    if module is not None:
+        module = module.strip('/')
+        fan_out = sorted(((dst, n) for (src, dst), n in edges.items() if src == module), key=lambda item: -item[1])
+        fan_in = sorted(((src, n) for (src, dst), n in edges.items() if dst == module), key=lambda item: -item[1])
+        lines = [f"{module}", f"depends on ({len(fan_out)} modules):"]
+        lines += [f"  {name} ({n} edges)" for name, n in fan_out[:limit]]
+        lines += [f"depended on by ({len(fan_in)} modules):"]
+        lines += [f"  {name} ({n} edges)" for name, n in fan_in[:limit]]
+        return "\n".join(lines)
+
+    fan_in, fan_out = {}, {}
+    for src, dst in edges:
+        fan_out[src] = fan_out.get(src, 0) + 1
+        fan_in[dst] = fan_in.get(dst, 0) + 1
+    modules = sorted(set(fan_in) | set(fan_out), key=lambda name: (-fan_in.get(name, 0), -fan_out.get(name, 0), name))
+    lines = [f"modules by fan-in ({len(modules)}):"]
+    lines += [f"  {name}: fan-in {fan_in.get(name, 0)}, fan-out {fan_out.get(name, 0)}" for name in modules[:limit]]
+    return "\n".join(lines)
+
+SYMBOL_FIELD = Field(description="A function name, a name qualified by the end of its file path (`pkg/mod.py:name`), or a declaration key")
+
+@mcp.tool
+async def DependencyGraph(
+    symbol: Annotated[str, SYMBOL_FIELD],
+    depth: Annotated[int, Field(description="Number of hops to follow; 0 for the full transitive closure", ge=0)] = 1,
+    direction: Annotated[Literal["dependencies", "dependents"], Field(description="`dependencies` for what the symbol calls, `dependents` for what calls it")] = "dependencies",
+    ctx: Context = None,
+) -> str:
+    """List what a function transitively calls (or is called by) up to `depth` hops, nearest first, from the preloaded knowledge graph."""
+    try:
+        return await dispatcher.run(ctx, _dependency_graph, symbol, depth, direction)
+    except Exception as e:
+        await ctx.error(f"failed: {str(e)}")
+        raise
+
+@mcp.tool
+async def CallPath(
+    source: Annotated[str, SYMBOL_FIELD],
+    target: Annotated[str, SYMBOL_FIELD],
+    ctx: Context = None,
+) -> str:
+    """Find the shortest chain of calls from `source` to `target` in the preloaded knowledge graph."""
+    try:
+        return await dispatcher.run(ctx, _call_path, source, target)
+    except Exception as e:
+        await ctx.error(f"failed: {str(e)}")
+        raise
+
+@mcp.tool
+async def ModuleDependencies(
+    module: Annotated[Optional[str], Field(description="Module (file or package path relative to the repository root) to inspect; omit for an overview of all modules")] = None,
+    package_depth: Annotated[Optional[int], Field(description="Group modules by package directories of this many components instead of by file", ge=1)] = None,
+    limit: Annotated[int, Field(description="Maximum number of modules to list", ge=1)] = 50,
+    ctx: Context = None,
+) -> str:
+    """Module-level fan-in and fan-out from the preloaded knowledge graph: which modules a module depends on and which depend on it, with edge counts."""
+    try:
+        return await dispatcher.run(ctx, _module_dependencies, module, package_depth, limit)
+    except Exception as e:
+        await ctx.error(f"failed: {str(e)}")
+        raise
+
+def _excerpt(path: str, line: int, max_lines: int) -> Tuple[List[str], bool]:
+    """
+    Source of the block starting at zero-based `line`: the line, any continuation of an open
+    bracket, and everything indented deeper. Returns the lines (at most `max_lines`) and
+    whether the block was cut.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return [], False
+    if line >= len(lines):
+        return [], False
+    indent = len(lines[line]) - len(lines[line].lstrip())
+    depth = 0
+    end = line
+    while end < len(lines):
+        text = lines[end]
+        if end > line and depth <= 0 and text.strip() and len(text) - len(text.lstrip()) <= indent:
+            break
+        depth += sum(text.count(c) for c in "([{") - sum(text.count(c) for c in ")]}")
+        end += 1
+    while end > line + 1 and not lines[end - 1].strip():
+        end -= 1
+    return lines[line:min(end, line + max_lines)], end - line > max_lines
+
+def _summary_of(path: str, name: str, code: List[str], truncated: bool) -> str:
+    if summaries is None:
+        return "no summaries loaded; start the server with --summaries"
+    summary = summaries.lookup(path, name, code[0] if code else None)
+    if summary is None or not summary.context:
+        return "none stored"
+    stored = [line.rstrip() for line in summary.code.strip("\n").splitlines()]
+    if truncated:
+        stored = stored[:len(code)]
+    stale = bool(code) and stored != [line.rstrip() for line in code]
+    return encoder.truncate(summary.context.strip()) + (" (written for an older version of this code)" if stale else "")
+
+def _dependencies_of(uri: str, line: int, name: str, first_line: Optional[str]) -> List[Tuple[str, str]]:
+    """(name, `path:line:col` or path) of the direct dependencies, from the graph or else from the stored summary."""
+    if graph is not None:
+        with graph_lock:
+            # Graph declarations sit at their name, not where the server's definition range
+            # starts (`def`, `async def`, decorators): match by file and name, nearest line first
+            path = encoder.absolute(uri)
+            candidates = [decl for decl in graph.query.find(name) if encoder.absolute(decl.uri) == path]
+            if candidates:
+                decl = min(candidates, key=lambda decl: abs(decl.position.line - line))
+                return [(getattr(dep, 'name', ''), f"{encoder.path(dep.uri)}:{dep.position.line + 1}:{dep.position.character + 1}")
+                        for dep in graph.query.dependencies(decl.key(), 1)]
+    summary = summaries.lookup(uri, name, first_line) if summaries is not None else None
+    return [(dep_name, encoder.path(dep_path)) for dep_name, dep_path in summary.dependencies] if summary else []
+
+def _explain(keyword: str, file_path: str, line_num: int, character_num: int, max_lines: int) -> str:
+    definition, hover = pylsp.definition_and_hover(line_num, character_num, keyword, file_path)
+    items = definition if isinstance(definition, list) else [definition] if definition is not None else []
+    if not items:
+        return f"{keyword}: no definition found"
+    uri = getattr(items[0], 'uri', None) or items[0].target_uri
+    start = (items[0].range if hasattr(items[0], 'range') else items[0].target_selection_range).start
+    path = encoder.absolute(uri)
+    code, truncated = _excerpt(path, start.line, max_lines)
+
+    lines = [f"{keyword} @ {encoder.locations(definition)}", encoder.hover(hover), "code:"]
+    lines += [f"{start.line + i + 1:>5}  {text}" for i, text in enumerate(code)]
+    if truncated:
+        lines.append("  ...")
+    lines.append(f"summary: {_summary_of(path, keyword, code, truncated)}")
+    dependencies = _dependencies_of(uri, start.line, keyword, code[0] if code else None)
+    lines.append(f"dependencies ({len(dependencies)}):")
+    for name, where in dependencies:
+        dep_path = encoder.absolute(where.split(":", 1)[0])
+        dep_summary = summaries.lookup(dep_path, name) if summaries is not None else None
+        lines.append(f"  {name} @ {where}")
+        if dep_summary is not None and dep_summary.context:
+            lines.append(f"    {encoder.truncate(dep_summary.context.strip())}")
+    return "\n".join(lines)
+
+@mcp.tool
+async def ExplainSymbol(
+    keyword: Annotated[str, Field(description="The symbol to explain. Without `file_path`: a function name, `pkg/mod.py:name` or a declaration key from the knowledge graph")],
+    file_path: Annotated[Optional[str], Field(description="A file using the symbol, absolute or relative to the repository root")] = None,
+    line_num: Annotated[int, Field(description="The zero-indexed row number of the usage in the file")] = 0,
+    character_num: Annotated[int, Field(description="The zero-indexed column number of the usage in the file")] = 0,
+    max_lines: Annotated[int, Field(description="Maximum lines of code to include", ge=1, le=400)] = 40,
+    ctx: Context = None,
+) -> str:
+    """Everything about one symbol in one call: its definition location, signature and docs, a code excerpt, and the stored summaries of it and of its direct dependencies. Positions are 1-based."""
+    try:
+        if file_path is None:
+            from lsprotocol.types import Position
+            with graph_lock:
+                decl = _resolve(keyword)
+            file_path, line_num, character_num = encoder.absolute(decl.uri), decl.position.line, decl.position.character
+            keyword = decl.name
+            locate = lambda: Position(line=line_num, character=character_num)
+        else:
+            file_path = encoder.absolute(file_path)
+            locate = lambda: pylsp.locator(line_num, character_num, keyword, file_path)
+        return await dispatcher.run(
+            ctx, cache.get_or_compute, f"explain:{max_lines}", file_path, line_num, character_num, keyword,
+            locate=locate,
+            compute=lambda: _explain(keyword, file_path, line_num, character_num, max_lines),
+            related=encoder.files_in,
         )
-        return result.__str__()
     except Exception as e:
         await ctx.error(f"failed: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+def _status() -> dict:
+    return pylsp.status() if pylsp is not None else {"status": "stopped"}
+
+@mcp.tool
+async def ServerStatus() -> dict:
+    """Whether the language server is `starting`, `ready` or `failed`, and how long it took (or has taken so far) to start. Calls made while it starts wait for it."""
+    return _status()
+
+@mcp.custom_route("/health", methods=["GET"])
+async def Health(request: Request) -> JSONResponse:
+    """200 once the language server is ready, 503 while it starts or after it failed."""
+    status = _status()
+    return JSONResponse(status, status_code=200 if status["status"] == "ready" else 503)
+
+@mcp.resource("stats://response-cache")
+def ResponseCacheStats() -> dict:
+    """Size and hit/miss/eviction/invalidation counters of the tool response cache."""
+    return cache.stats()
+
+@mcp.resource("stats://dispatcher")
+def DispatcherStats() -> dict:
+    """Busy workers and calls waiting for one, across all client sessions."""
+    return dispatcher.stats()
@@ -0,0 +1,201 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from servers.lsp.servers.workspace import SKIP_DIRS
+
+logger = logging.getLogger(__name__)
+
+# inotify(7) constants
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII") # wd, mask, cookie, name length
+
+
+def _inotify():
+    """Return libc if it provides inotify, else None (non-Linux, or a libc without it)."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class FileWatcher:
+    """
+    Watches the source files of a workspace and reports changes in debounced batches.
+
+    Uses inotify on Linux (through ctypes, no extra dependency) and falls back to polling
+    file mtimes elsewhere or when inotify is unavailable (e.g. the watch limit is reached).
+    Changes are collected until the workspace has been quiet for `debounce` seconds, so an
+    editor saving many files, or a `git checkout`, results in one `on_change` call with the
+    set of changed (modified, created or deleted) paths. A path equal to `root` means events
+    were lost and everything under it should be treated as changed.
+    """
+    def __init__(
+        self,
+        root: str,
+        on_change: Callable[[Set[str]], None],
+        suffixes: Iterable[str] = (".py", ".pyi"),
+        debounce: float = 0.3,
+        poll_interval: float = 1.0,
+        use_inotify: bool = True,
+    ):
+        self.root = os.path.abspath(root)
+        self.on_change = on_change
+        self.suffixes = tuple(suffixes)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.backend = "inotify" if use_inotify and _inotify() is not None else "polling"
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pending: Set[str] = set()
+        self._last_event = 0.0
+
+    def start(self) -> 'FileWatcher':
+        run = self._run_inotify if self.backend == "inotify" else self._run_polling
+        self._thread = threading.Thread(target=run, name="file-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _wanted(self, path: str) -> bool:
+        return path.endswith(self.suffixes)
+
+    def _directories(self, top: str):
+        for dirpath, dirnames, _ in os.walk(top):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith(".")]
+            yield dirpath
+
+    def _record(self, paths: Iterable[str]):
+        self._pending.update(paths)
+        self._last_event = time.monotonic()
+
+    def _flush_if_quiet(self):
+        if self._pending and time.monotonic() - self._last_event >= self.debounce:
+            changed, self._pending = self._pending, set()
+            try:
+                self.on_change(changed)
+            except Exception: # a failing handler must not stop the watcher
+                logger.exception("File change handler failed")
+
+    def _run_inotify(self):
+        libc = _inotify()
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            logger.warning("inotify unavailable (%s), polling instead", os.strerror(ctypes.get_errno()))
+            self.backend = "polling"
+            return self._run_polling()
+
+        watches: Dict[int, str] = {}
+        def watch(top: str) -> bool:
+            for directory in self._directories(top):
+                wd = libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK)
+                if wd < 0:
+                    if ctypes.get_errno() == 28: # ENOSPC: out of watches
+                        return False
+                    continue # vanished meanwhile or unreadable
+                watches[wd] = directory
+            return True
+
+        try:
+            if not watch(self.root):
+                logger.warning("inotify watch limit reached, polling instead")
+                self.backend = "polling"
+                return self._run_polling()
+            while not self._stop.is_set():
+                ready, _, _ = select.select([fd], [], [], self.debounce / 2)
+                if not ready:
+                    self._flush_if_quiet()
+                    continue
+                data = os.read(fd, 64 * 1024)
+                changed = set()
+                offset = 0
+                while offset < len(data):
+                    wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                    offset += EVENT_HEADER.size
+                    name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                    offset += length
+                    if mask & IN_Q_OVERFLOW:
+                        changed.add(self.root) # events were dropped
+                        continue
+                    if mask & IN_IGNORED:
+                        watches.pop(wd, None)
+                        continue
+                    directory = watches.get(wd)
+                    if directory is None or not name:
+                        continue
+                    path = os.path.join(directory, name)
+                    if mask & IN_ISDIR:
+                        if mask & (IN_CREATE | IN_MOVED_TO) and name not in SKIP_DIRS and not name.startswith("."):
+                            watch(path)
+                            changed.update(
+                                os.path.join(dirpath, filename)
+                                for dirpath in self._directories(path)
+                                for filename in os.listdir(dirpath) if self._wanted(filename)
+                            )
+                        elif mask & (IN_DELETE | IN_MOVED_FROM):
+                            changed.add(path) # files under it are gone
+                    elif self._wanted(name):
+                        changed.add(path)
+                if changed:
+                    self._record(changed)
+        finally:
+            os.close(fd)
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        files = {}
+        for directory in self._directories(self.root):
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_file() and self._wanted(entry.name):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def _run_polling(self):
+        known = self._snapshot()
+        next_poll = time.monotonic() + self.poll_interval
+        while not self._stop.wait(min(self.debounce / 2, self.poll_interval)):
+            if time.monotonic() >= next_poll:
+                current = self._snapshot()
+                changed = {path for path in known.keys() | current.keys() if known.get(path) != current.get(path)}
+                known = current
+                if changed:
+                    self._record(changed)
+                next_poll = time.monotonic() + self.poll_interval
+            self._flush_if_quiet()
@@ -0,0 +1,159 @@
+"""
+Measure the per-node memory of the graph value types on a synthetic 100k-symbol graph.
+
+Compares the slotted, key-caching dataclasses in graph/knowledge_graph.py against plain
+dataclass equivalents with a per-instance __dict__ (the previous layout), then breaks down
+where the memory of a whole KnowledgeGraph over the same symbols goes: the dataclass
+payloads, the graph's own maps and lists, and the GraphCore columns and adjacency.
+
+Usage (from mcp_system/):
+    python ../testing/script/graph_memory_benchmark.py --symbols 100000 --edges 3
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "mcp_system"))
+
+from graph.knowledge_graph import KnowledgeGraph, Position, Location, Symbol, Index, Function
+
+
+# The previous, unslotted layout
+@dataclass
+class PlainPosition:
+    line: int
+    character: int
+
+    def key(self):
+        return f"{self.line}:{self.character}"
+
+@dataclass
+class PlainLocation:
+    uri: str
+    position: PlainPosition
+
+    def key(self) -> str:
+        return f"{self.uri}:{self.position.key()}"
+
+@dataclass
+class PlainIndex:
+    name: str
+    location: PlainLocation
+    context: str
+
+@dataclass
+class PlainFunction(PlainLocation):
+    name: str
+    code_block: object
+    index: Optional[PlainIndex] = None
+    dependencies: List[PlainIndex] = field(default_factory=list)
+
+@dataclass
+class PlainSymbol:
+    name: str
+    pos: PlainPosition
+    decl: PlainLocation
+
+
+def build(n: int, position_cls, location_cls, function_cls, index_cls, symbol_cls):
+    nodes = []
+    for i in range(n):
+        uri = f"file:///repo/pkg{i % 100}/module{i % 1000}.py"
+        func = function_cls(uri=uri, position=position_cls(line=i, character=4), name=f"func_{i}", code_block=None)
+        func.index = index_cls(name=func.name, location=func, context="")
+        symbol = symbol_cls(name=func.name, pos=position_cls(line=i + 1, character=8), decl=location_cls(uri=uri, position=position_cls(line=i, character=4)))
+        nodes.append((func, symbol))
+    return nodes
+
+
+def measure(label: str, n: int, *classes):
+    gc.collect()
+    tracemalloc.start()
+    nodes = build(n, *classes)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(3):
+        for func, symbol in nodes:
+            func.key()
+            symbol.decl.key()
+    key_time = time.perf_counter() - start
+
+    print(f"{label:>8}: {current / 1e6:8.1f} MB total, {current / n:6.0f} B/node, 3x key() pass {key_time:.3f}s")
+    del nodes
+    return current
+
+
+def _ints(values) -> int:
+    # Small ints are shared singletons and cost nothing extra
+    return sum(sys.getsizeof(v) for v in values if not -5 <= v <= 256)
+
+
+def graph_breakdown(graph: KnowledgeGraph) -> dict:
+    """Bytes held by each structure of `graph`, not counting the dataclasses it points to."""
+    core = graph.core
+    maps = {
+        "decl_map": sys.getsizeof(graph.decl_map),
+        "decl keys": sum(sys.getsizeof(decl.key()) for decl in graph.decl_map.values()),
+        "nodes + indexes lists": sys.getsizeof(graph.nodes) + sys.getsizeof(graph.indexes),
+        "core columns": sum(sys.getsizeof(a) for a in (core.node_uri, core.node_name, core.node_line,
+                                                          core.node_character, core.node_kind, core.declared)),
+        "core string pool": sys.getsizeof(core.strings.strings) + sys.getsizeof(core.strings._ids),
+        "core node ids": sys.getsizeof(core._ids) + sum(
+            sys.getsizeof(k) + (_ints(k) if isinstance(k, tuple) else 0) for k in core._ids) + _ints(core._ids.values()),
+        "core adjacency lists": sum(sys.getsizeof(l) + sum(sys.getsizeof(a) for a in l if a) for l in (core._out, core._in)),
+        "core edge weights": sys.getsizeof(core._edges) + _ints(core._edges) + _ints(core._edges.values()),
+    }
+    return maps
+
+
+def measure_graph(n: int, edges: int):
+    gc.collect()
+    tracemalloc.start()
+    functions = []
+    for i in range(n):
+        uri = f"file:///repo/pkg{i % 100}/module{i % 1000}.py"
+        func = Function(uri=uri, position=Position(line=i, character=4), name=f"func_{i}", code_block=None)
+        func.index = Index(name=func.name, location=func, context="")
+        functions.append(func)
+    payload, _ = tracemalloc.get_traced_memory()
+
+    start = time.perf_counter()
+    graph = KnowledgeGraph(base_uri="file:///repo")
+    for func in functions:
+        graph.add_decl(func)
+    for i, func in enumerate(functions):
+        for k in range(1, edges + 1):
+            graph.add_dependency(func, functions[(i * 7919 + k * 104729) % n].index)
+    build_time = time.perf_counter() - start
+    total, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"\nKnowledgeGraph of {n} functions and {graph.core.num_edges} edges, built in {build_time:.2f}s:")
+    print(f"{'dataclass payloads':>24}: {payload / 1e6:8.1f} MB, {payload / n:6.0f} B/node")
+    print(f"{'graph structures':>24}: {(total - payload) / 1e6:8.1f} MB, {(total - payload) / n:6.0f} B/node (traced)")
+    for name, size in graph_breakdown(graph).items():
+        print(f"{name:>24}: {size / 1e6:8.1f} MB, {size / n:6.0f} B/node")
+    return graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--symbols", type=int, default=100_000)
+    parser.add_argument("--edges", type=int, default=3, help="Dependencies per function in the graph breakdown")
+    args = parser.parse_args()
+
+    plain = measure("dict", args.symbols, PlainPosition, PlainLocation, PlainFunction, PlainIndex, PlainSymbol)
+    slotted = measure("slots", args.symbols, Position, Location, Function, Index, Symbol)
+    print(f"saved {(plain - slotted) / args.symbols:.0f} B/node ({100 * (plain - slotted) / plain:.0f}%)")
+    measure_graph(args.symbols, args.edges)
+
+
+if __name__ == "__main__":
+    main()
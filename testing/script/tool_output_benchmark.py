@@ -0,0 +1,123 @@
+"""
+Measure the size of MCP tool output before and after the compact encoding.
+
+Starts pyright on a repository, samples function declarations and renders the answers of
+ShowDefinition, HoverInformation and SymbolLocator both the old way (the repr of the
+lsprotocol objects, absolute paths, 0-based positions, full hover text) and with
+servers/lsp/encoding.py. Prints bytes and tokens per response for both.
+
+Tokens are counted with tiktoken (cl100k_base) when it is installed, otherwise estimated
+as words plus punctuation marks.
+
+Usage (from mcp_system/):
+    python ../testing/script/tool_output_benchmark.py --repository . --samples 50
+"""
+import argparse
+import os
+import re
+import sys
+from pathlib import Path
+from statistics import mean
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "mcp_system"))
+
+from lsprotocol.types import SymbolKind
+from servers.lsp.servers import PythonLangServer
+from servers.lsp.encoding import CompactEncoder, HOVER_CHARS
+
+
+def token_counter():
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return "tiktoken", lambda text: len(encoding.encode(text))
+    except ImportError:
+        return "estimated", lambda text: len(re.findall(r"\w+|[^\w\s]", text))
+
+
+def sample_functions(lsp, root: Path, samples: int):
+    """(path, line, character, name) of up to `samples` function names, spread over the files."""
+    skip = {".git", ".venv", "venv", "node_modules", "__pycache__", "build", "dist"}
+    files = sorted(
+        path for path in root.rglob("*.py")
+        if not skip.intersection(path.relative_to(root).parts)
+    )
+    found = []
+    for path in files:
+        try:
+            symbols = lsp.document_symbols(str(path), [SymbolKind.Function, SymbolKind.Method])
+        except Exception as e: # e.g. a timeout while the server is still indexing
+            print(f"skipping {path}: {e!r}")
+            continue
+        for symbol in symbols:
+            start = symbol.location.range.start
+            found.append((str(path), start.line, start.character + 4, symbol.name)) # past `def `
+            break
+        if len(found) >= samples:
+            break
+    return found
+
+
+def old_references(lsp, path, line, character, name):
+    lines = []
+    for location in lsp.references(line=line, character=character, keyword=name, path=path):
+        start = location.range.start
+        lines.append(f"{location.uri[7:]}:{start.line}:{start.character}")
+    return "\n".join(lines)
+
+
+def new_references(lsp, encoder, path, line, character, name):
+    entries = [
+        f"{encoder.path(location.uri)}:{location.range.start.line + 1}:{location.range.start.character + 1}"
+        for location in lsp.references(line=line, character=character, keyword=name, path=path)
+    ]
+    return encoder.group_by_file(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repository", "-r", type=Path, default=Path("."))
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--hover-chars", type=int, default=HOVER_CHARS)
+    args = parser.parse_args()
+
+    root = args.repository.resolve()
+    lsp = PythonLangServer(root_uri=root.as_uri())
+    encoder = CompactEncoder(root.as_uri(), hover_chars=args.hover_chars)
+    counter_name, count_tokens = token_counter()
+
+    results = {tool: ([], []) for tool in ("ShowDefinition", "HoverInformation", "SymbolLocator")}
+    try:
+        for path, line, character, name in sample_functions(lsp, root, args.samples):
+            try:
+                definition = lsp.show_definition(line=line, character=character, keyword=name, path=path)
+                hover = lsp.hover(line=line, character=character, keyword=name, path=path)
+                references = (old_references(lsp, path, line, character, name),
+                              new_references(lsp, encoder, path, line, character, name))
+            except Exception as e:
+                print(f"skipping {name} in {path}: {e!r}")
+                continue
+            results["ShowDefinition"][0].append(str(definition))
+            results["ShowDefinition"][1].append(encoder.locations(definition))
+            results["HoverInformation"][0].append(str(hover))
+            results["HoverInformation"][1].append(encoder.hover(hover))
+            results["SymbolLocator"][0].append(references[0])
+            results["SymbolLocator"][1].append(references[1])
+    finally:
+        lsp.close()
+
+    print(f"{len(results['ShowDefinition'][0])} samples from {root}, tokens: {counter_name}")
+    print(f"{'tool':<18}{'bytes before':>14}{'bytes after':>13}{'tokens before':>15}{'tokens after':>14}{'saved':>8}")
+    for tool, (before, after) in results.items():
+        if not before:
+            continue
+        bytes_before = mean(len(text.encode()) for text in before)
+        bytes_after = mean(len(text.encode()) for text in after)
+        tokens_before = mean(count_tokens(text) for text in before)
+        tokens_after = mean(count_tokens(text) for text in after)
+        saved = 1 - tokens_after / tokens_before if tokens_before else 0.0
+        print(f"{tool:<18}{bytes_before:>14.0f}{bytes_after:>13.0f}{tokens_before:>15.1f}{tokens_after:>14.1f}{saved:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()